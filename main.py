@@ -1,21 +1,60 @@
 import sys
 import os
+import json
+import time
+import argparse
+import threading
+import contextvars
+from enum import Enum
 from datetime import datetime
-from typing import Optional
+from typing import TYPE_CHECKING, Callable, List, Optional
 
-from pages.login_page import LoginPage
-from pages.results_page import ResultsPage
-from utils.browser import Browser
+# Only lightweight modules are imported here. Selenium, the OCR model, aiohttp and
+# requests are imported inside the commands that use them, so commands such as
+# check-config start without loading them.
 from utils.logger import logger
-from utils.notify import Notification
-from utils.constants import USERNAME, PASSWORD, NTFY_TOPIC, HEADLESS_RAW_VALUE
+from utils.metrics import metrics
+from utils.tracing import tracer
+from utils.profiling import profiling
+from utils.memory import memory
+from utils.constants import (USERNAME, PASSWORD, NTFY_TOPIC, WEBHOOK_URL, SMTP_HOST, EMAIL_TO,
+                             NOTIFIERS, HEADLESS_RAW_VALUE,
+                             RUN_TIMEOUT, LOCK_WAIT, LOCK_FILE, ENGINE, METRICS_PORT,
+                             METRICS_TEXTFILE, METRICS_JSON_FILE, TRACES_FOLDER, TRACE_FORMAT,
+                             TRACE_RETENTION, CAPTCHA_WARM_UP)
+
+if TYPE_CHECKING:
+    from pages.login_page import LoginPage
+    from pages.results_page import ResultsPage
+    from utils.browser import Browser
+    from utils.http_client import HttpClient
+    from utils.deadline import Deadline
+    from utils.scheduler import PollScheduler
+
+class CheckOutcome(Enum):
+    SUCCESS = "success"
+    # The run ended on purpose (contact alert sent, deadline passed); another engine must not retry it
+    STOPPED = "stopped"
+    # The engine itself failed, e.g. a transport or parse error, so another engine may do better
+    FAILED = "failed"
 
 def validate_env_variables():
     required_vars = {
         'USERNAME': USERNAME,
-        'PASSWORD': PASSWORD,
-        'NTFY_TOPIC': NTFY_TOPIC
+        'PASSWORD': PASSWORD
     }
+    # Settings each notifier backend needs
+    notifier_vars = {
+        'ntfy': {'NTFY_TOPIC': NTFY_TOPIC},
+        'webhook': {'WEBHOOK_URL': WEBHOOK_URL},
+        'email': {'SMTP_HOST': SMTP_HOST, 'EMAIL_TO': ",".join(EMAIL_TO)}
+    }
+    unknown_notifiers = [name for name in NOTIFIERS if name not in notifier_vars]
+    if not NOTIFIERS or unknown_notifiers:
+        logger.error("NOTIFIERS must list any of %s, got: %s", ", ".join(notifier_vars), ",".join(NOTIFIERS))
+        return False
+    for name in NOTIFIERS:
+        required_vars.update(notifier_vars[name])
     
     missing_vars = []
     
@@ -26,21 +65,53 @@ def validate_env_variables():
     if missing_vars:
         logger.error("Missing or empty required environment variables:")
         for var in missing_vars:
-            logger.error(f"- {var}")
+            logger.error("- %s", var)
         return False
     
     # Validate HEADLESS value
     headless_value = HEADLESS_RAW_VALUE.lower()
     if headless_value not in ["true", "false"]:
-        logger.error(f"HEADLESS environment variable must be 'true' or 'false', got: {headless_value}")
+        logger.error("HEADLESS environment variable must be 'true' or 'false', got: %s", headless_value)
+        return False
+
+    if ENGINE not in ["selenium", "http"]:
+        logger.error("ENGINE environment variable must be 'selenium' or 'http', got: %s", ENGINE)
         return False
     
     return True
 
-def initialize_browser() -> Optional[Browser]:
+def check_portal_health() -> bool:
+    """Probe the portal over plain HTTP before paying for browser startup"""
+    from utils.portal_health import PortalProbe, CircuitBreaker
+
+    breaker = CircuitBreaker()
+    if not breaker.allow_request():
+        logger.info("Circuit breaker open after %s, next portal check in %.0f seconds",
+                    breaker.state["last_reason"], breaker.seconds_until_retry())
+        logger.log_metric("run_skipped", 1, {"reason": "circuit_open"})
+        return False
+
+    result = PortalProbe().probe()
+    metrics.observe("portal_probe", result.latency)
+    logger.log_metric("portal_probe", 1, {
+        "status": result.status,
+        "reason": result.reason,
+        "latency": round(result.latency, 3)
+    })
+    if result.healthy:
+        breaker.record_success()
+        return True
+
+    breaker.record_failure(result.reason)
+    logger.log_metric("run_skipped", 1, {"reason": f"portal_{result.reason}"})
+    return False
+
+def initialize_browser(deadline: Optional["Deadline"] = None) -> Optional["Browser"]:
     """Initialize browser with proper error handling"""
+    from utils.browser import Browser
+
     try:
-        return Browser()
+        return Browser(deadline)
     except Exception as e:
         logger.log_error_with_context(e, {
             "operation": "browser_initialization",
@@ -48,75 +119,486 @@ def initialize_browser() -> Optional[Browser]:
         })
         return None
 
-def run_exam_check(browser: Browser) -> bool:
-    """Main workflow for checking exam results"""
-    start_time = datetime.now()
+@tracer.traced("run_exam_check")
+def run_exam_check(browser: "Browser", deadline: Optional["Deadline"] = None) -> CheckOutcome:
+    """Main workflow for checking exam results with the Selenium engine"""
+    from pages.login_page import LoginPage
+    from pages.results_page import ResultsPage
+    from utils.deadline import Deadline
+
+    deadline = deadline or Deadline()
+    return check_exam_results(LoginPage(browser, deadline), ResultsPage(browser, deadline), deadline)
+
+@tracer.traced("run_http_exam_check")
+def run_http_exam_check(client: "HttpClient", deadline: Optional["Deadline"] = None) -> CheckOutcome:
+    """Main workflow for checking exam results with the browser-free HTTP engine"""
+    from pages.http_login_page import HttpLoginPage
+    from pages.http_results_page import HttpResultsPage
+    from utils.deadline import Deadline
+
+    deadline = deadline or Deadline()
+    return check_exam_results(HttpLoginPage(client, deadline), HttpResultsPage(client, deadline), deadline)
+
+def check_exam_results(login_page: "LoginPage", results_page: "ResultsPage",
+                       deadline: "Deadline") -> CheckOutcome:
+    """
+    Log in, read the results and notify about new ones using the given engine's pages.
+
+    Returns:
+        CheckOutcome: FAILED only when the engine failed, the one outcome worth retrying with another engine
+    """
+    from pages.login_page import InvalidCredentialsError
+    from utils.deadline import DeadlineExceeded
+    from utils.notify import Notification
+
+    start_time = time.perf_counter()
     try:
         # Login Process
         logger.info("Starting login process")
-        login_page = LoginPage(browser)
-        if not login_page.login():
+        login_succeeded = login_page.login()
+        memory.checkpoint("login")
+        if not login_succeeded:
             logger.info("Exiting due to alert notification")
-            return False
+            return CheckOutcome.STOPPED
 
         # Results Process
         logger.info("Starting results check process")
-        results_page = ResultsPage(browser)
-        results_page.navigate_to_results_page()
-        
-        # Get and process results
-        logger.info("Retrieving exam results")
-        new_results = results_page.get_results()
+        with profiling.stage("results"):
+            results_page.navigate_to_results_page()
+
+            # Get and process results
+            logger.info("Retrieving exam results")
+            new_results = results_page.get_results()
+        memory.checkpoint("results")
 
         # Notify if new results found
         if new_results:
-            logger.info(f"Found {len(new_results)} new results, sending notifications")
-            notification = Notification()
-            notification.notify_new_results(new_results)
+            logger.info("Found %s new results, sending notifications", len(new_results))
+            notification = Notification(deadline)
+            delivered = notification.notify_new_results(new_results)
+            if delivered:
+                results_page.database.record_notifications(delivered)
+            memory.checkpoint("notify")
         else:
             logger.info("No new results found")
 
-        return True
+        return CheckOutcome.SUCCESS
 
+    except InvalidCredentialsError:
+        # No engine can recover from this, let the caller stop
+        raise
+    except DeadlineExceeded as e:
+        logger.warning("Run cancelled: %s", e)
+        logger.log_metric("run_cancelled", 1, {"reason": "deadline"})
+        return CheckOutcome.STOPPED
     except Exception as e:
         logger.log_error_with_context(e, {
             "operation": "exam_check",
             "component": "main"
         })
-        return False
+        return CheckOutcome.FAILED
     finally:
+        results_page.close()
         logger.log_operation_time("exam_check_total", start_time)
 
-def main():
-    """Main entry point of the application"""
-    total_start_time = datetime.now()
-    
+def load_scheduler() -> "PollScheduler":
+    """Build the polling scheduler from the stored publication history"""
+    from utils.scheduler import PollScheduler, parse_created_at
+    from utils.database import Database
+
+    with Database() as database:
+        timestamps = [parse_created_at(value) for value in database.get_result_timestamps()]
+    return PollScheduler(timestamps)
+
+def export_metrics() -> None:
+    """Write the Prometheus textfile and JSON summary of the metrics recorded so far"""
     try:
-        # Validate environment variables
-        if not validate_env_variables():
-            sys.exit(1)
+        metrics.export(METRICS_TEXTFILE, METRICS_JSON_FILE)
+    except OSError as e:
+        logger.log_error_with_context(e, {
+            "operation": "export_metrics",
+            "textfile": METRICS_TEXTFILE,
+            "json_file": METRICS_JSON_FILE
+        })
+
+def export_trace() -> None:
+    """Write the spans of the run to a trace file and start a new trace"""
+    try:
+        path = tracer.export(TRACES_FOLDER, TRACE_FORMAT, TRACE_RETENTION)
+        if path:
+            logger.info("Trace written to %s", path)
+    except OSError as e:
+        logger.log_error_with_context(e, {
+            "operation": "export_trace",
+            "folder": TRACES_FOLDER
+        })
+    finally:
+        tracer.reset()
+
+def run_once(daemon: bool = False) -> int:
+    """
+    Run a single guarded exam check and export its metrics.
+
+    Args:
+        daemon (bool): The run is one of a daemon's, which must outlive it
+
+    Returns:
+        int: Process exit status for the run
+    """
+    start_time = time.perf_counter()
+    status = 1
+    memory.start_run()
+    memory.checkpoint("start")
+    try:
+        with tracer.span("run", engine=ENGINE), profiling.stage("run"):
+            status = run_guarded_check(daemon)
+        return status
+    finally:
+        metrics.increment("runs", 1, {"status": "success" if status == 0 else "failure"})
+        metrics.set_gauge("last_run_timestamp_seconds", time.time())
+        metrics.set_gauge("last_run_exit_status", status)
+        logger.log_operation_time("run", start_time)
+        memory.checkpoint("end")
+        export_metrics()
+        export_trace()
+
+def start_captcha_warm_up() -> Optional[threading.Thread]:
+    """
+    Load the OCR model in the background while the browser starts and the login page loads.
+
+    The first captcha joins it: get_pipe() waits for a load in progress and the
+    captcha service answers once its model is loaded.
+    """
+    if not CAPTCHA_WARM_UP:
+        return None
+
+    def warm_up() -> None:
+        # Importing the solver pulls in OpenCV, which is worth doing off the main thread too
+        from utils.captcha_solver import warm_up
+
+        warm_up()
+
+    context = contextvars.copy_context()
+    thread = threading.Thread(target=context.run, args=(warm_up,), name="captcha-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+def run_guarded_check(daemon: bool = False) -> int:
+    """
+    Run a single exam check behind the run lock, portal probe and deadline.
+
+    Args:
+        daemon (bool): Only kill the browser when the deadline passes instead of
+            terminating the process, which is the daemon's
+
+    Returns:
+        int: Process exit status for the run
+    """
+    from utils.run_lock import RunLock
+    from utils.deadline import Deadline, Watchdog
+    from utils.http_client import HttpClient
+    from utils.scheduler import save_last_run
+
+    run_lock = RunLock(LOCK_FILE)
+    try:
+        # Make sure only one run is in flight at a time
+        if not run_lock.acquire(LOCK_WAIT):
+            logger.info("Another run holds %s, skipping this one", LOCK_FILE)
+            logger.log_metric("run_skipped", 1, {"reason": "lock_held"})
+            # Count the attempt, or a daemon would retry back-to-back until the lock frees
+            save_last_run()
+            return 0
+
+        # Skip the run cheaply if the circuit breaker is open or the portal is down or in maintenance
+        healthy = check_portal_health()
+        save_last_run()
+        if not healthy:
+            return 0
+
+        deadline = Deadline(RUN_TIMEOUT)
+        memory.deadline = deadline
+        start_captcha_warm_up()
+
+        if ENGINE == "http":
+            with HttpClient(deadline) as client:
+                outcome = run_http_exam_check(client, deadline)
+            if outcome != CheckOutcome.FAILED:
+                return 0 if outcome == CheckOutcome.SUCCESS else 1
+            logger.warning("HTTP engine failed, falling back to Selenium")
+            logger.log_metric("engine_fallback", 1, {"from": "http", "to": "selenium"})
 
         # Initialize browser
-        browser = initialize_browser()
+        browser = initialize_browser(deadline)
         if not browser:
             logger.error("Failed to initialize browser")
-            sys.exit(1)
+            return 1
+        memory.checkpoint("browser_start")
+
+        # Kill the browser if the run outlives its deadline
+        watchdog = Watchdog(deadline, browser.kill_process_tree, terminate=not daemon)
+        watchdog.start()
 
         # Run main workflow
-        with browser:
-            success = run_exam_check(browser)
-            
-        # Exit with appropriate status
-        sys.exit(0 if success else 1)
+        try:
+            with browser:
+                outcome = run_exam_check(browser, deadline)
+        finally:
+            watchdog.cancel()
+
+        return 0 if outcome == CheckOutcome.SUCCESS else 1
+    finally:
+        run_lock.release()
+
+def run_daemon() -> None:
+    """Keep polling on the adaptive schedule until interrupted"""
+    from utils.metrics import MetricsServer
+
+    logger.info("Starting daemon mode")
+    if METRICS_PORT:
+        # Histograms accumulate across runs for as long as the daemon lives
+        server = MetricsServer(metrics, METRICS_PORT)
+        server.start()
+        logger.info("Serving metrics at http://127.0.0.1:%s/metrics", METRICS_PORT)
+    while True:
+        next_run = load_scheduler().next_run_at()
+        wait_seconds = (next_run - datetime.now()).total_seconds()
+        if wait_seconds > 0:
+            logger.info("Next check scheduled at %s", next_run.strftime("%Y-%m-%d %H:%M"))
+            time.sleep(wait_seconds)
+        try:
+            run_once(daemon=True)
+        except Exception as e:
+            logger.log_error_with_context(e, {
+                "operation": "daemon_run",
+                "component": "main"
+            })
+
+def command_run(args: argparse.Namespace) -> int:
+    """Check for new results once, on the adaptive schedule or continuously"""
+    total_start_time = time.perf_counter()
+    logger.print_banner()
+    if args.profile:
+        profiling.enabled = True
+        profiling.stages = {stage.strip() for stage in args.profile.split(",")}
+    try:
+        if not validate_env_variables():
+            return 1
+
+        if args.daemon:
+            run_daemon()
+
+        if args.gate and not load_scheduler().should_run():
+            logger.info("Adaptive schedule says no poll is due yet, skipping")
+            return 0
+
+        return run_once()
+    finally:
+        logger.log_operation_time("total_execution", total_start_time)
+
+def command_simulate_schedule(args: argparse.Namespace) -> int:
+    """Replay stored publication times and compare adaptive and fixed polling"""
+    from utils.scheduler import parse_created_at, simulate
+    from utils.database import Database
+
+    with Database() as database:
+        timestamps = [parse_created_at(value) for value in database.get_result_timestamps()]
+    print(json.dumps(simulate(timestamps), indent=2))
+    return 0
+
+def command_export_events(args: argparse.Namespace) -> int:
+    """Stream the result events after a cursor to stdout as JSON Lines"""
+    from utils.database import Database
+
+    # stdout carries the events
+    logger.console_stream = sys.stderr
+    after = args.after
+    if args.cursor_file and os.path.exists(args.cursor_file):
+        with open(args.cursor_file, encoding="utf-8") as f:
+            after = int(f.read().strip() or 0)
+
+    exported = 0
+    with Database() as database:
+        for event in database.iter_events(after, args.type):
+            sys.stdout.write(json.dumps(event, ensure_ascii=False) + "\n")
+            after = event["seq"]
+            exported += 1
+    sys.stdout.flush()
+
+    if args.cursor_file:
+        temp_file = f"{args.cursor_file}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            f.write(str(after))
+        os.replace(temp_file, args.cursor_file)
+    logger.info("Exported %s events, cursor is now %s", exported, after)
+    return 0
+
+def command_results(args: argparse.Namespace) -> int:
+    """Print stored results per course or per term from the precomputed summaries"""
+    from utils.database import Database
+    from utils.report import format_rows
+
+    # stdout carries the report
+    logger.console_stream = sys.stderr
+    with Database() as database:
+        if args.view == "terms":
+            rows = database.get_term_summaries()
+        else:
+            rows = database.get_course_summaries(args.term, args.missing_final)
+    print(format_rows(rows, args.format))
+    return 0
+
+def command_reparse(args: argparse.Namespace) -> int:
+    """Run the current parsers over the stored grid snapshots and compare with the database"""
+    from utils.database import Database
+    from utils.snapshots import SnapshotStore, latest_results
+    from utils.score_parser import is_revised
+    from utils.report import format_rows
+
+    logger.console_stream = sys.stderr
+    with Database() as database:
+        store = SnapshotStore(database)
+        snapshots = database.get_snapshots(args.term)
+        started = time.perf_counter()
+        parsed = store.reparse(snapshots, args.workers)
+        elapsed = time.perf_counter() - started
+        results = latest_results(snapshots, parsed)
 
+        missing, changed = [], []
+        for result in results:
+            stored = database.get_stored_result(result.lesson_id, result.exam_type, result.term)
+            if stored is None:
+                missing.append(result)
+            elif is_revised(stored, result.score, result.grade):
+                changed.append({"term": result.term, "lesson_id": result.lesson_id, "exam_type": result.exam_type,
+                                "stored_score": stored[0], "stored_grade": stored[1],
+                                "parsed_score": result.score, "parsed_grade": result.grade})
+        if args.backfill and missing:
+            stored_count = database.insert_results(missing)
+            logger.info("Backfilled %s results from snapshots", stored_count)
+
+    rate = len(snapshots) / elapsed if elapsed > 0 else 0.0
+    print(f"Re-parsed {len(snapshots)} snapshots with up to {args.workers} worker(s) in {elapsed:.2f} s "
+          f"({rate:.1f} snapshots/s), {sum(len(rows) for rows in parsed)} results, {len(results)} distinct")
+    print(f"Missing from the database: {len(missing)}{' (backfilled)' if args.backfill and missing else ''}, "
+          f"different from the database: {len(changed)}")
+    if missing:
+        print(format_rows([{"term": result.term, "lesson_id": result.lesson_id, "exam_type": result.exam_type,
+                            "score": result.score, "grade": result.grade} for result in missing]))
+    if changed:
+        print(format_rows(changed))
+    return 1 if args.verify and (changed or (missing and not args.backfill)) else 0
+
+def command_check_config(args: argparse.Namespace) -> int:
+    """Validate the environment variables without running a check"""
+    if not validate_env_variables():
+        return 1
+    print(f"Configuration OK (engine: {ENGINE}, notifiers: {', '.join(NOTIFIERS)})")
+    return 0
+
+def command_test_notification(args: argparse.Namespace) -> int:
+    """Send a test message through every configured notifier"""
+    from utils.notify import Notification, TEST_TITLE
+
+    if not validate_env_variables():
+        return 1
+    Notification().send_alert(args.message, title=TEST_TITLE)
+    return 0
+
+def command_captcha_service(args: argparse.Namespace) -> int:
+    """Load the OCR model once and read captchas for every run on this host"""
+    from utils.captcha_service import serve
+
+    return serve()
+
+# Options of the run command that older cron entries pass without a command
+LEGACY_OPTIONS = {"--gate", "--daemon", "--profile"}
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    Parse the command line.
+
+    Without a command the run command is used, so "main.py" and "main.py --gate"
+    keep working; "--simulate-schedule" maps to the simulate-schedule command.
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv[:1] == ["--simulate-schedule"]:
+        argv[0] = "simulate-schedule"
+    elif not argv or argv[0].split("=")[0] in LEGACY_OPTIONS:
+        argv.insert(0, "run")
+
+    parser = argparse.ArgumentParser(description="Beykent exam result notifier")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="COMMAND")
+
+    run = commands.add_parser("run", help="Check for new exam results (default)")
+    mode = run.add_mutually_exclusive_group()
+    mode.add_argument("--gate", action="store_true",
+                      help="Only check if the adaptive schedule says a poll is due (for frequent cron entries)")
+    mode.add_argument("--daemon", action="store_true",
+                      help="Run continuously, polling on the adaptive schedule")
+    run.add_argument("--profile", nargs="?", const="run", metavar="STAGES",
+                     help="Profile the run, or the given comma-separated stages (run, login, captcha, results), "
+                          "into logs/profiles")
+    run.set_defaults(handler=command_run)
+
+    simulate_schedule = commands.add_parser(
+        "simulate-schedule", help="Replay stored publication times and compare adaptive and fixed polling")
+    simulate_schedule.set_defaults(handler=command_simulate_schedule)
+
+    export_events = commands.add_parser(
+        "export-events", help="Print result events (result_new, score_revised, notification_delivered) "
+                              "after a cursor as JSON Lines")
+    export_events.add_argument("--after", type=int, default=0, metavar="SEQ",
+                               help="Only events with a larger seq (default: all events)")
+    export_events.add_argument("--cursor-file", metavar="PATH",
+                               help="Read the cursor from this file if it exists and store the last seq in it")
+    export_events.add_argument("--type", action="append", metavar="TYPE", help="Only this event type (repeatable)")
+    export_events.set_defaults(handler=command_export_events)
+
+    results = commands.add_parser("results", help="Show stored results per course or term")
+    results.add_argument("--view", choices=["courses", "terms"], default="courses",
+                         help="Midterm/final breakdown per course (default) or averages per term")
+    results.add_argument("--term", help="Only this term, e.g. \"2024-2025 Güz\"")
+    results.add_argument("--missing-final", action="store_true",
+                         help="Only courses with neither a final nor a make-up score yet")
+    results.add_argument("--format", choices=["table", "json", "csv"], default="table")
+    results.set_defaults(handler=command_results)
+
+    reparse = commands.add_parser(
+        "reparse", help="Parse the stored grid snapshots again, without a browser, and compare with the database")
+    reparse.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Parser processes")
+    reparse.add_argument("--term", help="Only snapshots of this term")
+    reparse.add_argument("--backfill", action="store_true", help="Store results that are missing from the database")
+    reparse.add_argument("--verify", action="store_true",
+                         help="Exit with status 1 if the snapshots and the database disagree")
+    reparse.set_defaults(handler=command_reparse)
+
+    check_config = commands.add_parser("check-config", help="Validate the environment variables")
+    check_config.set_defaults(handler=command_check_config)
+
+    test_notification = commands.add_parser("test-notification", help="Send a test message through every configured notifier")
+    test_notification.add_argument("--message", default="Beykent sınav sonucu bildirimi test mesajı",
+                                   help="Message to send")
+    test_notification.set_defaults(handler=command_test_notification)
+
+    captcha_service = commands.add_parser(
+        "captcha-service", help="Serve captcha OCR for every run on this host (started on demand by runs)")
+    captcha_service.set_defaults(handler=command_captcha_service)
+
+    return parser.parse_args(argv)
+
+def main():
+    """Main entry point of the application"""
+    args = parse_args()
+    handler: Callable[[argparse.Namespace], int] = args.handler
+    try:
+        sys.exit(handler(args))
     except Exception as e:
         logger.log_error_with_context(e, {
             "operation": "main",
+            "command": args.command,
             "component": "main"
         })
         sys.exit(1)
-    finally:
-        logger.log_operation_time("total_execution", total_start_time)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
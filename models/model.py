@@ -1,8 +1,12 @@
 from dataclasses import dataclass
+from typing import Optional
 
 @dataclass
 class Result:
     lesson_id: str
     lesson_name: str
     exam_type: str
-    score: float
\ No newline at end of file
+    score: Optional[float]
+    term: str = ""
+    # Letter grades and status codes (e.g. "BA", "GR") that have no numeric score
+    grade: Optional[str] = None
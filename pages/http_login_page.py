@@ -0,0 +1,167 @@
+from pages.login_page import LoginPage, LoginFailure
+from utils.http_client import HttpClient
+from utils.html_document import HtmlDocument
+from utils.logger import logger
+from utils.deadline import Deadline
+from typing import Optional
+from urllib.parse import urljoin
+import requests
+import os
+import time
+from utils.constants import SCREENSHOTS_FOLDER
+
+class HttpLoginPage(LoginPage):
+    def __init__(self, client: HttpClient, deadline: Optional[Deadline] = None):
+        """
+        Log in by posting the ASP.NET login form directly, without a browser.
+
+        The login flow, retry policy and failure classification are inherited from
+        LoginPage; only the steps that touch the page are replaced.
+
+        Args:
+            client (HttpClient): Pooled HTTP client holding the session cookies
+            deadline (Optional[Deadline]): Run deadline
+        """
+        super().__init__(None, deadline)
+        self.client = client
+        self.page: Optional[HtmlDocument] = None
+        self.page_url = self.login_url
+        self.fields = {}
+        self.response: Optional[requests.Response] = None
+        self.home_page: Optional[HtmlDocument] = None
+
+    def load_form(self, html: str, url: str) -> None:
+        """Use the given login page as the form for the next submission"""
+        self.page = HtmlDocument(html)
+        self.page_url = url
+        self.fields = self.page.form_fields()
+
+    def field_name(self, locator: tuple) -> str:
+        """Get the posted name of the input with the locator's id"""
+        element = self.page.find_by_id(locator[1])
+        if element is None:
+            raise LookupError(f"Element #{locator[1]} not found on {self.page_url}")
+        return element.get("name") or locator[1]
+
+    def navigate_to_login_page(self):
+        start_time = time.perf_counter()
+        try:
+            logger.info("Loading login form")
+            response = self.client.get(self.login_url)
+            self.load_form(response.text, response.url)
+            self.field_name(self.username_input)
+            return True
+        except (requests.RequestException, LookupError) as e:
+            logger.log_error_with_context(e, {
+                "operation": "navigate_to_login",
+                "url": self.login_url
+            })
+            return False
+        finally:
+            logger.log_operation_time("navigate_to_login", start_time)
+
+    def enter_field(self, locator: tuple, text: str) -> None:
+        self.fields[self.field_name(locator)] = text
+
+    def get_captcha_image(self):
+        start_time = time.perf_counter()
+        try:
+            logger.info("Downloading captcha image")
+            image = self.page.find_by_id(self.captcha_image[1])
+            if image is None or not image.get("src"):
+                raise LookupError("Captcha image not found on login page")
+            response = self.client.get(urljoin(self.page_url, image.get("src")), referer=self.page_url)
+
+            if not os.path.exists(SCREENSHOTS_FOLDER):
+                os.makedirs(SCREENSHOTS_FOLDER)
+            with open(os.path.join(SCREENSHOTS_FOLDER, "captcha.png"), "wb") as f:
+                f.write(response.content)
+            return True
+        except Exception as e:
+            logger.log_error_with_context(e, {
+                "operation": "get_captcha_image",
+                "element": self.captcha_image
+            })
+            return False
+        finally:
+            logger.log_operation_time("get_captcha_image", start_time)
+
+    def click_login_button(self):
+        start_time = time.perf_counter()
+        try:
+            logger.info("Submitting login form")
+            fields = dict(self.fields)
+            button = self.page.find_by_id(self.login_button[1])
+            if button is not None and button.tag == "input" and button.get("name"):
+                # A submit input posts its own name and value
+                fields[button.get("name")] = button.get("value", "")
+            else:
+                # A LinkButton posts back through __doPostBack
+                target = button.get("name") if button is not None and button.get("name") else self.login_button[1]
+                fields["__EVENTTARGET"] = target
+                fields["__EVENTARGUMENT"] = ""
+
+            form = next(self.page.iter("form"), None)
+            action = urljoin(self.page_url, form.get("action", "")) if form is not None else self.page_url
+            self.response = self.client.post_form(action, fields, referer=self.page_url)
+            return True
+        except Exception as e:
+            logger.log_error_with_context(e, {
+                "operation": "click_login_button",
+                "button": self.login_button
+            })
+            return False
+        finally:
+            logger.log_operation_time("click_login_button", start_time)
+
+    def wait_for_login_outcome(self) -> Optional[LoginFailure]:
+        start_time = time.perf_counter()
+        try:
+            logger.info("Checking login response")
+            # Compare without the query string; the portal may drop or reorder it on redirect
+            if self.response.url.split("?")[0] == self.home_url.split("?")[0]:
+                self.home_page = HtmlDocument(self.response.text)
+                return None
+
+            # A rejected postback re-renders the login form with a fresh captcha
+            self.load_form(self.response.text, self.response.url)
+            message = self.page.find_by_id(self.error_message[1])
+            text = message.text() if message is not None else ""
+            failure = self.classify_error_message(text) if text else LoginFailure.UNKNOWN
+            logger.log_error_with_context(Exception("Login rejected"), {
+                "operation": "wait_for_login_outcome",
+                "url": self.response.url,
+                "message": text,
+                "failure": failure.value
+            })
+            return failure
+        except Exception as e:
+            logger.log_error_with_context(e, {
+                "operation": "wait_for_login_outcome"
+            })
+            return LoginFailure.UNKNOWN
+        finally:
+            logger.log_operation_time("wait_for_login_outcome", start_time)
+
+    def check_alert(self):
+        start_time = time.perf_counter()
+        try:
+            logger.info("Checking alert")
+            frame = self.home_page.find_by_id("IFRAME1") if self.home_page else None
+            if frame is None or not frame.get("src"):
+                logger.info("No contact information alert found")
+                return False
+            response = self.client.get(urljoin(self.home_url, frame.get("src")), referer=self.home_url)
+            if HtmlDocument(response.text).find_by_id("divRequired") is None:
+                logger.info("No contact information alert found")
+                return False
+            self.send_contact_alert()
+            return True
+        except Exception as e:
+            logger.log_error_with_context(e, {
+                "operation": "check_alert",
+                "frame": "IFRAME1"
+            })
+            return False
+        finally:
+            logger.log_operation_time("check_alert", start_time)
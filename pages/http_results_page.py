@@ -0,0 +1,89 @@
+from pages.results_page import ResultsPage, Row
+from utils.http_client import HttpClient
+from utils.html_document import HtmlDocument
+from utils.logger import logger
+from utils.deadline import Deadline
+from utils.tracing import tracer
+from models.model import Result
+from typing import List, Optional
+from urllib.parse import urljoin
+import re
+import time
+from utils.constants import HOME_URL, RESULTS_FRAME_URL, RESULTS_PAGE_LOCATORS
+
+# Menu links open pages through javascript, e.g. onclick="menu_close(this,'start.aspx?gkm=...')"
+PAGE_URL_PATTERN = re.compile(r"""['"]([^'"]+\.aspx[^'"]*)['"]""")
+
+class HttpResultsPage(ResultsPage):
+    def __init__(self, client: HttpClient, deadline: Optional[Deadline] = None):
+        """
+        Read the grades grid over plain HTTP using the session of an HttpLoginPage.
+
+        Args:
+            client (HttpClient): Logged-in HTTP client
+            deadline (Optional[Deadline]): Run deadline
+        """
+        super().__init__(None, deadline)
+        self.client = client
+        self.page_html = ""
+        self.page_url = RESULTS_FRAME_URL
+        self.results_menu_text = RESULTS_PAGE_LOCATORS["results_menu_text"]
+        self.results_url = RESULTS_FRAME_URL
+
+    @tracer.traced("results.navigate_to_results_page")
+    def navigate_to_results_page(self) -> None:
+        """Find the grades page URL in the home page menu"""
+        start_time = time.perf_counter()
+        try:
+            self.deadline.check("navigate_to_results_page")
+            logger.info("Looking up results page in menu")
+            home = HtmlDocument(self.client.get(HOME_URL).text)
+            for link in home.iter("a"):
+                if link.text() != self.results_menu_text:
+                    continue
+                for attribute in ("href", "onclick"):
+                    match = PAGE_URL_PATTERN.search(link.get(attribute, ""))
+                    if match:
+                        self.results_url = urljoin(HOME_URL, match.group(1))
+                        break
+                break
+            else:
+                logger.warning("Results menu link not found, using %s", self.results_url)
+            logger.info("Results page URL: %s", self.results_url)
+        except Exception as e:
+            logger.log_error_with_context(e, {
+                "operation": "navigate_to_results_page",
+                "menu_text": self.results_menu_text
+            })
+            raise
+        finally:
+            logger.log_operation_time("navigate_to_results", start_time)
+
+    @tracer.traced("results.read_table_rows")
+    def read_table_rows(self) -> List[Row]:
+        """Fetch the grades page and read the rows of its grid"""
+        response = self.client.get(self.results_url, referer=HOME_URL)
+        self.page_html, self.page_url = response.text, response.url
+        return self.html_table_rows(self.page_html)
+
+    def results_page_source(self) -> tuple[str, str]:
+        return self.page_html, self.page_url
+
+    def term_client(self) -> HttpClient:
+        return self.client.clone()
+
+    @tracer.traced("results.get_results")
+    def get_results(self) -> List[Result]:
+        """Main method to get all new results"""
+        start_time = time.perf_counter()
+        try:
+            self.deadline.check("get_results")
+            new_results = self.process_results_table()
+            return self.results_to_notify(new_results)
+        except Exception as e:
+            logger.log_error_with_context(e, {
+                "operation": "get_results"
+            })
+            raise
+        finally:
+            logger.log_operation_time("get_results", start_time)
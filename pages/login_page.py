@@ -1,18 +1,38 @@
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from utils.browser import Browser
 from utils.captcha_solver import CaptchaSolver
+from utils.captcha_cache import CaptchaCache
 from utils.logger import logger
 from utils.notify import Notification
-from datetime import datetime
+from utils.deadline import Deadline
+from utils.tracing import tracer
+from utils.profiling import profiling
+from typing import Callable, Optional
+from enum import Enum
 from selenium.common.exceptions import (TimeoutException,WebDriverException)
-from utils.constants import USERNAME, PASSWORD, LOGIN_URL, HOME_URL, LOGIN_PAGE_LOCATORS
+from utils.constants import (USERNAME, PASSWORD, LOGIN_URL, HOME_URL, LOGIN_PAGE_LOCATORS,
+                             LOGIN_ERROR_KEYWORDS, SCREENSHOTS_FOLDER, CAPTCHA_CACHE, CAPTCHA_CORPUS,
+                             CAPTCHA_CORPUS_FOLDER)
+import random
+import shutil
+import os
 import time
 
+class LoginFailure(Enum):
+    WRONG_CAPTCHA = "wrong_captcha"
+    UNREADABLE_CAPTCHA = "unreadable_captcha"
+    WRONG_CREDENTIALS = "wrong_credentials"
+    TIMEOUT = "timeout"
+    STEP_FAILED = "step_failed"
+    UNKNOWN = "unknown"
+
+class InvalidCredentialsError(Exception):
+    """Raised when the portal rejects the username or password; retrying would not help"""
+
 class LoginPage:
-    def __init__(self, browser: Browser):
+    def __init__(self, browser: Browser, deadline: Optional[Deadline] = None):
         self.browser = browser
+        self.deadline = deadline or Deadline()
 
         self.username = USERNAME
         self.password = PASSWORD
@@ -25,17 +45,21 @@ class LoginPage:
         self.captcha_image = LOGIN_PAGE_LOCATORS["captcha_image"]
         self.captcha_input = LOGIN_PAGE_LOCATORS["captcha_input"]
         self.login_button = LOGIN_PAGE_LOCATORS["login_button"]
+        self.error_message = LOGIN_PAGE_LOCATORS["error_message"]
+
+        # Answers of captchas seen before, and the captcha of the current attempt
+        self.captcha_cache = CaptchaCache() if CAPTCHA_CACHE else None
+        self.captcha_key: Optional[str] = None
+        self.captcha_answer: Optional[int] = None
+        self.captcha_from_cache = False
 
     def navigate_to_login_page(self):
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         try:
             logger.info("Navigating to login page")
-            self.browser.driver.set_page_load_timeout(5)
+            self.browser.driver.set_page_load_timeout(self.deadline.clamp(5))
             self.browser.go_to_url(self.login_url)
-            wait = WebDriverWait(self.browser.driver, 3)
-            wait.until(
-                EC.presence_of_element_located(self.username_input)
-            )
+            self.browser.find_element(*self.username_input, timeout=3)
             return True
         except TimeoutException:
             logger.log_error_with_context(TimeoutException(f"Timeout while navigating to {self.login_url}"), {
@@ -52,11 +76,15 @@ class LoginPage:
         finally:
             logger.log_operation_time("navigate_to_login", start_time)
 
+    def enter_field(self, locator: tuple, text: str) -> None:
+        """Type text into the form field identified by the locator"""
+        self.browser.enter_text(locator[0], locator[1], text)
+
     def enter_username(self):
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         try:
             logger.info("Entering username")
-            self.browser.enter_text(self.username_input[0], self.username_input[1], self.username)
+            self.enter_field(self.username_input, self.username)
             return True
         except Exception as e:
             logger.log_error_with_context(e, {
@@ -68,10 +96,10 @@ class LoginPage:
             logger.log_operation_time("enter_username", start_time)
 
     def enter_password(self):
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         try:
             logger.info("Entering password")
-            self.browser.enter_text(self.password_input[0], self.password_input[1], self.password)
+            self.enter_field(self.password_input, self.password)
             return True
         except Exception as e:
             logger.log_error_with_context(e, {
@@ -83,7 +111,7 @@ class LoginPage:
             logger.log_operation_time("enter_password", start_time)
 
     def get_captcha_image(self):
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         try:
             logger.info("Getting captcha image")
             self.browser.take_screenshot_element(self.captcha_image[0], self.captcha_image[1], filename="captcha.png")
@@ -98,13 +126,21 @@ class LoginPage:
             logger.log_operation_time("get_captcha_image", start_time)
 
     def calculate_captcha(self):
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         try:
             logger.info("Calculating captcha")
-            solver = CaptchaSolver("data/screenshots/captcha.png")
-            result = solver.solve_captcha()
-            logger.info(f"Captcha solution: {result}")
-            self.browser.enter_text(self.captcha_input[0], self.captcha_input[1], result)
+            self.captcha_key = None
+            with profiling.stage("captcha"):
+                solver = CaptchaSolver(os.path.join(SCREENSHOTS_FOLDER, "captcha.png"), self.captcha_cache,
+                                       deadline=self.deadline)
+                result = solver.solve_captcha()
+            self.captcha_key = solver.image_hash
+            self.captcha_answer = result
+            self.captcha_from_cache = solver.from_cache
+            logger.info("Captcha solution: %s", result)
+            if result is None:
+                return False
+            self.enter_field(self.captcha_input, str(result))
             return True
         except Exception as e:
             logger.log_error_with_context(e, {
@@ -116,13 +152,11 @@ class LoginPage:
             logger.log_operation_time("calculate_captcha", start_time)
 
     def click_login_button(self):
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         try:
             logger.info("Clicking login button")
-            wait = WebDriverWait(self.browser.driver, 3)
-            button = wait.until(
-                EC.element_to_be_clickable(self.login_button)
-            )
+            button = self.browser.waiter.until_clickable(*self.login_button, 3)
+            self.browser.waiter.mark_document_stale()
             button.click()
             return True
         except Exception as e:
@@ -134,46 +168,94 @@ class LoginPage:
         finally:
             logger.log_operation_time("click_login_button", start_time)
 
-    def check_home_url(self):
-        start_time = datetime.now()
+    def wait_for_login_outcome(self) -> Optional[LoginFailure]:
+        """
+        Wait for whichever comes first: the home page or the portal's error message.
+
+        Returns:
+            Optional[LoginFailure]: None on success, otherwise the classified failure
+        """
+        start_time = time.perf_counter()
         try:
-            logger.info("Checking if redirected to home page")
-            current_url = self.browser.get_current_url()
-            logger.info(f"Current URL: {current_url}")
-            if current_url == self.home_url:
-                return True
-            logger.log_error_with_context(Exception("URL mismatch"), {
-                "operation": "check_home_url",
+            logger.info("Waiting for login outcome")
+            outcome, detail = self.browser.waiter.until_url_or_text(
+                self.home_url, *self.error_message, 10
+            )
+            if outcome == "url":
+                return None
+            failure = self.classify_error_message(detail)
+            logger.log_error_with_context(Exception("Login rejected"), {
+                "operation": "wait_for_login_outcome",
+                "message": detail,
+                "failure": failure.value
+            })
+            return failure
+        except TimeoutException:
+            logger.log_error_with_context(TimeoutException("Timeout while waiting for login outcome"), {
+                "operation": "wait_for_login_outcome",
                 "expected": self.home_url,
-                "actual": current_url
+                "actual": self.browser.get_current_url()
             })
-            return False
+            return LoginFailure.TIMEOUT
+        except Exception as e:
+            logger.log_error_with_context(e, {
+                "operation": "wait_for_login_outcome"
+            })
+            return LoginFailure.UNKNOWN
         finally:
-            logger.log_operation_time("check_home_url", start_time)
+            logger.log_operation_time("wait_for_login_outcome", start_time)
+
+    def classify_error_message(self, message: str) -> LoginFailure:
+        """
+        Classify the portal's login error message.
+
+        Args:
+            message (str): The text of the error message element
+
+        Returns:
+            LoginFailure: The failure the message describes
+        """
+        lowered = message.lower()
+        # Captcha messages are checked first, they often also say "hatalı"
+        for failure in (LoginFailure.WRONG_CAPTCHA, LoginFailure.WRONG_CREDENTIALS):
+            if any(keyword in lowered for keyword in LOGIN_ERROR_KEYWORDS[failure.value]):
+                return failure
+        return LoginFailure.UNKNOWN
+
+    def backoff_delay(self, transient_failures: int) -> float:
+        """
+        Get how long to wait before reloading the page after a transient failure.
+
+        The delay doubles with each consecutive transient failure, with jitter, and
+        never exceeds the time left in the run.
+
+        Args:
+            transient_failures (int): Number of consecutive timeouts/unknown failures
+
+        Returns:
+            float: Seconds to sleep
+        """
+        delay = min(0.5 * 2 ** (transient_failures - 1), 4.0)
+        return min(random.uniform(delay / 2, delay), self.deadline.remaining())
+
+    def send_contact_alert(self) -> None:
+        """Notify the user that the portal requires a contact information update"""
+        notification = Notification(self.deadline)
+        notification.send_alert("Lütfen iletişim bilgilerinizi güncelleyiniz. Güncellemediğiniz takdirde ileti sistemi çalışmayacaktır.")
+        logger.info("Contact information update alert detected and notification sent")
 
     def check_alert(self):
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         try:
             logger.info("Checking alert")
             self.browser.switch_to_frame("IFRAME1")
             try:
-                original_timeout = self.browser.driver.timeouts.implicit_wait
-                self.browser.driver.implicitly_wait(0)
-                
-                try:
-                    wait = WebDriverWait(self.browser.driver, 2, poll_frequency=0.2)
-                    alert = wait.until(
-                        EC.presence_of_element_located((By.ID, "divRequired"))
-                    )
-                    notification = Notification()
-                    notification.send_alert("Lütfen iletişim bilgilerinizi güncelleyiniz. Güncellemediğiniz takdirde ileti sistemi çalışmayacaktır.")
-                    logger.info("Contact information update alert detected and notification sent")
-                    return True
-                except TimeoutException:
-                    logger.info("No contact information alert found")
-                    return False
-                finally:
-                    self.browser.driver.implicitly_wait(original_timeout)
+                self.browser.waiter.until_present(By.ID, "divRequired", 2)
+                self.send_contact_alert()
+                return True
+            except TimeoutException:
+                logger.info("No contact information alert found")
+                return False
             finally:
                 self.browser.switch_to_default_content()
         except Exception as e:
@@ -185,40 +267,102 @@ class LoginPage:
         finally:
             logger.log_operation_time("check_alert", start_time)
 
+    def record_captcha_outcome(self, failure: Optional[LoginFailure]) -> None:
+        """Remember the answer of an accepted captcha, forget a cached answer that was rejected"""
+        if self.captcha_key is None or self.captcha_answer is None:
+            return
+        if failure is None and CAPTCHA_CORPUS:
+            self.save_to_corpus()
+        if self.captcha_cache is not None:
+            if failure is None:
+                self.captcha_cache.remember(self.captcha_key, self.captcha_answer)
+            elif failure == LoginFailure.WRONG_CAPTCHA and self.captcha_from_cache:
+                self.captcha_cache.invalidate(self.captcha_key)
+        self.captcha_key = None
+
+    def save_to_corpus(self) -> None:
+        """Keep an accepted captcha, named by its answer, for measuring the solver offline"""
+        try:
+            os.makedirs(CAPTCHA_CORPUS_FOLDER, exist_ok=True)
+            shutil.copyfile(os.path.join(SCREENSHOTS_FOLDER, "captcha.png"),
+                            os.path.join(CAPTCHA_CORPUS_FOLDER, f"{self.captcha_answer}-{self.captcha_key[:16]}.png"))
+        except OSError as e:
+            logger.log_error_with_context(e, {
+                "operation": "save_captcha_to_corpus",
+                "folder": CAPTCHA_CORPUS_FOLDER
+            })
+
+    def run_step(self, step: Callable):
+        """Run one login step inside its own trace span"""
+        with tracer.span(f"login.{step.__name__}"):
+            return step()
+
+    @tracer.traced("login")
     def login(self):
-        start_time = datetime.now()
+        with profiling.stage("login"):
+            return self._login()
+
+    def _login(self):
+        start_time = time.perf_counter()
         max_attempts = 3
         attempt = 1
+        transient_failures = 0
+        needs_page_load = True
         
         while attempt <= max_attempts:
-            logger.info(f"Login attempt {attempt}/{max_attempts}")
+            self.deadline.check("login attempt")
+            logger.info("Login attempt %s/%s", attempt, max_attempts)
             
-            steps = [
-                self.navigate_to_login_page,
+            # After a rejected captcha the portal re-renders the form with a fresh
+            # captcha, so only the form has to be filled in again
+            steps = [self.navigate_to_login_page] if needs_page_load else []
+            steps += [
                 self.enter_username,
                 self.enter_password,
                 self.get_captcha_image,
                 self.calculate_captcha,
-                self.click_login_button,
-                self.check_home_url
+                self.click_login_button
             ]
             
-            for step in steps:
-                if not step():
-                    logger.warning(f"Step '{step.__name__}' failed, retrying login process")
-                    attempt += 1
-                    time.sleep(3)
-                    break
-            else:
-                if self.check_alert():
+            with tracer.span("login.attempt", attempt=attempt) as span:
+                failed_step = next((step for step in steps if not self.run_step(step)), None)
+                if failed_step is None:
+                    failure = self.run_step(self.wait_for_login_outcome)
+                elif failed_step == self.calculate_captcha:
+                    failure = LoginFailure.UNREADABLE_CAPTCHA
+                else:
+                    logger.warning("Step '%s' failed", failed_step.__name__)
+                    failure = LoginFailure.STEP_FAILED
+                if span:
+                    span.set_attribute("outcome", failure.value if failure else "success")
+            self.record_captcha_outcome(failure)
+
+            if failure is None:
+                if self.run_step(self.check_alert):
                     logger.info("Alert found - exiting after notification")
                     return False
                 logger.info("Login successful")
                 logger.log_operation_time("login_total", start_time)
                 return True
+
+            if failure == LoginFailure.WRONG_CREDENTIALS:
+                logger.error("Portal rejected the username or password, not retrying", exc_info=False)
+                raise InvalidCredentialsError("Wrong username or password")
+
+            attempt += 1
+            logger.warning("Login attempt failed: %s", failure.value)
+            if failure == LoginFailure.WRONG_CAPTCHA:
+                needs_page_load = False
+                transient_failures = 0
+            elif failure == LoginFailure.UNREADABLE_CAPTCHA:
+                # Reload right away for a new captcha image
+                needs_page_load = True
+                transient_failures = 0
+            else:
+                needs_page_load = True
+                transient_failures += 1
+                if attempt <= max_attempts:
+                    time.sleep(self.backoff_delay(transient_failures))
                 
-            if attempt > max_attempts:
-                logger.error("Max login attempts reached")
-                raise Exception("Failed to login after maximum attempts")
-            
-        return False
+        logger.error("Max login attempts reached")
+        raise Exception("Failed to login after maximum attempts")
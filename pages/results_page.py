@@ -1,31 +1,59 @@
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import NoSuchElementException
 from utils.browser import Browser
+from utils.http_client import HttpClient
+from utils.html_document import HtmlDocument
+from utils.grade_grid import Row, read_grid_rows
 from utils.logger import logger
 from utils.database import Database
+from utils.snapshots import SnapshotStore
+from utils.deadline import Deadline
+from utils.score_parser import ScoreParser, is_revised
+from utils.tracing import tracer
 from models.model import Result
-from typing import List
-from datetime import datetime
-from utils.constants import RESULTS_PAGE_LOCATORS
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+from urllib.parse import urljoin
+import time
+from utils.constants import RESULTS_PAGE_LOCATORS, SCRAPE_ALL_TERMS, TERM_SCRAPE_WORKERS, SNAPSHOTS
+
+# A result whose score changed, with its previously stored score and grade
+Revision = Tuple[Result, Optional[float], Optional[str]]
 
 class ResultsPage:
-    def __init__(self, browser: Browser):
+    def __init__(self, browser: Browser, deadline: Optional[Deadline] = None):
         self.browser = browser
+        self.deadline = deadline or Deadline()
         self.database = Database()
+        self.snapshots = SnapshotStore(self.database) if SNAPSHOTS else None
         
         # Locators
         self.menu_button = RESULTS_PAGE_LOCATORS["menu_button"]
         self.results_page_button = RESULTS_PAGE_LOCATORS["results_page_button"]
         self.results_table = RESULTS_PAGE_LOCATORS["results_table"]
         self.results_frame = RESULTS_PAGE_LOCATORS["results_frame"]
+        self.results_table_id = RESULTS_PAGE_LOCATORS["results_table"][1].split('"')[1]
+        self.term_select = RESULTS_PAGE_LOCATORS["term_select"]
+        self.score_parser = ScoreParser()
+        # Term shown by default, filled in while reading the grid
+        self.current_term = ""
+        self.scraped_terms: List[str] = []
+        self.revisions: List[Revision] = []
         
+    def close(self) -> None:
+        """Commit pending database writes and release the connections"""
+        self.database.close()
+
+    @tracer.traced("results.navigate_to_results_page")
     def navigate_to_results_page(self) -> None:
         """Navigate to the results page through the menu"""
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         try:
+            self.deadline.check("navigate_to_results_page")
             logger.info("Navigating to results menu")
-            self.browser.find_element(*self.menu_button).click()
-            self.browser.find_element(*self.results_page_button).click()
+            self.browser.click_element(*self.menu_button)
+            self.browser.click_element(*self.results_page_button)
         except Exception as e:
             logger.log_error_with_context(e, {
                 "operation": "navigate_to_results_page",
@@ -57,93 +85,253 @@ class ResultsPage:
             lesson_name = cells[2].text
             return lesson_id, lesson_name
         except (IndexError, NoSuchElementException) as e:
-            logger.error(f"Error extracting lesson info: {e}")
+            logger.error("Error extracting lesson info: %s", e)
             raise
             
-    def parse_score_cell(self, score_cell) -> List[Result]:
+    def collect_row_results(self, lesson_id: str, lesson_name: str, score_text: str, term: str = "") -> List[Result]:
         """
-        Parse the score cell and extract exam results
+        Extract the results in a row's score cell that are not stored yet.
+
+        Stored results whose score changed are added to self.revisions.
         
         Args:
-            score_cell: The cell containing exam scores
+            lesson_id (str): The lesson code
+            lesson_name (str): The lesson name
+            score_text (str): Text of the score cell
+            term (str): The academic term the row belongs to
             
         Returns:
-            List[Result]: List of new results found
+            List[Result]: New results found in the row
         """
-        results = []
-        score_spans = score_cell.find_elements(By.TAG_NAME, "span")
+        new_results = []
+        for parsed in self.score_parser.parse(score_text):
+            stored = self.database.get_stored_result(lesson_id, parsed.exam_type, term)
+            result = Result(lesson_id, lesson_name, parsed.exam_type, parsed.score, term, parsed.grade)
+            value = parsed.score if parsed.score is not None else parsed.grade
+            if stored is None:
+                new_results.append(result)
+                logger.info("New %s result found for %s %s: %s", parsed.exam_type, lesson_name, term, value)
+            elif is_revised(stored, parsed.score, parsed.grade):
+                self.revisions.append((result, *stored))
+                logger.info("Revised %s result found for %s %s: %s -> %s", parsed.exam_type, lesson_name, term,
+                            stored[0] if stored[0] is not None else stored[1], value)
+        return new_results
         
-        if not score_spans:
-            logger.info("No exam results found in cell")
-            return results
-            
-        for span in score_spans:
-            text = span.text.strip()
-            for exam_type, keyword in [
-                ("midterm", "Vize :"),
-                ("final", "Final :"),
-                ("make-up", "Büt :")
-            ]:
-                if keyword in text:
-                    score = float(text.split(":")[1].strip())
-                    if not self.database.check_if_result_exists(self.current_lesson_id, exam_type):
-                        results.append(Result(
-                            self.current_lesson_id,
-                            self.current_lesson_name,
-                            exam_type=exam_type,
-                            score=score
-                        ))
-        return results
-        
-    def process_results_table(self) -> List[Result]:
-        """Process the results table and extract all new results"""
-        start_time = datetime.now()
+    @tracer.traced("results.read_table_rows")
+    def read_table_rows(self) -> List[Row]:
+        """Read the rows of the grades grid shown in the results frame"""
+        table = self.browser.find_element(*self.results_table)
+        rows = table.find_elements(By.TAG_NAME, "tr")
+        table_rows = []
+
+        # Skip header row
+        for row_index, row in enumerate(rows[1:], 1):
+            try:
+                cells = row.find_elements(By.TAG_NAME, "td")
+                if len(cells) < 5:
+                    continue
+                lesson_id = cells[1].find_element(By.TAG_NAME, "span").text
+                table_rows.append((lesson_id, cells[2].text, cells[4].text))
+            except Exception as e:
+                logger.log_error_with_context(e, {
+                    "operation": "process_row",
+                    "row_index": row_index
+                })
+                continue
+        return table_rows
+
+    def results_page_source(self) -> tuple[str, str]:
+        """
+        Get the source and URL of the grades page, used to post back other terms.
+
+        Returns:
+            tuple: (html, url) of the document inside the results frame
+        """
+        return self.browser.driver.page_source, self.browser.driver.execute_script("return location.href;")
+
+    def term_client(self) -> HttpClient:
+        """Get an HTTP client in the logged-in session for fetching other terms"""
+        return HttpClient.from_browser(self.browser, self.deadline)
+
+    def html_table_rows(self, html: str) -> List[Row]:
+        """
+        Get the rows of the grades grid from a page source.
+
+        Args:
+            html (str): Source of the grades page
+
+        Returns:
+            List[Row]: Rows with at least five cells, header row excluded
+        """
+        return read_grid_rows(HtmlDocument(html), self.results_table_id)
+
+    def save_snapshot(self, term: str, document: HtmlDocument) -> None:
+        """
+        Store the grades grid of a term for offline re-parsing.
+
+        Failures are only logged; snapshots never fail a check.
+        """
+        if self.snapshots is None:
+            return
         try:
-            table = self.browser.find_element(By.XPATH, '//*[@id="grd_not_listesi"]')
-            rows = table.find_elements(By.TAG_NAME, "tr")
-            new_results = []
-            
-            # Add row count info
-            logger.info(f"Processing {len(rows)-1} rows from results table")
-            
-            # Skip header row
-            for row_index, row in enumerate(rows[1:], 1):
+            table = document.find_by_id(self.results_table_id)
+            if table is not None:
+                self.snapshots.save(term, document.outer_html(table))
+        except Exception as e:
+            logger.log_error_with_context(e, {
+                "operation": "save_snapshot",
+                "term": term
+            })
+
+    def term_options(self, document: HtmlDocument) -> tuple[Optional[str], str, List[str]]:
+        """
+        Read the term selector of the grades page.
+
+        Args:
+            document (HtmlDocument): The parsed grades page
+
+        Returns:
+            tuple: (select name, selected term, all terms); no name and no terms if
+            the page has no term selector
+        """
+        select = document.find_by_id(self.term_select[1])
+        if select is None:
+            return None, "", []
+        options = list(select.iter("option"))
+        terms = [option.get("value", option.text()) for option in options]
+        selected = next((option for option in options if "selected" in option.attrs), None)
+        current = selected.get("value", selected.text()) if selected is not None else (terms[0] if terms else "")
+        return select.get("name") or self.term_select[1], current, terms
+
+    def fetch_term(self, client: HttpClient, document: HtmlDocument, page_url: str,
+                   select_name: str, term: str) -> List[Row]:
+        """
+        Post the grades page back with another term selected and read its grid.
+
+        Args:
+            client (HttpClient): Client used only by the calling thread
+            document (HtmlDocument): The parsed grades page
+            page_url (str): URL of the grades page
+            select_name (str): Posted name of the term selector
+            term (str): The term to show
+
+        Returns:
+            List[Row]: Rows of the term's grid
+        """
+        start_time = time.perf_counter()
+        try:
+            self.deadline.check(f"fetch_term {term}")
+            form = next(document.iter("form"), None)
+            fields = document.form_fields(form)
+            # The selector posts back on change through __doPostBack
+            fields[select_name] = term
+            fields["__EVENTTARGET"] = select_name
+            fields["__EVENTARGUMENT"] = ""
+            action = urljoin(page_url, form.get("action", "")) if form is not None else page_url
+            term_document = HtmlDocument(client.post_form(action, fields, referer=page_url).text)
+            self.save_snapshot(term, term_document)
+            return read_grid_rows(term_document, self.results_table_id)
+        finally:
+            logger.log_operation_time("scrape_term", start_time, {"term": term})
+
+    @tracer.traced("results.scrape_other_terms")
+    def scrape_other_terms(self, html: str, page_url: str) -> Dict[str, List[Row]]:
+        """
+        Fetch the grids of every term except the one already shown, concurrently.
+
+        Each worker posts back from the same page with its own client, so the
+        requests run in parallel over copies of the session cookies.
+
+        Args:
+            html (str): Source of the grades page showing the default term
+            page_url (str): URL of the grades page
+
+        Returns:
+            Dict[str, List[Row]]: Rows per term; terms that failed are left out
+        """
+        start_time = time.perf_counter()
+        document = HtmlDocument(html)
+        select_name, self.current_term, terms = self.term_options(document)
+        other_terms = [term for term in terms if term != self.current_term]
+        if not other_terms:
+            return {}
+
+        logger.info("Scraping %s other terms", len(other_terms))
+        term_rows = {}
+        client = self.term_client()
+        try:
+            def fetch(term: str) -> List[Row]:
+                term_client = client.clone()
+                try:
+                    with tracer.span("results.fetch_term", term=term):
+                        return self.fetch_term(term_client, document, page_url, select_name, term)
+                finally:
+                    term_client.close()
+
+            with ThreadPoolExecutor(max_workers=max(TERM_SCRAPE_WORKERS, 1)) as executor:
+                # Run each fetch in a copy of this context so its spans nest under this one
+                futures = {term: executor.submit(contextvars.copy_context().run, fetch, term)
+                           for term in other_terms}
+                for term, future in futures.items():
+                    try:
+                        term_rows[term] = future.result()
+                    except Exception as e:
+                        logger.log_error_with_context(e, {
+                            "operation": "scrape_term",
+                            "term": term
+                        })
+            return term_rows
+        finally:
+            client.close()
+            logger.log_operation_time("scrape_all_terms", start_time)
+
+    @tracer.traced("results.collect_new_results")
+    def collect_new_results(self, term_rows: Dict[str, List[Row]]) -> List[Result]:
+        """
+        Extract the results that are not stored yet from the rows of every term.
+
+        Args:
+            term_rows (Dict[str, List[Row]]): Rows per term
+
+        Returns:
+            List[Result]: New results of all terms
+        """
+        # The default term comes first, so it wins for a course listed under several
+        self.database.assign_legacy_terms({lesson_id: term for term, rows in reversed(list(term_rows.items()))
+                                           for lesson_id, _, _ in rows if term})
+        new_results = []
+        for term, rows in term_rows.items():
+            logger.info("Processing %s rows from results table %s", len(rows), term)
+            for row_index, (lesson_id, lesson_name, score_text) in enumerate(rows, 1):
                 try:
-                    cells = row.find_elements(By.TAG_NAME, "td")
-                    if len(cells) < 5:
-                        continue
-                        
-                    lesson_id = cells[1].find_element(By.TAG_NAME, "span").text
-                    lesson_name = cells[2].text
-                    score_text = cells[4].text
-                    
-                    logger.info(f"Processing row {row_index}: {lesson_name}")
-                    
-                    # Process all exam types in one pass
-                    for exam_info in [
-                        ("Vize :", "midterm"),
-                        ("Final :", "final"),
-                        ("Büt :", "make-up")
-                    ]:
-                        identifier, exam_type = exam_info
-                        if identifier in score_text:
-                            try:
-                                score = float(score_text.split(identifier)[1].split()[0])
-                                if not self.database.check_if_result_exists(lesson_id, exam_type):
-                                    new_results.append(Result(lesson_id, lesson_name, exam_type, score))
-                                    logger.info(f"New {exam_type} result found for {lesson_name}: {score}")
-                            except (ValueError, IndexError):
-                                continue
-                                
+                    logger.debug("Processing row %s: %s", row_index, lesson_name)
+                    new_results.extend(self.collect_row_results(lesson_id, lesson_name, score_text, term))
                 except Exception as e:
                     logger.log_error_with_context(e, {
                         "operation": "process_row",
                         "row_index": row_index,
-                        "lesson_name": lesson_name if 'lesson_name' in locals() else "unknown"
+                        "term": term
                     })
                     continue
-                    
-            logger.info(f"Found {len(new_results)} new results")
+        return new_results
+
+    @tracer.traced("results.process_results_table")
+    def process_results_table(self) -> List[Result]:
+        """Process the results table of the default term, and of every other term if enabled"""
+        start_time = time.perf_counter()
+        try:
+            rows = self.read_table_rows()
+            html, page_url = self.results_page_source()
+            document = HtmlDocument(html)
+            _, self.current_term, _ = self.term_options(document)
+            self.save_snapshot(self.current_term, document)
+            term_rows = {self.current_term: rows}
+            if SCRAPE_ALL_TERMS:
+                term_rows.update(self.scrape_other_terms(html, page_url))
+            self.scraped_terms = list(term_rows)
+
+            new_results = self.collect_new_results(term_rows)
+            logger.info("Found %s new results", len(new_results))
             return new_results
             
         except Exception as e:
@@ -153,36 +341,63 @@ class ResultsPage:
             raise
         finally:
             logger.log_operation_time("process_results_table", start_time)
-        
+
+    @tracer.traced("results.results_to_notify")
+    def results_to_notify(self, new_results: List[Result]) -> List[Result]:
+        """
+        Save new results and mark their terms as seen.
+
+        Results of a term scraped for the first time are only stored: they are old
+        grades, not publications, and notifying them would flood the topic.
+
+        Args:
+            new_results (List[Result]): Results not stored yet
+
+        Returns:
+            List[Result]: The results worth a notification
+        """
+        known_terms = self.database.get_known_terms()
+        notify = [result for result in new_results
+                  if result.term == self.current_term or result.term in known_terms]
+        if len(notify) < len(new_results):
+            logger.info("Storing %s results of newly seen terms without notifying", len(new_results) - len(notify))
+        if new_results:
+            self.save_results(new_results)
+        if self.revisions:
+            self.database.revise_results(self.revisions)
+        self.database.add_known_terms([term for term in self.scraped_terms if term])
+        return notify
+
+    @tracer.traced("results.save_results")
     def save_results(self, results: List[Result]) -> None:
         """Save new results to database"""
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         try:
-            for result in results:
-                try:
-                    self.database.insert_result(result)
-                    logger.log_request_response("DB_INSERT", f"Saved result: {result.lesson_name} - {result.exam_type}")
-                except Exception as e:
-                    logger.log_error_with_context(e, {
-                        "operation": "save_result",
-                        "result": str(result)
-                    })
+            # Queued together, the writer commits them in one transaction
+            stored = self.database.insert_results(results)
+            logger.log_request_response("DB_INSERT", "Saved %s of %s results", stored, len(results))
+        except Exception as e:
+            logger.log_error_with_context(e, {
+                "operation": "save_results",
+                "results": len(results)
+            })
         finally:
             logger.log_operation_time("save_results", start_time)
                 
+    @tracer.traced("results.get_results")
     def get_results(self) -> List[Result]:
         """Main method to get all new results"""
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         try:
+            self.deadline.check("get_results")
             self.browser.switch_to_frame(self.results_frame)
             logger.info("Switched to frame")
             
             new_results = self.process_results_table()
             if new_results:
-                logger.info(f"Found {len(new_results)} new results")
-                self.save_results(new_results)
+                logger.info("Found %s new results", len(new_results))
             
-            return new_results
+            return self.results_to_notify(new_results)
             
         except Exception as e:
             logger.log_error_with_context(e, {
@@ -0,0 +1,24 @@
+import tempfile
+import socket
+import os
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+# Settings are read when utils.constants is first imported, so point the data
+# folder somewhere disposable and keep the console quiet before any test imports it
+os.environ.setdefault("DATA_FOLDER", tempfile.mkdtemp(prefix="obs-notifier-tests-"))
+os.environ.setdefault("LOG_LEVEL", "CRITICAL")
+os.environ.setdefault("TRACING", "false")
+os.environ.setdefault("CAPTCHA_SERVICE", "false")
+
+# The portal and ntfy both point at the mock server tests.test_http_engine binds to this port
+MOCK_PORTAL_PORT = free_port()
+os.environ.setdefault("OBS_BASE_URL", f"http://127.0.0.1:{MOCK_PORTAL_PORT}")
+os.environ.setdefault("NTFY_SERVER", f"http://127.0.0.1:{MOCK_PORTAL_PORT}")
+os.environ.setdefault("NTFY_TOPIC", "obs-notifier-tests")
+os.environ.setdefault("NOTIFIERS", "ntfy")
+os.environ.setdefault("USERNAME", "student")
+os.environ.setdefault("PASSWORD", "secret")
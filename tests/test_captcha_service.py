@@ -0,0 +1,37 @@
+import socket
+import stat
+import time
+import os
+import pytest
+from utils.captcha_service import CaptchaClient, CaptchaService
+from utils.deadline import Deadline, DeadlineExceeded
+
+def test_service_socket_is_owner_only(tmp_path):
+    socket_path = str(tmp_path / "captcha.sock")
+    service = CaptchaService(socket_path)
+    try:
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+    finally:
+        service.server_close()
+
+@pytest.fixture
+def silent_service(tmp_path):
+    """A socket that accepts connections but never answers, like a service stuck in a batch"""
+    socket_path = str(tmp_path / "silent.sock")
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen()
+    yield socket_path
+    listener.close()
+
+def test_client_waits_no_longer_than_the_run_deadline(silent_service):
+    client = CaptchaClient(silent_service, timeout=120, deadline=Deadline(0.2))
+    started = time.monotonic()
+    with pytest.raises(socket.timeout):
+        client.stats()
+    assert time.monotonic() - started < 2
+
+def test_client_refuses_to_wait_after_the_deadline(silent_service):
+    client = CaptchaClient(silent_service, timeout=120, deadline=Deadline(0))
+    with pytest.raises(DeadlineExceeded):
+        client.stats()
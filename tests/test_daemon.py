@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+import threading
+import time
+import pytest
+import main
+from utils.constants import LOCK_FILE
+from utils.deadline import Deadline, Watchdog
+from utils.metrics import metrics
+from utils.run_lock import RunLock
+from utils.scheduler import PollScheduler
+
+def load_last_run() -> datetime:
+    return PollScheduler([]).last_run()
+
+@pytest.fixture
+def no_database(monkeypatch):
+    """Fail any attempt to open the results database"""
+    def refuse(*args, **kwargs):
+        raise AssertionError("skipped runs must not open the database")
+
+    monkeypatch.setattr("utils.database.Database", refuse)
+
+def test_lock_held_run_is_recorded_without_opening_the_database(no_database):
+    held = RunLock(LOCK_FILE)
+    assert held.acquire()
+    try:
+        assert main.run_guarded_check(daemon=True) == 0
+    finally:
+        held.release()
+    assert load_last_run() > datetime.now() - timedelta(minutes=1)
+
+def test_open_circuit_run_is_recorded_without_opening_the_database(no_database, monkeypatch):
+    monkeypatch.setattr("utils.portal_health.CircuitBreaker.allow_request", lambda self: False)
+    assert main.run_guarded_check() == 0
+    assert load_last_run() > datetime.now() - timedelta(minutes=1)
+
+def test_skipped_runs_are_labelled_by_reason_only(monkeypatch):
+    metrics.reset()
+    monkeypatch.setattr("utils.portal_health.CircuitBreaker.allow_request", lambda self: False)
+    main.run_guarded_check()
+    held = RunLock(LOCK_FILE)
+    assert held.acquire()
+    try:
+        main.run_guarded_check(daemon=True)
+    finally:
+        held.release()
+    assert metrics.to_dict()["counters"]["run_skipped"] == {"reason=circuit_open": 1, "reason=lock_held": 1}
+
+def test_lock_held_run_is_recorded_so_the_daemon_sleeps():
+    held = RunLock(LOCK_FILE)
+    assert held.acquire()
+    try:
+        assert main.run_guarded_check(daemon=True) == 0
+    finally:
+        held.release()
+    assert main.load_scheduler().next_run_at() > datetime.now()
+
+def test_daemon_watchdog_kills_the_browser_but_not_the_process():
+    killed = threading.Event()
+    watchdog = Watchdog(Deadline(0.05), killed.set, grace_period=0.05, terminate=False)
+    watchdog.start()
+    assert killed.wait(2)
+    time.sleep(0.2)
+    assert watchdog.fired
+    assert watchdog._exit_timer is None
@@ -0,0 +1,117 @@
+import sqlite3
+import time
+import pytest
+from models.model import Result
+from utils.database import SCHEMA_VERSION, Database
+
+TERM = "2024-2025 Güz"
+
+@pytest.fixture
+def legacy_database(tmp_path):
+    """A database from before multi-term scraping: results without a term or grade column"""
+    path = str(tmp_path / "results.db")
+    with sqlite3.connect(path) as connection:
+        connection.execute("""
+            CREATE TABLE results (
+                lesson_id TEXT,
+                lesson_name TEXT,
+                exam_type TEXT,
+                score REAL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        connection.executemany("INSERT INTO results (lesson_id, lesson_name, exam_type, score) VALUES (?, ?, ?, ?)",
+                               [("MAT101", "Matematik", "midterm", 80), ("FIZ101", "Fizik", "final", 50)])
+    connection.close()
+    with Database(path) as database:
+        yield database
+
+def summaries(database: Database) -> dict:
+    return {(row["term"], row["lesson_id"]): row for row in database.get_course_summaries()}
+
+def test_legacy_results_are_summarized_under_the_empty_term(legacy_database):
+    assert set(summaries(legacy_database)) == {("", "MAT101"), ("", "FIZ101")}
+
+def test_new_final_of_a_legacy_course_clears_missing_final(legacy_database):
+    assert legacy_database.assign_legacy_terms({"MAT101": TERM}) == 1
+    legacy_database.insert_results([Result("MAT101", "Matematik", "final", 90.0, TERM)])
+
+    rows = summaries(legacy_database)
+    assert ("", "MAT101") not in rows
+    assert rows[(TERM, "MAT101")]["midterm"] == 80
+    assert rows[(TERM, "MAT101")]["final"] == 90
+    assert rows[(TERM, "MAT101")]["mean_score"] == 85
+    assert [row["lesson_id"] for row in legacy_database.get_course_summaries(missing_final=True)] == []
+    # FIZ101 was not scraped, so it keeps its legacy row
+    assert ("", "FIZ101") in rows
+
+def test_revision_of_a_legacy_result_updates_its_summary(legacy_database):
+    revised = Result("FIZ101", "Fizik", "final", 60.0, TERM)
+    legacy_database.revise_results([(revised, 50.0, None)])
+
+    assert legacy_database.get_stored_result("FIZ101", "final", TERM) == (60.0, None)
+    assert summaries(legacy_database)[("", "FIZ101")]["final"] == 60
+    assert summaries(legacy_database)[("", "FIZ101")]["mean_score"] == 60
+
+def test_revision_after_assigning_terms_leaves_no_stale_summary(legacy_database):
+    legacy_database.assign_legacy_terms({"FIZ101": TERM})
+    legacy_database.revise_results([(Result("FIZ101", "Fizik", "final", 60.0, TERM), 50.0, None)])
+
+    rows = summaries(legacy_database)
+    assert ("", "FIZ101") not in rows
+    assert rows[(TERM, "FIZ101")]["final"] == 60
+    assert rows[(TERM, "FIZ101")]["results"] == 1
+
+def test_assigning_terms_without_legacy_results_writes_nothing(tmp_path):
+    with Database(str(tmp_path / "results.db")) as database:
+        database.insert_results([Result("MAT101", "Matematik", "midterm", 70.0, TERM)])
+        assert database.assign_legacy_terms({"MAT101": TERM}) == 0
+        assert set(summaries(database)) == {(TERM, "MAT101")}
+
+def test_revision_without_a_term_leaves_other_terms_of_a_retaken_course_alone(tmp_path):
+    with Database(str(tmp_path / "results.db")) as database:
+        database.insert_results([Result("MAT101", "Matematik", "final", 40.0, "2023 Güz"),
+                                 Result("MAT101", "Matematik", "final", 55.0, "2024 Güz")])
+        database.revise_results([(Result("MAT101", "Matematik", "final", 70.0, ""), 55.0, None)])
+
+        assert database.get_stored_result("MAT101", "final", "2023 Güz") == (40.0, None)
+        assert database.get_stored_result("MAT101", "final", "2024 Güz") == (55.0, None)
+        rows = summaries(database)
+        assert (rows[("2023 Güz", "MAT101")]["final"], rows[("2023 Güz", "MAT101")]["mean_score"]) == (40, 40)
+        assert (rows[("2024 Güz", "MAT101")]["final"], rows[("2024 Güz", "MAT101")]["mean_score"]) == (55, 55)
+
+def test_revision_of_one_term_leaves_the_other_term_alone(tmp_path):
+    with Database(str(tmp_path / "results.db")) as database:
+        database.insert_results([Result("MAT101", "Matematik", "final", 40.0, "2023 Güz"),
+                                 Result("MAT101", "Matematik", "final", 55.0, "2024 Güz")])
+        database.revise_results([(Result("MAT101", "Matematik", "final", 70.0, "2024 Güz"), 55.0, None)])
+
+        assert database.get_stored_result("MAT101", "final", "2023 Güz") == (40.0, None)
+        assert database.get_stored_result("MAT101", "final", "2024 Güz") == (70.0, None)
+        rows = summaries(database)
+        assert rows[("2023 Güz", "MAT101")]["final"] == 40
+        assert (rows[("2024 Güz", "MAT101")]["final"], rows[("2024 Güz", "MAT101")]["mean_score"]) == (70, 70)
+
+def test_reopening_an_up_to_date_database_takes_no_write_lock(tmp_path):
+    path = str(tmp_path / "results.db")
+    with Database(path) as database:
+        database.insert_results([Result("MAT101", "Matematik", "midterm", 70.0, TERM)])
+
+    # Another process is in the middle of a write
+    holder = sqlite3.connect(path)
+    holder.execute("BEGIN IMMEDIATE")
+    try:
+        started = time.monotonic()
+        with Database(path) as database:
+            assert database.get_course_summaries()[0]["midterm"] == 70
+            assert database._writer is None
+        assert time.monotonic() - started < 1
+    finally:
+        holder.rollback()
+        holder.close()
+
+def test_legacy_database_is_migrated_once(legacy_database):
+    with legacy_database.reader() as connection:
+        assert connection.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(results)")]
+    assert {"term", "grade"} <= set(columns)
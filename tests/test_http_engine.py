@@ -0,0 +1,158 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from typing import List
+import threading
+import pytest
+import main
+from utils.constants import OBS_BASE_URL, NTFY_TOPIC
+
+LOGIN = """<html><body><form method="post" action="./login.aspx" id="form1">
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="VS{attempt}" />
+<input type="hidden" name="__EVENTVALIDATION" value="EV" />
+<input name="txtParamT01" type="text" id="txtParamT01" />
+<input name="txtParamT02" type="password" id="txtParamT02" />
+<img id="imgCaptchaImg" src="captcha.aspx?x={attempt}" />
+<input name="txtSecCode" type="text" id="txtSecCode" />
+<span id="lblSonuclar">{error}</span>
+<input type="submit" name="btnLogin" value="Giriş" id="btnLogin" />
+</form></body></html>"""
+HOME = """<html><body><form>
+<a href="#" onclick="menu_close(this,'start.aspx?gkm=grades');">Not Listesi</a>
+<iframe id="IFRAME1" src="start.aspx?gkm=home"></iframe>
+</form></body></html>"""
+CONTACT_ALERT = """<html><body><div id="divRequired">İletişim bilgilerinizi güncelleyiniz</div></body></html>"""
+GRADES = """<html><body><table id="grd_not_listesi"><tr><th>#</th></tr>
+<tr><td>1</td><td><span>MAT101</span></td><td>Matematik</td><td>x</td>
+<td><span>Vize : 80</span><br><span>Final : 90</span></td></tr>
+</table></body></html>"""
+
+class MockPortalHandler(BaseHTTPRequestHandler):
+    """Just enough of the WebForms portal for the HTTP engine, plus the ntfy topic"""
+    server: "MockPortal"
+
+    def respond(self, body: str, status: int = 200, location: str = None) -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        if location:
+            self.send_header("Location", location)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        path = self.path
+        if path.startswith("/oibs/std/login.aspx"):
+            self.server.attempts += 1
+            self.respond(LOGIN.format(attempt=self.server.attempts, error=""))
+        elif path.startswith("/oibs/std/captcha.aspx"):
+            self.respond("PNG")
+        elif path.startswith("/oibs/std/index.aspx"):
+            self.respond(HOME)
+        elif "gkm=home" in path:
+            self.respond(CONTACT_ALERT if self.server.contact_alert else "<html><body>ok</body></html>")
+        elif "gkm=grades" in path and not self.server.grades_broken:
+            self.respond(GRADES)
+        else:
+            self.respond("Server Error", 500)
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+        if self.path.strip("/") == NTFY_TOPIC:
+            self.server.notifications.append(self.headers.get("Title"))
+            return self.respond("{}")
+        if parse_qs(body).get("txtSecCode") == [str(FakeCaptchaSolver.answer)]:
+            return self.respond("", 302, "/oibs/std/index.aspx?curOp=0")
+        self.server.attempts += 1
+        self.respond(LOGIN.format(attempt=self.server.attempts, error="Güvenlik kodu hatalı"))
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+class MockPortal(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port: int):
+        super().__init__(("127.0.0.1", port), MockPortalHandler)
+        self.attempts = 0
+        self.contact_alert = False
+        self.grades_broken = False
+        self.notifications: List[str] = []
+
+class FakeCaptchaSolver:
+    """Stands in for the OCR model, which is not needed to exercise the engine"""
+    answer = 7
+
+    def __init__(self, image_path: str, cache=None, deadline=None):
+        self.image_hash = None
+        self.from_cache = False
+
+    def solve_captcha(self) -> int:
+        return self.answer
+
+@pytest.fixture(scope="module")
+def portal():
+    server = MockPortal(urlparse(OBS_BASE_URL).port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def http_engine(portal, monkeypatch):
+    """Run the HTTP engine against the mock portal, recording any Selenium fallback"""
+    portal.contact_alert = False
+    portal.grades_broken = False
+    portal.notifications.clear()
+    fallbacks = []
+
+    def initialize_browser(deadline=None):
+        fallbacks.append(deadline)
+        return None
+
+    monkeypatch.setattr("pages.login_page.CaptchaSolver", FakeCaptchaSolver)
+    monkeypatch.setattr(main, "ENGINE", "http")
+    monkeypatch.setattr(main, "initialize_browser", initialize_browser)
+    return fallbacks
+
+def test_http_engine_notifies_new_results_without_falling_back(portal, http_engine):
+    assert main.run_guarded_check() == 0
+    assert http_engine == []
+    assert len(portal.notifications) == 2
+
+def test_contact_alert_is_sent_once_and_not_retried_with_selenium(portal, http_engine):
+    portal.contact_alert = True
+    assert main.run_guarded_check() == 1
+    assert http_engine == []
+    assert portal.notifications == ["beykent universitesi iletisim bilgilerinizi guncelleyiniz"]
+
+def test_engine_failure_falls_back_to_selenium(portal, http_engine):
+    portal.grades_broken = True
+    assert main.run_guarded_check() == 1
+    assert len(http_engine) == 1
+
+def test_expired_deadline_is_not_retried_with_selenium(portal, http_engine, monkeypatch):
+    monkeypatch.setattr(main, "RUN_TIMEOUT", 0)
+    assert main.run_guarded_check() == 1
+    assert http_engine == []
+
+def test_test_notification_has_its_own_title(portal, http_engine):
+    from utils.notify import TEST_TITLE
+
+    assert main.command_test_notification(main.parse_args(["test-notification"])) == 0
+    assert portal.notifications == [TEST_TITLE]
+
+def test_http_results_page_has_every_results_page_field():
+    from pages.http_results_page import HttpResultsPage
+    from pages.results_page import ResultsPage
+    from utils.http_client import HttpClient
+
+    base = ResultsPage(None)
+    with HttpClient() as client:
+        page = HttpResultsPage(client)
+    try:
+        assert set(vars(base)) <= set(vars(page))
+    finally:
+        base.close()
+        page.close()
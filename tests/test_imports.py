@@ -0,0 +1,40 @@
+from typing import List
+import subprocess
+import json
+import sys
+import pytest
+from tools.import_budget import DEFERRED_MODULES, PROJECT_ROOT
+
+# Runs a command through main.main() in a fresh interpreter and prints the
+# top-level packages it left imported
+RUN_COMMAND = """
+import json, sys
+import main
+sys.argv = ["main.py", *json.loads(sys.argv[1])]
+try:
+    main.main()
+except SystemExit:
+    pass
+sys.__stdout__.write("\\n" + json.dumps(sorted({name.split(".")[0] for name in sys.modules})))
+"""
+
+def imported_packages(command: List[str]) -> List[str]:
+    completed = subprocess.run([sys.executable, "-c", RUN_COMMAND, json.dumps(command)],
+                               cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=60)
+    assert completed.returncode == 0, completed.stderr
+    return json.loads(completed.stdout.splitlines()[-1])
+
+def test_main_defers_heavy_imports():
+    assert set(imported_packages(["--help"])) & set(DEFERRED_MODULES) == set()
+
+@pytest.mark.parametrize("command", [
+    ["check-config"],
+    ["test-notification", "--message", "import check"],
+    ["results"],
+    ["results", "--view", "terms"],
+    ["export-events"],
+    ["simulate-schedule"],
+    ["reparse"]
+])
+def test_lightweight_command_does_not_load_selenium(command):
+    assert "selenium" not in imported_packages(command)
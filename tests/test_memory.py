@@ -0,0 +1,24 @@
+from utils.deadline import Deadline
+from utils.memory import MemoryMonitor
+from utils.notify import MEMORY_ALERT_TITLE, Notification
+
+def test_alert_has_its_own_title_and_the_run_deadline(monkeypatch):
+    sent = []
+    monkeypatch.setattr(Notification, "dispatch",
+                        lambda self, messages: sent.extend((self.deadline, message) for message in messages) or [True])
+    monitor = MemoryMonitor(enabled=True, heap_tracing=False, alert_mb=1)
+    monitor.start_run()
+    monitor.deadline = Deadline(30)
+
+    monitor.alert("login", 900, 100, 800)
+
+    [(deadline, message)] = sent
+    assert deadline is monitor.deadline
+    assert message.title == MEMORY_ALERT_TITLE
+    assert "900 MB" in message.body
+
+def test_new_run_forgets_the_previous_deadline():
+    monitor = MemoryMonitor(enabled=True, heap_tracing=False, alert_mb=1)
+    monitor.deadline = Deadline(30)
+    monitor.start_run()
+    assert monitor.deadline is None
@@ -0,0 +1,180 @@
+from typing import List
+import asyncio
+import socket
+import time
+import aiohttp
+import pytest
+from models.model import Result
+from utils.deadline import Deadline, DeadlineExceeded
+from utils.metrics import metrics
+from utils.notifiers import Message, Notifier
+from utils.notify import Notification
+from utils.rate_limit import RateLimiter, RateLimited
+
+class RecordingNotifier(Notifier):
+    """Stands in for a backend: records what it was sent, after an optional delay or failure"""
+
+    def __init__(self, name: str, delay: float = 0, error: Exception = None, rate: float = 0, **kwargs):
+        super().__init__(name=name, rate=rate, **kwargs)
+        self.delay = delay
+        self.error = error
+        self.sent: List[Message] = []
+
+    async def send(self, session: aiohttp.ClientSession, message: Message) -> None:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        self.sent.append(message)
+
+class FlakyNotifier(RecordingNotifier):
+    """Refuses its first sends for its rate limit, asking to retry almost at once"""
+
+    def __init__(self, name: str, refusals: int):
+        super().__init__(name)
+        self.refusals = refusals
+
+    async def send(self, session: aiohttp.ClientSession, message: Message) -> None:
+        if self.refusals:
+            self.refusals -= 1
+            raise RateLimited(0.01)
+        await super().send(session, message)
+
+def results(count: int) -> List[Result]:
+    return [Result(f"LES{index:03}", f"Lesson {index}", "midterm", float(index), "2024-2025 Güz")
+            for index in range(count)]
+
+def outcomes(notifier: Notifier) -> dict:
+    counters = metrics.to_dict()["counters"].get("notifications_sent", {})
+    return {outcome: counters.get(f"notifier={notifier.name},outcome={outcome}", 0)
+            for outcome in ("sent", "failed", "timeout", "rate_limited", "deadline")}
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+
+def dispatch(notifiers: List[Notifier], count: int) -> List[Result]:
+    return Notification(notifiers=notifiers, limiter=RateLimiter(global_rate=0)).notify_new_results(results(count))
+
+def test_failing_notifier_does_not_stop_the_others():
+    healthy = RecordingNotifier("healthy")
+    broken = RecordingNotifier("broken", error=aiohttp.ClientResponseError(None, (), status=500))
+
+    delivered = dispatch([broken, healthy], 5)
+
+    assert len(delivered) == 5
+    assert len(healthy.sent) == 5
+    assert outcomes(healthy)["sent"] == 5
+    assert outcomes(broken)["failed"] == 5
+
+def test_result_is_not_delivered_when_every_notifier_fails():
+    broken = RecordingNotifier("broken", error=ConnectionRefusedError())
+    assert dispatch([broken], 3) == []
+
+def test_slow_notifier_times_out_without_holding_up_the_others():
+    fast = RecordingNotifier("fast")
+    slow = RecordingNotifier("slow", delay=5, timeout=0.2, concurrency=10)
+
+    started = time.perf_counter()
+    delivered = dispatch([fast, slow], 10)
+    elapsed = time.perf_counter() - started
+
+    assert len(delivered) == 10
+    assert len(fast.sent) == 10
+    assert slow.sent == []
+    assert outcomes(slow)["timeout"] == 10
+    # One timeout for the whole batch, not one per message
+    assert elapsed < 2
+
+def test_concurrency_limit_queues_sends_behind_the_timeout():
+    slow = RecordingNotifier("slow", delay=5, timeout=0.2, concurrency=2)
+
+    started = time.perf_counter()
+    dispatch([slow], 4)
+
+    # Two waves of two sends, each cut off by the timeout
+    assert 0.35 < time.perf_counter() - started < 2
+    assert outcomes(slow)["timeout"] == 4
+
+def test_rate_limited_send_is_retried():
+    flaky = FlakyNotifier("flaky", refusals=2)
+
+    assert len(dispatch([flaky], 1)) == 1
+    assert len(flaky.sent) == 1
+    assert outcomes(flaky)["sent"] == 1
+    assert metrics.to_dict()["counters"]["notifications_rate_limited"]["notifier=flaky"] == 2
+
+@pytest.fixture
+def stand_ins():
+    """Local HTTP sink and SMTP server, as used by tools.notifier_check"""
+    from tools.notifier_check import Inbox, SinkServer, SmtpServer, serve
+
+    inbox = Inbox()
+    servers = [SinkServer(inbox, slow_delay=5), SmtpServer(inbox)]
+    for server in servers:
+        serve(server)
+    yield inbox, *(server.server_address[1] for server in servers)
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def test_backends_deliver_to_their_stand_ins_despite_an_unreachable_webhook(stand_ins):
+    from utils.notifiers import EmailNotifier, NtfyNotifier, WebhookNotifier
+
+    inbox, http_port, smtp_port = stand_ins
+    http_url = f"http://127.0.0.1:{http_port}"
+    # Nothing listens on a port that was just released
+    with socket.socket() as closed:
+        closed.bind(("127.0.0.1", 0))
+        closed_port = closed.getsockname()[1]
+    unreachable = WebhookNotifier(url=f"http://127.0.0.1:{closed_port}/down", payload_format="json",
+                                  name="down", rate=0)
+    notifiers = [
+        NtfyNotifier(server=http_url, topic="ntfy", rate=0),
+        WebhookNotifier(url=f"{http_url}/webhook", payload_format="slack", rate=0),
+        EmailNotifier(host="127.0.0.1", port=smtp_port, username=None, starttls=False,
+                      sender="notifier@localhost", recipients=["student@localhost"], rate=0),
+        unreachable
+    ]
+
+    assert len(dispatch(notifiers, 3)) == 3
+    assert {sink: len(messages) for sink, messages in inbox.messages.items()} == {"ntfy": 3, "webhook": 3, "smtp": 3}
+    assert outcomes(unreachable)["failed"] == 3
+    ntfy_message = inbox.messages["ntfy"][0][1]
+    assert ntfy_message["title"] == "Beykent Universitesi Sinav Sonucunuz Aciklandi !"
+    assert inbox.messages["webhook"][0][1]["text"].startswith("*Beykent Universitesi")
+    assert inbox.messages["smtp"][0][1]["To"] == "student@localhost"
+
+def test_queue_wait_is_exported_in_seconds_once():
+    dispatch([RecordingNotifier("healthy")], 1)
+    exported = metrics.to_prometheus()
+    assert "_notification_queue_seconds_count" in exported
+    assert "_seconds_seconds" not in exported
+
+def test_token_past_the_limit_is_not_taken():
+    limiter = RateLimiter(global_rate=0)
+    assert asyncio.run(limiter.acquire("topic", rate=2, burst=1)) == 0
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(limiter.acquire("topic", rate=2, burst=1, limit=0.1))
+    # The refused caller left the next token to whoever comes after it
+    assert 0.3 < limiter.reserve("topic", rate=2, burst=1) <= 0.5
+
+def test_send_the_deadline_cuts_short_is_dropped_without_waiting():
+    throttled = RecordingNotifier("throttled", rate=0.5, burst=1)
+    notification = Notification(Deadline(0.3), notifiers=[throttled], limiter=RateLimiter(global_rate=0))
+
+    started = time.perf_counter()
+    delivered = notification.notify_new_results(results(2))
+
+    assert time.perf_counter() - started < 0.3
+    assert len(delivered) == 1
+    assert len(throttled.sent) == 1
+    assert outcomes(throttled)["sent"] == 1
+    assert outcomes(throttled)["deadline"] == 1
+
+def test_backend_without_send_fails_when_constructed():
+    class Unfinished(Notifier):
+        pass
+
+    with pytest.raises(TypeError):
+        Unfinished(name="unfinished")
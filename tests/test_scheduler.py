@@ -0,0 +1,25 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import os
+from utils.scheduler import PollScheduler
+
+def test_overlapping_runs_never_leave_a_partial_state_file(tmp_path):
+    scheduler = PollScheduler([], state_file=str(tmp_path / "scheduler.json"))
+    scheduler.record_run()
+    started = datetime(2024, 1, 1)
+
+    def record(index: int) -> None:
+        scheduler.record_run(started + timedelta(minutes=index))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        readings = []
+        for batch in range(20):
+            list(executor.map(record, range(batch * 8, batch * 8 + 8)))
+            readings.append(scheduler.last_run())
+        futures = [executor.submit(record, index) for index in range(200)]
+        readings.extend(scheduler.last_run() for _ in range(200))
+        for future in futures:
+            future.result()
+
+    assert None not in readings
+    assert os.listdir(tmp_path) == ["scheduler.json"]
@@ -0,0 +1,49 @@
+import pytest
+from utils.score_parser import ParsedScore, ScoreParser, is_revised
+
+@pytest.mark.parametrize("text, expected", [
+    ("Vize : 80", [("Vize", "midterm", 80.0, None)]),
+    ("Vize : 72,5 Final : 90 Harf Notu : BA", [
+        ("Vize", "midterm", 72.5, None),
+        ("Final", "final", 90.0, None),
+        ("Harf Notu", "letter-grade", None, "BA")
+    ]),
+    ("Vize (%40) : 65.25", [("Vize (%40)", "midterm", 65.25, None)]),
+    ("VİZE : 50 FINAL : 60", [("VİZE", "midterm", 50.0, None), ("FINAL", "final", 60.0, None)]),
+    ("Vize: GR", [("Vize", "midterm", None, "GR")]),
+    ("Final : cb", [("Final", "final", None, "CB")]),
+    ("n Vize : 55", [("n Vize", "midterm", 55.0, None)]),
+    ("Kısa Sınav 2 : 40", [("Kısa Sınav 2", "kisa-sinav-2", 40.0, None)]),
+    ("Vize : Final : 90", [("Final", "final", 90.0, None)]),
+    ("Vize : - Final : 50", [("Final", "final", 50.0, None)]),
+    # A fraction's scale is unknown, so it is rejected rather than guessed
+    ("Vize : 8/10", []),
+    ("Vize : 8/10 Final : 70", [("Final", "final", 70.0, None)]),
+    # Parenthesized pairs are class statistics, not the student's scores
+    ("(Ortalama : 60)", []),
+    ("Vize : 80 (Ortalama : 60)", [("Vize", "midterm", 80.0, None)]),
+    ("Vize : 80 (Ortalama : 60 ) Final : 75", [("Vize", "midterm", 80.0, None), ("Final", "final", 75.0, None)]),
+    ("", []),
+    ("Henüz not girilmedi", [])
+])
+def test_parse(text, expected):
+    assert ScoreParser().parse(text) == [ParsedScore(*score) for score in expected]
+
+def test_extra_labels_are_matched_case_insensitively():
+    parser = ScoreParser({"Lab": "lab", "Sözlü": "oral"})
+    assert parser.parse("LAB : 90 sözlü : AA") == [
+        ParsedScore("LAB", "lab", score=90.0),
+        ParsedScore("sözlü", "oral", grade="AA")
+    ]
+
+@pytest.mark.parametrize("stored, score, grade, revised", [
+    ((80.0, None), 80.0, None, False),
+    ((80.0, None), 85.0, None, True),
+    ((None, None), 85.0, None, True),
+    ((None, "BA"), None, "BA", False),
+    ((None, "BA"), None, "BB", True),
+    # Rows stored before the grade column existed have no grade to compare
+    ((None, None), None, "BB", False)
+])
+def test_is_revised(stored, score, grade, revised):
+    assert is_revised(stored, score, grade) is revised
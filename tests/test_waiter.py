@@ -0,0 +1,22 @@
+from selenium.common.exceptions import NoSuchWindowException, TimeoutException
+from selenium.webdriver.common.by import By
+import time
+import pytest
+from utils.waiter import Waiter
+
+class ClosedWindowDriver:
+    """Driver whose window is gone: every call raises"""
+    @property
+    def current_url(self):
+        raise NoSuchWindowException("Browsing context has been discarded")
+
+    def execute_async_script(self, *args):
+        raise NoSuchWindowException("Browsing context has been discarded")
+
+def test_until_url_or_text_times_out_when_the_driver_keeps_failing():
+    waiter = Waiter(ClosedWindowDriver())
+    started = time.monotonic()
+    with pytest.raises(TimeoutException):
+        waiter.until_url_or_text("http://portal/index.aspx", By.ID, "lblSonuclar", 0.3)
+    assert time.monotonic() - started < 2
+    assert waiter.wait_count == 1
@@ -0,0 +1,98 @@
+"""
+Run the full exam check repeatedly against the replay server and report per-stage latency.
+
+Usage:
+    python -m tools.benchmark data/recordings/<name> -n 20 --engine http --latency 0.1
+
+Every run uses a fresh results database in a temporary data folder, so each run
+finds, stores and notifies the same results. Notifications go to the replay server.
+"""
+
+from tools.replay_server import ReplayServer, add_server_arguments
+from typing import Dict, List
+import argparse
+import resource
+import tempfile
+import shutil
+import time
+import sys
+import os
+
+def percentile(values: List[float], share: float) -> float:
+    """Nearest-rank percentile of the values"""
+    ordered = sorted(values)
+    index = max(int(round(share * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+def max_rss_mb(who: int) -> float:
+    """Peak resident set size in MB for this process or its children (ru_maxrss is KB on Linux)"""
+    return resource.getrusage(who).ru_maxrss / 1024
+
+def print_report(timings: Dict[str, List[float]], runs: int, failures: int) -> None:
+    print(f"\n{runs} runs, {failures} failed")
+    print(f"{'stage':<32}{'count':>7}{'p50 (s)':>10}{'p95 (s)':>10}{'total (s)':>11}")
+    for name, values in sorted(timings.items(), key=lambda item: -sum(item[1])):
+        print(f"{name:<32}{len(values):>7}{percentile(values, 0.5):>10.3f}"
+              f"{percentile(values, 0.95):>10.3f}{sum(values):>11.2f}")
+    print(f"\npeak RSS: {max_rss_mb(resource.RUSAGE_SELF):.0f} MB (python), "
+          f"{max_rss_mb(resource.RUSAGE_CHILDREN):.0f} MB (largest child process)")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the exam check against a replayed session")
+    add_server_arguments(parser)
+    parser.add_argument("-n", "--runs", type=int, default=10, help="Number of full checks")
+    parser.add_argument("--engine", choices=["http", "selenium"], default="http")
+    args = parser.parse_args()
+
+    server = ReplayServer(args.recording, 0, args.latency, args.jitter,
+                          args.failure_rate, args.captcha_reject_rate)
+    server.start()
+    data_folder = tempfile.mkdtemp(prefix="obs-bench-")
+
+    # The application reads its configuration at import time
+    os.environ.update({
+        "OBS_BASE_URL": server.base_url,
+        "NTFY_SERVER": server.base_url,
+        "NTFY_TOPIC": "benchmark",
+        "DATA_FOLDER": data_folder,
+        "USERNAME": "benchmark",
+        "PASSWORD": "benchmark"
+    })
+    import main as app
+    from utils.browser import Browser
+    from utils.http_client import HttpClient
+    from utils.logger import logger
+    from utils.deadline import Deadline
+    from utils.constants import RUN_TIMEOUT
+
+    timings: Dict[str, List[float]] = {}
+    listener = lambda name, seconds: timings.setdefault(name, []).append(seconds)
+    logger.add_timing_listener(listener)
+    failures = 0
+    try:
+        for run in range(1, args.runs + 1):
+            db_path = os.path.join(data_folder, "results.db")
+            if os.path.exists(db_path):
+                os.remove(db_path)
+            started = time.monotonic()
+            deadline = Deadline(RUN_TIMEOUT)
+            if args.engine == "http":
+                with HttpClient(deadline) as client:
+                    outcome = app.run_http_exam_check(client, deadline)
+            else:
+                with Browser(deadline) as browser:
+                    outcome = app.run_exam_check(browser, deadline)
+            success = outcome == app.CheckOutcome.SUCCESS
+            failures += 0 if success else 1
+            timings.setdefault("benchmark_run_wall", []).append(time.monotonic() - started)
+            print(f"run {run}/{args.runs}: {'ok' if success else 'failed'} "
+                  f"in {time.monotonic() - started:.2f} s", file=sys.stderr)
+    finally:
+        logger.remove_timing_listener(listener)
+        server.shutdown()
+        shutil.rmtree(data_folder, ignore_errors=True)
+
+    print_report(timings, args.runs, failures)
+
+if __name__ == "__main__":
+    main()
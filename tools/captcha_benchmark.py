@@ -0,0 +1,80 @@
+"""
+Compare the captcha reading modes on a corpus of labelled captchas.
+
+Usage:
+    python -m tools.captcha_benchmark
+    python -m tools.captcha_benchmark data/captcha_corpus --modes expression,crops --limit 200
+
+The corpus is a folder of captcha screenshots named "<answer>-<anything>.png";
+runs with CAPTCHA_CORPUS=true collect one from the captchas the portal accepted.
+Every captcha is solved in each mode without the cache, and the report lists
+accuracy, OCR calls per solve, latency and how often the expression mode had
+to fall back to the digit crops. The first solve includes loading the model,
+so a warm-up solve runs before the measurements.
+"""
+
+from typing import Dict, List
+import argparse
+import time
+import os
+import sys
+from utils.captcha_solver import CaptchaSolver, warm_up
+from utils.report import format_rows
+from utils.constants import CAPTCHA_CORPUS_FOLDER
+
+def load_corpus(folder: str, limit: int) -> List[tuple]:
+    """
+    List the labelled captchas of a folder.
+
+    Returns:
+        List[tuple]: (path, expected answer) pairs, sorted by file name
+    """
+    corpus = []
+    for name in sorted(os.listdir(folder)):
+        label, _, _ = name.partition("-")
+        if name.endswith(".png") and label.lstrip("-").isdigit():
+            corpus.append((os.path.join(folder, name), int(label)))
+    return corpus[:limit] if limit else corpus
+
+def percentile(values: List[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+def run_mode(mode: str, corpus: List[tuple]) -> Dict:
+    latencies, calls = [], []
+    correct = fallbacks = 0
+    for path, expected in corpus:
+        solver = CaptchaSolver(path, mode=mode)
+        started = time.perf_counter()
+        answer = solver.solve_captcha()
+        latencies.append(time.perf_counter() - started)
+        calls.append(solver.ocr_calls)
+        correct += answer == expected
+        fallbacks += mode == "expression" and solver.solved_by != "expression"
+    return {
+        "mode": mode,
+        "captchas": len(corpus),
+        "accuracy %": round(100 * correct / len(corpus), 1),
+        "ocr calls/solve": round(sum(calls) / len(corpus), 2),
+        "p50 ms": round(percentile(latencies, 0.5) * 1000, 1),
+        "p95 ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "fallbacks": fallbacks if mode == "expression" else None
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare captcha reading modes on labelled captchas")
+    parser.add_argument("corpus", nargs="?", default=CAPTCHA_CORPUS_FOLDER, help="Folder of <answer>-*.png captchas")
+    parser.add_argument("--modes", default="expression,crops", help="Comma-separated modes to compare")
+    parser.add_argument("--limit", type=int, default=0, help="Use only the first N captchas")
+    parser.add_argument("--format", choices=["table", "json", "csv"], default="table")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus, args.limit)
+    if not corpus:
+        print(f"No labelled captchas in {args.corpus}", file=sys.stderr)
+        sys.exit(1)
+    warm_up()
+    print(format_rows([run_mode(mode, corpus) for mode in args.modes.split(",")], args.format))
+
+if __name__ == "__main__":
+    main()
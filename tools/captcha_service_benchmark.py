@@ -0,0 +1,72 @@
+"""
+Measure throughput and memory of the captcha service under concurrent clients.
+
+Usage:
+    python -m tools.captcha_service_benchmark --image data/screenshots/left_number.png
+    python -m tools.captcha_service_benchmark --clients 1,4,16 --requests 20
+
+Each level starts that many client threads, each reading the image through the
+service the given number of times, and prints requests per second, client-side
+latency, the mean batch size the service formed and the service's RSS. The
+service is started on demand like in a run; the first request includes the
+model load, so a warm-up request is sent first.
+
+Without the service every notifier process holds its own model, so N
+concurrent runs need roughly N times the service's RSS.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+import argparse
+import time
+from utils.captcha_service import CaptchaClient
+from utils.constants import CAPTCHA_SOCKET
+
+MB = 1024 * 1024
+
+def run_client(client: CaptchaClient, image: str, requests: int) -> List[float]:
+    """Read the image repeatedly, returning each request's latency in seconds"""
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        client.read_text(image)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+def percentile(values: List[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the captcha service with concurrent clients")
+    parser.add_argument("--image", default="data/screenshots/left_number.png", help="Cropped captcha image")
+    parser.add_argument("--clients", default="1,4,16", help="Comma-separated client counts")
+    parser.add_argument("--requests", type=int, default=10, help="Requests per client")
+    parser.add_argument("--socket", default=CAPTCHA_SOCKET, help="Service socket path")
+    args = parser.parse_args()
+
+    client = CaptchaClient(args.socket)
+    started = time.perf_counter()
+    client.read_text(args.image)
+    print(f"warm-up (includes starting the service and loading the model): {time.perf_counter() - started:.2f} s")
+
+    print(f"{'clients':>8}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'mean batch':>12}"
+          f"{'service MB':>12}{'N models MB':>13}")
+    for clients in (int(count) for count in args.clients.split(",")):
+        before = client.stats()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            runs = list(executor.map(lambda _: run_client(CaptchaClient(args.socket), args.image, args.requests),
+                                     range(clients)))
+        elapsed = time.perf_counter() - started
+        after = client.stats()
+
+        latencies = [latency for run in runs for latency in run]
+        batches = max(after["batches"] - before["batches"], 1)
+        rss_mb = (after["rss_bytes"] or 0) / MB
+        print(f"{clients:>8}{len(latencies):>10}{len(latencies) / elapsed:>10.1f}"
+              f"{percentile(latencies, 0.5) * 1000:>10.1f}{percentile(latencies, 0.95) * 1000:>10.1f}"
+              f"{(after['requests'] - before['requests']) / batches:>12.2f}{rss_mb:>12.0f}{rss_mb * clients:>13.0f}")
+
+if __name__ == "__main__":
+    main()
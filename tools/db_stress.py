@@ -0,0 +1,144 @@
+"""
+Stress the results database with many concurrent workers.
+
+Usage:
+    python -m tools.db_stress
+    python -m tools.db_stress --workers 32 --writes 200 --processes 2
+
+Every worker thread inserts results and checks for existing ones, like scraping
+workers storing what they read. Two modes are compared on fresh databases:
+
+- "direct": each worker opens its own connection like Database did before the
+  writer thread (rollback journal, sqlite3's default 5 second busy timeout) and
+  commits every insert;
+- "writer": the workers share a Database, so reads come from the connection
+  pool and inserts are committed by the writer thread in grouped transactions.
+
+With --processes above 1 every process runs its own workers against the same
+file, which is how concurrent runs meet. The report lists writes per second,
+writes that failed with "database is locked" and the transactions committed.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+from typing import Dict, List, Tuple
+import tempfile
+import argparse
+import sqlite3
+import shutil
+import time
+import os
+
+# Per-row log lines would drown the report
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from models.model import Result
+from utils.database import Database, is_lock_error
+from utils.metrics import metrics
+
+def make_result(worker: int, index: int) -> Result:
+    return Result(lesson_id=f"W{worker}-{index}", lesson_name=f"Lesson {worker}", exam_type="midterm",
+                  score=float(index % 100), term="2024-2025 Güz", grade="")
+
+def direct_worker(path: str, worker: int, writes: int) -> Tuple[int, int]:
+    """Insert through a private connection, committing each row"""
+    connection = sqlite3.connect(path)
+    stored = locked = 0
+    try:
+        for index in range(writes):
+            result = make_result(worker, index)
+            try:
+                connection.execute("SELECT COUNT(*) FROM results WHERE lesson_id = ?", (result.lesson_id,)).fetchone()
+                connection.execute(
+                    "INSERT INTO results (lesson_id, lesson_name, exam_type, score, term, grade) VALUES (?, ?, ?, ?, ?, ?)",
+                    (result.lesson_id, result.lesson_name, result.exam_type, result.score, result.term, result.grade))
+                connection.commit()
+                stored += 1
+            except sqlite3.Error as e:
+                connection.rollback()
+                if not is_lock_error(e):
+                    raise
+                locked += 1
+    finally:
+        connection.close()
+    return stored, locked
+
+def writer_worker(database: Database, worker: int, writes: int) -> Tuple[int, int]:
+    """Insert through the shared database's writer thread"""
+    stored = 0
+    for index in range(writes):
+        result = make_result(worker, index)
+        database.check_if_result_exists(result.lesson_id, result.exam_type, result.term)
+        stored += database.insert_results([result])
+    return stored, writes - stored
+
+def run_process(mode: str, path: str, workers: int, writes: int, offset: int) -> Dict[str, float]:
+    """Run one process's workers and count what they stored"""
+    metrics.reset()
+    database = Database(path) if mode == "writer" else None
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            if database is not None:
+                outcomes = list(executor.map(lambda worker: writer_worker(database, worker, writes),
+                                             range(offset, offset + workers)))
+            else:
+                outcomes = list(executor.map(lambda worker: direct_worker(path, worker, writes),
+                                             range(offset, offset + workers)))
+    finally:
+        if database is not None:
+            database.close()
+    return {
+        "stored": sum(stored for stored, _ in outcomes),
+        "locked": sum(locked for _, locked in outcomes),
+        "transactions": metrics.to_dict()["counters"].get("database_transactions", {}).get("", 0)
+    }
+
+def run_mode(mode: str, workers: int, writes: int, processes: int) -> Dict[str, float]:
+    folder = tempfile.mkdtemp(prefix="obs-db-stress-")
+    path = os.path.join(folder, "results.db")
+    try:
+        # Creates the schema before the workers start
+        Database(path).close()
+        if mode == "direct":
+            with sqlite3.connect(path) as connection:
+                connection.execute("PRAGMA journal_mode=DELETE")
+
+        started = time.perf_counter()
+        arguments = [(mode, path, workers, writes, process * workers) for process in range(processes)]
+        if processes == 1:
+            reports: List[Dict[str, float]] = [run_process(*arguments[0])]
+        else:
+            with Pool(processes) as pool:
+                reports = pool.starmap(run_process, arguments)
+        elapsed = time.perf_counter() - started
+
+        with sqlite3.connect(path) as connection:
+            rows = connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return {
+            "elapsed": elapsed,
+            "rows": rows,
+            "locked": sum(report["locked"] for report in reports),
+            "transactions": sum(report["transactions"] for report in reports)
+        }
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stress the results database with concurrent workers")
+    parser.add_argument("--workers", type=int, default=16, help="Worker threads per process")
+    parser.add_argument("--writes", type=int, default=100, help="Results inserted per worker")
+    parser.add_argument("--processes", type=int, default=1, help="Processes writing to the same file")
+    parser.add_argument("--modes", default="direct,writer", help="Comma-separated modes to run")
+    args = parser.parse_args()
+
+    attempted = args.workers * args.writes * args.processes
+    print(f"{args.processes} process(es) x {args.workers} workers x {args.writes} writes = {attempted} writes")
+    print(f"{'mode':>8}{'seconds':>10}{'writes/s':>10}{'stored':>8}{'locked':>8}{'transactions':>14}")
+    for mode in args.modes.split(","):
+        report = run_mode(mode, args.workers, args.writes, args.processes)
+        transactions = report["transactions"] if mode == "writer" else report["rows"]
+        print(f"{mode:>8}{report['elapsed']:>10.2f}{report['rows'] / report['elapsed']:>10.0f}"
+              f"{report['rows']:>8}{report['locked']:>8}{transactions:>14.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Check that the entry point starts fast and keeps heavy imports deferred.
+
+Usage:
+    python -m tools.import_budget
+    python -m tools.import_budget --budget-ms 150 --top 15
+
+Runs "python -X importtime -c 'import main'" in a fresh interpreter, several
+times to smooth out disk cache effects, and fails (exit status 1) if:
+
+- the best cumulative import time of main exceeds the budget, or
+- any of the heavy modules (Selenium, the OCR stack, aiohttp, requests) is
+  imported, since only the commands that need them may import them.
+
+The slowest imports of the fastest attempt are printed either way.
+tests/test_imports.py checks that the lightweight commands (check-config,
+test-notification, results, ...) do not load Selenium either.
+"""
+
+from typing import Dict, List, Tuple
+import subprocess
+import argparse
+import sys
+import os
+
+# Modules that only the commands using them may import
+DEFERRED_MODULES = ("selenium", "transformers", "torch", "cv2", "numpy", "aiohttp", "requests")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def measure_imports(module: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Returns:
+        Dict[str, Tuple[int, int]]: Own and cumulative microseconds per imported module
+    """
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               cwd=PROJECT_ROOT, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr}")
+
+    timings: Dict[str, Tuple[int, int]] = {}
+    for line in completed.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(own), int(cumulative))
+    return timings
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Enforce the import-time budget of the entry point")
+    parser.add_argument("--module", default="main", help="Module to import")
+    parser.add_argument("--budget-ms", type=float, default=200.0, help="Maximum cumulative import time")
+    parser.add_argument("--attempts", type=int, default=3, help="Fresh interpreters to try, the best counts")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    args = parser.parse_args()
+
+    attempts = [measure_imports(args.module) for _ in range(args.attempts)]
+    timings = min(attempts, key=lambda attempt: attempt[args.module][1])
+    total_ms = timings[args.module][1] / 1000
+
+    slowest: List[Tuple[str, Tuple[int, int]]] = sorted(timings.items(), key=lambda item: item[1][0], reverse=True)
+    print(f"{'own ms':>10}{'cum ms':>10}  module")
+    for name, (own, cumulative) in slowest[:args.top]:
+        print(f"{own / 1000:>10.1f}{cumulative / 1000:>10.1f}  {name}")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"import {args.module} took {total_ms:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+    leaked = sorted({name.split(".")[0] for name in timings} & set(DEFERRED_MODULES))
+    if leaked:
+        failures.append(f"import {args.module} loaded deferred modules: {', '.join(leaked)}")
+
+    print()
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"OK: import {args.module} took {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Measure the logging overhead of a typical run on the calling thread.
+
+Usage:
+    python -m tools.log_benchmark --runs 50
+
+Replays the logging calls of one exam check (element lookups, database checks,
+timed operations, requests) against three setups:
+
+- before: handlers written synchronously at DEBUG level, messages built eagerly
+  with f-strings, which is how the logger worked before the queue listener
+- after: queue listener at the default INFO level with lazy %-style arguments
+- after (DEBUG): queue listener with LOG_LEVEL=DEBUG
+
+Console output goes to /dev/null and the log files to a temporary folder.
+"""
+
+from utils.logger import Logger
+from typing import Callable
+import argparse
+import tempfile
+import shutil
+import time
+import sys
+import os
+
+# Logging calls of one run, by kind, estimated from the app.log of a Selenium run
+RUN_MIX = {
+    "element": 40,
+    "db_check": 30,
+    "operation": 60,
+    "http": 12,
+    "info": 20
+}
+
+QUERY = """
+                SELECT COUNT(*) FROM results
+                WHERE lesson_id = ? AND exam_type = ?
+                AND (term = ? OR term IS NULL OR term = '' OR ? = '')
+            """
+
+def eager_run(logger: Logger) -> None:
+    """One run of logging calls with messages formatted before the call"""
+    start_time = time.perf_counter()
+    for index in range(RUN_MIX["element"]):
+        logger.log_request_response("FIND_ELEMENT", f"{'id'}={'txtParamT01'}")
+    for index in range(RUN_MIX["db_check"]):
+        params = ("MAT101", "midterm", "2025G", "2025G")
+        logger.info(f"Checking existence of result: {params[0]} ({params[1]}) {params[2]}")
+        logger.log_request_response("DB_CHECK", f"Query: {QUERY.strip()}\nParams: {params}")
+        logger.info(f"Result exists: {True}")
+    for index in range(RUN_MIX["operation"]):
+        logger.log_operation_time("find_element", start_time)
+    for index in range(RUN_MIX["http"]):
+        logger.log_request_response("HTTP_GET", f"URL: {'https://obs.beykent.edu.tr/oibs/std/login.aspx'}",
+                                    response=f"Status: {200}, Final URL: {'https://obs.beykent.edu.tr/'}, Bytes: {20480}")
+    for index in range(RUN_MIX["info"]):
+        logger.info(f"Processing row {index}: {'Matematik'}")
+
+def lazy_run(logger: Logger) -> None:
+    """One run of logging calls as the code makes them now"""
+    start_time = time.perf_counter()
+    for index in range(RUN_MIX["element"]):
+        logger.log_request_response("FIND_ELEMENT", "%s=%s", "id", "txtParamT01")
+    for index in range(RUN_MIX["db_check"]):
+        params = ("MAT101", "midterm", "2025G", "2025G")
+        logger.debug("Checking existence of result: %s (%s) %s", params[0], params[1], params[2])
+        logger.log_request_response("DB_CHECK", "Query: %s\nParams: %s", QUERY, params)
+        logger.debug("Result exists: %s", True)
+    for index in range(RUN_MIX["operation"]):
+        logger.log_operation_time("find_element", start_time)
+    for index in range(RUN_MIX["http"]):
+        logger.log_request_response("HTTP_GET", "URL: %s\nResponse: Status: %s, Final URL: %s, Bytes: %s",
+                                    "https://obs.beykent.edu.tr/oibs/std/login.aspx", 200,
+                                    "https://obs.beykent.edu.tr/", 20480)
+    for index in range(RUN_MIX["info"]):
+        logger.debug("Processing row %s: %s", index, "Matematik")
+
+def measure(name: str, level: str, asynchronous: bool, run: Callable[[Logger], None],
+            runs: int, directory: str) -> None:
+    """Time the calling thread over the runs, then the time to drain the queue"""
+    logger = Logger(f"log_benchmark_{name}", os.path.join(directory, name), level, asynchronous)
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        run(logger)
+        timings.append(time.perf_counter() - started)
+    started = time.perf_counter()
+    logger.shutdown()
+    drain = time.perf_counter() - started
+    timings.sort()
+    print(f"{name:<16}{level:<7}{timings[len(timings) // 2] * 1000:>12.2f}{min(timings) * 1000:>12.2f}"
+          f"{drain * 1000:>12.1f}", file=sys.__stdout__)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure logging overhead per run")
+    parser.add_argument("--runs", type=int, default=50, help="Simulated runs per setup")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="log-bench-")
+    calls = RUN_MIX["db_check"] * 3 + sum(count for kind, count in RUN_MIX.items() if kind != "db_check")
+    print(f"{calls} logging calls per run, {args.runs} runs", file=sys.__stdout__)
+    print(f"{'setup':<16}{'level':<7}{'p50 ms/run':>12}{'min ms/run':>12}{'drain ms':>12}", file=sys.__stdout__)
+    try:
+        with open(os.devnull, "w") as devnull:
+            sys.stdout = devnull
+            measure("before", "DEBUG", False, eager_run, args.runs, directory)
+            measure("after", "INFO", True, lazy_run, args.runs, directory)
+            measure("after_debug", "DEBUG", True, lazy_run, args.runs, directory)
+    finally:
+        sys.stdout = sys.__stdout__
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
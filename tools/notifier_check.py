@@ -0,0 +1,179 @@
+"""
+Check the notifier backends and the dispatcher against local stand-ins.
+
+Usage:
+    python -m tools.notifier_check
+    python -m tools.notifier_check --results 20 --slow-delay 3 --slow-timeout 1
+
+An HTTP sink server plays ntfy and the webhooks, and a small SMTP server that
+accepts every message plays the mail server. The results are dispatched to an
+ntfy topic, a Slack-style webhook, email and a webhook that answers after
+--slow-delay seconds but has a --slow-timeout timeout. The report lists what each
+stand-in received and when its last message arrived: the other backends should
+finish long before the slow one times out, while the slow one's requests arrive
+in waves of its concurrency limit, one timeout apart.
+
+tests/test_notify.py runs the same stand-ins under pytest.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from email import message_from_bytes
+from email.policy import default
+from typing import Dict, List
+import socketserver
+import threading
+import argparse
+import json
+import time
+import os
+import sys
+
+# Per-message log lines and the slow webhook's expected timeouts would drown the report
+os.environ.setdefault("LOG_LEVEL", "CRITICAL")
+
+from models.model import Result
+from utils.metrics import metrics
+from utils.notifiers import EmailNotifier, NtfyNotifier, WebhookNotifier
+from utils.notify import Notification
+from utils.rate_limit import RateLimiter
+from utils.report import format_rows
+
+class Inbox:
+    def __init__(self):
+        """Messages received by the stand-ins, by sink, with their arrival time"""
+        self.started = time.perf_counter()
+        self.messages: Dict[str, List[tuple]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, sink: str, body: object) -> None:
+        with self._lock:
+            self.messages.setdefault(sink, []).append((time.perf_counter() - self.started, body))
+
+class SinkHandler(BaseHTTPRequestHandler):
+    server: "SinkServer"
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        sink = self.path.strip("/").split("/")[0]
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            self.server.inbox.add(sink, json.loads(body))
+        else:
+            self.server.inbox.add(sink, {"title": self.headers.get("Title"), "body": body.decode("utf-8")})
+        if sink == "slow":
+            time.sleep(self.server.slow_delay)
+        try:
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+        except (BrokenPipeError, ConnectionResetError):
+            # The slow webhook's sender timed out and hung up
+            pass
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+class SinkServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Every send connects at once; the default backlog of 5 drops connections into a 1s SYN retry
+    request_queue_size = 128
+
+    def __init__(self, inbox: Inbox, slow_delay: float):
+        super().__init__(("127.0.0.1", 0), SinkHandler)
+        self.inbox = inbox
+        self.slow_delay = slow_delay
+
+class SmtpHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: accept every message and keep it"""
+    server: "SmtpServer"
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode("ascii"))
+
+    def handle(self) -> None:
+        self.reply("220 localhost notifier check")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command == b"QUIT":
+                return self.reply("221 Bye")
+            if command == b"DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = b""
+                for data_line in iter(self.rfile.readline, b".\r\n"):
+                    # Undo dot-stuffing
+                    data += data_line[1:] if data_line.startswith(b"..") else data_line
+                self.server.inbox.add("smtp", message_from_bytes(data, policy=default))
+                self.reply("250 OK")
+            elif command == b"EHLO":
+                self.reply("250 localhost")
+            else:
+                self.reply("250 OK")
+
+class SmtpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, inbox: Inbox):
+        super().__init__(("127.0.0.1", 0), SmtpHandler)
+        self.inbox = inbox
+
+def serve(server: socketserver.BaseServer) -> None:
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check the notifier backends against local stand-ins")
+    parser.add_argument("--results", type=int, default=10, help="Results to notify")
+    parser.add_argument("--slow-delay", type=float, default=3.0, help="Seconds the slow webhook takes to answer")
+    parser.add_argument("--slow-timeout", type=float, default=1.0, help="Timeout of the slow webhook")
+    args = parser.parse_args()
+
+    inbox = Inbox()
+    http_server = SinkServer(inbox, args.slow_delay)
+    smtp_server = SmtpServer(inbox)
+    serve(http_server)
+    serve(smtp_server)
+    http_url = f"http://127.0.0.1:{http_server.server_address[1]}"
+
+    # No rate limits, so timings only show the fan-out (tools.notify_load_test covers rate limiting)
+    notifiers = [
+        NtfyNotifier(server=http_url, topic="ntfy", rate=0),
+        WebhookNotifier(url=f"{http_url}/webhook", payload_format="slack", rate=0),
+        EmailNotifier(host="127.0.0.1", port=smtp_server.server_address[1], username=None, starttls=False,
+                      sender="notifier@localhost", recipients=["student@localhost"], rate=0),
+        WebhookNotifier(url=f"{http_url}/slow", payload_format="json", name="slow", timeout=args.slow_timeout, rate=0)
+    ]
+    results = [Result(f"LES{index:03}", f"Lesson {index}", "midterm", float(index), "2024-2025 Güz")
+               for index in range(args.results)]
+
+    metrics.reset()
+    inbox.started = time.perf_counter()
+    delivered = Notification(notifiers=notifiers, limiter=RateLimiter(global_rate=0)).notify_new_results(results)
+    elapsed = time.perf_counter() - inbox.started
+    counters = metrics.to_dict()["counters"].get("notifications_sent", {})
+
+    rows = []
+    for notifier, sink in zip(notifiers, ("ntfy", "webhook", "smtp", "slow")):
+        received = inbox.messages.get(sink, [])
+        rows.append({
+            "notifier": notifier.name,
+            "sent": counters.get(f"notifier={notifier.name},outcome=sent", 0),
+            "timed out": counters.get(f"notifier={notifier.name},outcome=timeout", 0),
+            "received": len(received),
+            "last arrival s": round(max((arrival for arrival, _ in received), default=0), 3)
+        })
+    print(format_rows(rows))
+    print(f"\n{len(delivered)}/{len(results)} results delivered in {elapsed:.2f}s "
+          f"(slow webhook: {args.slow_delay}s delay, {args.slow_timeout}s timeout)")
+
+    email = inbox.messages.get("smtp", [(0, None)])[0][1]
+    if email is not None:
+        print(f"First email: {email['Subject']!r} to {email['To']}")
+    healthy = [row for row in rows if row["notifier"] != "slow"]
+    if any(row["received"] != len(results) for row in healthy) or len(delivered) != len(results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Load test notification delivery against a local ntfy stand-in that enforces rate limits.
+
+Usage:
+    python -m tools.notify_load_test
+    python -m tools.notify_load_test --accounts 8 --messages 20 --topics 2 --server-rate 2 --server-burst 5
+
+The fake server gives every topic a token bucket of --server-rate messages per
+second and --server-burst at once, and answers 429 with Retry-After once it is
+empty, like ntfy.sh. Every account is a thread sending a burst of results to
+its topic through its own dispatcher, all sharing the process's rate limiter.
+Two modes are compared:
+
+- "reactive": no local limit, sends go out at once and only Retry-After is honored;
+- "bucket": the local token buckets match the server's, so excess messages wait
+  in the queue instead of being refused.
+
+The report lists delivered and refused (429) sends, delivered messages per
+second and the latency from the burst to delivery (p50/p95/p99), which is the
+time queued messages waited.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+import threading
+import argparse
+import math
+import time
+import os
+
+# Per-message log lines and the expected 429s would drown the report
+os.environ.setdefault("LOG_LEVEL", "CRITICAL")
+
+from models.model import Result
+from utils.notifiers import NtfyNotifier
+from utils.notify import Notification
+from utils.rate_limit import RateLimiter
+from utils.report import format_rows
+
+class TopicLimit:
+    def __init__(self, rate: float, burst: int):
+        """Server-side token bucket of one topic: refuses, never queues"""
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """
+        Take a token if there is one.
+
+        Returns:
+            float: 0 if the message is accepted, else seconds until the next token
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class FakeNtfyHandler(BaseHTTPRequestHandler):
+    server: "FakeNtfyServer"
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        topic = self.path.strip("/")
+        wait = self.server.admit(topic)
+        if wait:
+            self.send_response(429)
+            self.send_header("Retry-After", str(math.ceil(wait)))
+            body = b'{"code":42901,"error":"limit reached: too many requests"}'
+        else:
+            self.send_response(200)
+            body = b"{}"
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+class FakeNtfyServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Every account connects at once; the default backlog of 5 drops connections into a 1s SYN retry
+    request_queue_size = 256
+
+    def __init__(self, rate: float, burst: int):
+        super().__init__(("127.0.0.1", 0), FakeNtfyHandler)
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self.limits: Dict[str, TopicLimit] = {}
+        self.started = time.perf_counter()
+        self.accepted: List[float] = []
+        self.refused = 0
+
+    def admit(self, topic: str) -> float:
+        with self._lock:
+            limit = self.limits.setdefault(topic, TopicLimit(self.rate, self.burst))
+            wait = limit.take()
+            if wait:
+                self.refused += 1
+            else:
+                self.accepted.append(time.perf_counter() - self.started)
+            return wait
+
+    def reset(self) -> None:
+        with self._lock:
+            self.limits = {}
+            self.started = time.perf_counter()
+            self.accepted = []
+            self.refused = 0
+
+def percentile(values: List[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))] if ordered else 0.0
+
+def run_account(server_url: str, topic: str, account: int, messages: int, limiter: RateLimiter,
+                rate: float, burst: int) -> int:
+    """Notify one account's burst of results, returning how many were delivered"""
+    notifier = NtfyNotifier(server=server_url, topic=topic, rate=rate, burst=burst)
+    results = [Result(f"A{account}-{index}", f"Lesson {index}", "midterm", float(index), "2024-2025 Güz")
+               for index in range(messages)]
+    return len(Notification(notifiers=[notifier], limiter=limiter).notify_new_results(results))
+
+def run_mode(mode: str, server: FakeNtfyServer, args: argparse.Namespace) -> Dict:
+    server.reset()
+    server_url = f"http://127.0.0.1:{server.server_address[1]}"
+    limiter = RateLimiter(global_rate=args.global_rate, global_burst=args.global_burst)
+    rate, burst = (args.server_rate, args.server_burst) if mode == "bucket" else (0, 1)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.accounts) as executor:
+        delivered = sum(executor.map(
+            lambda account: run_account(server_url, f"topic{account % args.topics}", account, args.messages,
+                                        limiter, rate, burst),
+            range(args.accounts)))
+    elapsed = time.perf_counter() - started
+
+    latencies = server.accepted
+    return {
+        "mode": mode,
+        "messages": args.accounts * args.messages,
+        "delivered": delivered,
+        "refused (429)": server.refused,
+        "seconds": round(elapsed, 2),
+        "delivered/s": round(delivered / elapsed, 2),
+        "p50 s": round(percentile(latencies, 0.5), 2),
+        "p95 s": round(percentile(latencies, 0.95), 2),
+        "p99 s": round(percentile(latencies, 0.99), 2)
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test notification delivery against a rate limited server")
+    parser.add_argument("--accounts", type=int, default=4, help="Accounts notifying at the same time")
+    parser.add_argument("--messages", type=int, default=10, help="Results each account notifies")
+    parser.add_argument("--topics", type=int, default=2, help="Topics the accounts are spread over")
+    parser.add_argument("--server-rate", type=float, default=2.0, help="Messages per second the server accepts per topic")
+    parser.add_argument("--server-burst", type=int, default=5, help="Messages the server accepts at once per topic")
+    parser.add_argument("--global-rate", type=float, default=0, help="Local limit across all topics, 0 for none")
+    parser.add_argument("--global-burst", type=int, default=20, help="Local burst across all topics")
+    parser.add_argument("--modes", default="reactive,bucket", help="Comma-separated modes to compare")
+    parser.add_argument("--format", choices=["table", "json", "csv"], default="table")
+    args = parser.parse_args()
+
+    server = FakeNtfyServer(args.server_rate, args.server_burst)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        print(format_rows([run_mode(mode, server, args) for mode in args.modes.split(",")], args.format))
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
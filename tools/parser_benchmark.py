@@ -0,0 +1,108 @@
+"""
+Microbenchmark and randomized check of the score cell parser over synthetic grade tables.
+
+Usage:
+    python -m tools.parser_benchmark --rows 2000 --repeat 5 --check 10000
+
+The benchmark compares ScoreParser with the per-label str.split loop it replaced.
+The check generates random cells from known pairs and verifies the parser gets
+every pair back, in order, whatever the spacing, decimal separator or grade.
+"""
+
+from utils.score_parser import ScoreParser
+from utils.constants import EXAM_TYPE_LABELS
+from typing import List, Tuple
+import argparse
+import random
+import time
+import sys
+
+LETTER_GRADES = ["AA", "BA", "BB", "CB", "CC", "DC", "DD", "FD", "FF", "GR", "DZ"]
+SEPARATORS = [" ", "\n", "  ", " \n "]
+
+def legacy_parse(score_text: str) -> List[Tuple[str, float]]:
+    """The hard-coded loop ScoreParser replaced, kept for comparison"""
+    scores = []
+    for identifier, exam_type in [("Vize :", "midterm"), ("Final :", "final"), ("Büt :", "make-up")]:
+        if identifier in score_text:
+            try:
+                scores.append((exam_type, float(score_text.split(identifier)[1].split()[0])))
+            except (ValueError, IndexError):
+                continue
+    return scores
+
+def random_cell(rng: random.Random) -> Tuple[str, List[Tuple[str, object]]]:
+    """
+    Build a score cell and the pairs it contains.
+
+    Returns:
+        tuple: (cell text, [(exam type, score or grade), ...])
+    """
+    labels = rng.sample(sorted(EXAM_TYPE_LABELS), rng.randint(0, 4))
+    parts, expected = [], []
+    for label in labels:
+        if rng.random() < 0.2:
+            value = rng.choice(LETTER_GRADES)
+            expected.append((EXAM_TYPE_LABELS[label], value))
+        else:
+            number = round(rng.uniform(0, 100), rng.choice([0, 1, 2]))
+            text = f"{number:g}"
+            if rng.random() < 0.5:
+                text = text.replace(".", ",")
+            value = text
+            expected.append((EXAM_TYPE_LABELS[label], float(text.replace(",", "."))))
+        label_text = label.upper() if rng.random() < 0.1 else label
+        if rng.random() < 0.2:
+            label_text += f" (%{rng.choice([30, 40, 60])})"
+        parts.append(f"{label_text}{rng.choice(['', ' '])}:{rng.choice(['', ' '])}{value}")
+        # Unannounced scores show up as empty pairs and must be skipped
+        if rng.random() < 0.1:
+            parts.append(f"{rng.choice(['Proje', 'Ödev'])} : -")
+    return rng.choice(SEPARATORS).join(parts), expected
+
+def check(samples: int, seed: int) -> int:
+    """Run the randomized round-trip check, returning the number of failures"""
+    rng = random.Random(seed)
+    parser = ScoreParser()
+    failures = 0
+    for _ in range(samples):
+        cell, expected = random_cell(rng)
+        parsed = [(score.exam_type, score.score if score.score is not None else score.grade)
+                  for score in parser.parse(cell)]
+        if parsed != expected:
+            failures += 1
+            if failures <= 5:
+                print(f"mismatch for {cell!r}:\n  expected {expected}\n  parsed   {parsed}", file=sys.stderr)
+    return failures
+
+def benchmark(rows: int, repeat: int, seed: int) -> None:
+    rng = random.Random(seed)
+    cells = [random_cell(rng)[0] for _ in range(rows)]
+    parser = ScoreParser()
+    print(f"{rows} synthetic rows, best of {repeat}")
+    for name, parse in (("legacy split loop", legacy_parse), ("ScoreParser", parser.parse)):
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for cell in cells:
+                parse(cell)
+            best = min(best, time.perf_counter() - started)
+        pairs = sum(len(parse(cell)) for cell in cells)
+        print(f"{name:<20}{best * 1000:>10.2f} ms{best / rows * 1e6:>10.2f} us/row{pairs:>8} pairs found")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark and check the score cell parser")
+    parser.add_argument("--rows", type=int, default=2000, help="Rows in the synthetic table")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed passes over the table")
+    parser.add_argument("--check", type=int, default=10000, help="Random cells to verify, 0 to skip")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    benchmark(args.rows, args.repeat, args.seed)
+    if args.check:
+        failures = check(args.check, args.seed)
+        print(f"\nrandomized check: {args.check - failures}/{args.check} cells parsed exactly")
+        sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compare two profiles written by --profile to see where a slow run spent its time.
+
+Usage:
+    python -m tools.profile_diff logs/profiles/A-run.pstats logs/profiles/B-run.pstats
+    python -m tools.profile_diff A-run.collapsed B-run.collapsed --top 30
+
+.pstats files are compared per function by own (tottime) and cumulative time in
+seconds; they cover the thread that ran the stage. .collapsed files are compared
+per frame by self and inclusive samples across all threads, which also shows
+time spent waiting, e.g. in socket reads. Rows are sorted by the largest change.
+"""
+
+from collections import Counter
+from typing import Dict, Tuple
+import argparse
+import pstats
+import os
+
+Totals = Dict[str, Tuple[float, float]]
+
+def load_pstats(path: str) -> Totals:
+    """Own and cumulative seconds per function"""
+    stats = pstats.Stats(path).stats
+    totals: Totals = {}
+    for (filename, line, name), (_, _, own, cumulative, _) in stats.items():
+        key = f"{os.path.basename(filename)}:{line}:{name}" if line else name
+        totals[key] = (own, cumulative)
+    return totals
+
+def load_collapsed(path: str) -> Totals:
+    """Self and inclusive samples per frame"""
+    own: Counter = Counter()
+    inclusive: Counter = Counter()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if not stack:
+                continue
+            frames = stack.split(";")[1:]  # Drop the thread name
+            if not frames:
+                continue
+            own[frames[-1]] += int(count)
+            for frame in set(frames):
+                inclusive[frame] += int(count)
+    return {frame: (own[frame], inclusive[frame]) for frame in inclusive}
+
+def load(path: str) -> Totals:
+    return load_pstats(path) if path.endswith(".pstats") else load_collapsed(path)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Diff two profiles written by --profile")
+    parser.add_argument("before", help="Baseline .pstats or .collapsed file")
+    parser.add_argument("after", help="Profile to compare, of the same kind")
+    parser.add_argument("--top", type=int, default=20, help="Rows to show")
+    parser.add_argument("--sort", choices=("own", "cumulative"), default="cumulative",
+                        help="Order by the change in own or cumulative time")
+    args = parser.parse_args()
+
+    if os.path.splitext(args.before)[1] != os.path.splitext(args.after)[1]:
+        parser.error("both profiles must be .pstats or both .collapsed")
+
+    before, after = load(args.before), load(args.after)
+    column = 0 if args.sort == "own" else 1
+    unit, precision = ("s", 3) if args.before.endswith(".pstats") else ("samples", 0)
+
+    rows = []
+    for key in before.keys() | after.keys():
+        old = before.get(key, (0, 0))
+        new = after.get(key, (0, 0))
+        rows.append((new[column] - old[column], old, new, key))
+    rows.sort(key=lambda row: abs(row[0]), reverse=True)
+
+    print(f"{'own before':>12}{'own after':>12}{'cum before':>12}{'cum after':>12}{'delta':>12}  function ({unit})")
+    for delta, old, new, key in rows[:args.top]:
+        print(f"{old[0]:>12.{precision}f}{new[0]:>12.{precision}f}{old[1]:>12.{precision}f}"
+              f"{new[1]:>12.{precision}f}{delta:>+12.{precision}f}  {key}")
+
+if __name__ == "__main__":
+    main()
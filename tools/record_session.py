@@ -0,0 +1,60 @@
+"""
+Record a real portal session for offline replay.
+
+Usage:
+    python -m tools.record_session <name>
+
+Logs in with the HTTP engine using the credentials from .env, opens the grades
+page and stores every response under data/recordings/<name>. Credentials are
+redacted and nothing is written to the results database or sent as a notification.
+"""
+
+from pages.http_login_page import HttpLoginPage
+from pages.http_results_page import HttpResultsPage
+from utils.http_client import HttpClient
+from utils.session_recorder import SessionRecorder
+from utils.deadline import Deadline
+from utils.logger import logger
+from utils.constants import USERNAME, PASSWORD, RECORDINGS_FOLDER, RUN_TIMEOUT
+import argparse
+import sys
+import os
+
+def record(name: str) -> str:
+    """
+    Record one session.
+
+    Args:
+        name (str): Name of the recording folder
+
+    Returns:
+        str: Path of the recording
+    """
+    directory = os.path.join(RECORDINGS_FOLDER, name)
+    deadline = Deadline(RUN_TIMEOUT)
+    with HttpClient(deadline) as client:
+        client.recorder = SessionRecorder(directory, secrets=[USERNAME, PASSWORD])
+        login_page = HttpLoginPage(client, deadline)
+        if not login_page.login():
+            raise RuntimeError("Login stopped by the contact information alert")
+        results_page = HttpResultsPage(client, deadline)
+        results_page.navigate_to_results_page()
+        client.get(results_page.results_url)
+    logger.info("Recorded %s responses to %s", len(client.recorder.entries), directory)
+    return directory
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record a portal session for the replay server")
+    parser.add_argument("name", help="Name of the recording")
+    args = parser.parse_args()
+    try:
+        print(record(args.name))
+    except Exception as e:
+        logger.log_error_with_context(e, {
+            "operation": "record_session",
+            "name": args.name
+        })
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
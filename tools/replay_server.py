@@ -0,0 +1,179 @@
+"""
+Local stand-in for the OBS portal that replays a recorded session.
+
+Usage:
+    python -m tools.replay_server data/recordings/<name> --port 8081 --latency 0.2 --failure-rate 0.05
+
+Point the notifier at it with OBS_BASE_URL=http://127.0.0.1:8081 (and NTFY_SERVER
+to the same address to swallow notifications).
+
+Only the standard library is used here so the benchmark can start the server
+before the application modules read their configuration.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+import argparse
+import itertools
+import threading
+import random
+import json
+import time
+import os
+import re
+
+# The login error label, filled in when a captcha rejection is injected
+ERROR_LABEL_PATTERN = re.compile(rb'(<span[^>]*id="lblSonuclar"[^>]*>)(.*?)(</span>)', re.DOTALL)
+INJECTED_ERROR = "Güvenlik kodu hatalı".encode("utf-8")
+
+class Recording:
+    def __init__(self, directory: str):
+        """
+        Load a recording written by utils.session_recorder.SessionRecorder.
+
+        Args:
+            directory (str): Folder containing manifest.json
+        """
+        with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+            entries = json.load(f)["entries"]
+        self.bodies = {}
+        self.responses: Dict[Tuple[str, str], List[dict]] = {}
+        for entry in entries:
+            with open(os.path.join(directory, entry["file"]), "rb") as f:
+                self.bodies[entry["file"]] = f.read()
+            self.responses.setdefault((entry["method"], entry["path"]), []).append(entry)
+        self._cycles = {key: itertools.cycle(values) for key, values in self.responses.items()}
+        self._lock = threading.Lock()
+
+    def lookup(self, method: str, path: str) -> Optional[dict]:
+        """
+        Find the response to replay for a request.
+
+        GET responses are served round-robin (e.g. successive captcha images).
+        POSTs get the last recorded response for the path, which is the one that
+        ended the recorded login; a postback without a recorded POST re-renders the page.
+        """
+        if method == "POST":
+            if ("POST", path) in self.responses:
+                return self.responses[("POST", path)][-1]
+            method = "GET"
+        with self._lock:
+            cycle = self._cycles.get((method, path))
+            return next(cycle) if cycle else None
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    server: "ReplayServer"
+
+    def do_GET(self) -> None:
+        self.replay("GET")
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        self.replay("POST")
+
+    def replay(self, method: str) -> None:
+        settings = self.server
+        if settings.latency:
+            time.sleep(settings.latency + random.uniform(0, settings.jitter))
+        if random.random() < settings.failure_rate:
+            return self.respond(503, b"Service Unavailable", "text/plain")
+
+        path = urlsplit(self.path).path
+        entry = settings.recording.lookup(method, path)
+        if entry is None:
+            if method == "POST":
+                # Notification sinks (ntfy topics, webhooks) just need a 200
+                return self.respond(200, b"{}", "application/json")
+            return self.respond(404, b"Not recorded", "text/plain")
+
+        if method == "POST" and random.random() < settings.captcha_reject_rate:
+            login_page = settings.recording.lookup("GET", path)
+            if login_page:
+                body = ERROR_LABEL_PATTERN.sub(rb"\1" + INJECTED_ERROR + rb"\3",
+                                               settings.recording.bodies[login_page["file"]])
+                return self.respond(200, body, login_page["content_type"])
+
+        location = entry.get("location")
+        if location:
+            # Keep redirects on the replay server
+            parts = urlsplit(location)
+            location = parts.path + (f"?{parts.query}" if parts.query else "")
+        self.respond(entry["status"], settings.recording.bodies[entry["file"]], entry["content_type"], location)
+
+    def respond(self, status: int, body: bytes, content_type: str, location: Optional[str] = None) -> None:
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        if location:
+            self.send_header("Location", location)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, recording_dir: str, port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 failure_rate: float = 0.0, captcha_reject_rate: float = 0.0, verbose: bool = False):
+        """
+        Initialize the replay server.
+
+        Args:
+            recording_dir (str): Folder of the recording to serve
+            port (int): Port to listen on, 0 picks a free one
+            latency (float): Seconds added to every response
+            jitter (float): Extra random latency of up to this many seconds
+            failure_rate (float): Share of requests answered with 503
+            captcha_reject_rate (float): Share of login posts answered with a captcha error
+            verbose (bool): Log every request to stderr
+        """
+        super().__init__(("127.0.0.1", port), ReplayHandler)
+        self.recording = Recording(recording_dir)
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.captcha_reject_rate = captcha_reject_rate
+        self.verbose = verbose
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def start(self) -> threading.Thread:
+        """Serve in a background thread"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+def add_server_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("recording", help="Recording folder (contains manifest.json)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--captcha-reject-rate", type=float, default=0.0,
+                        help="Share of login posts answered with a captcha error")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a recorded OBS session")
+    add_server_arguments(parser)
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+
+    server = ReplayServer(args.recording, args.port, args.latency, args.jitter,
+                          args.failure_rate, args.captcha_reject_rate, verbose=True)
+    print(f"Replaying {args.recording} on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
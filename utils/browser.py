@@ -1,20 +1,27 @@
 from selenium import webdriver
 from selenium.webdriver.firefox.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.firefox.service import Service
 from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.common.by import By
 from utils.logger import logger
-from datetime import datetime
+from utils.waiter import Waiter
+from utils.deadline import Deadline
+from typing import Optional
+import subprocess
+import platform
+import signal
 import os
+import time
 from utils.constants import HEADLESS, SCREENSHOTS_FOLDER
 
 class Browser:
-    def __init__(self):
+    def __init__(self, deadline: Optional[Deadline] = None):
         try:
-            start_time = datetime.now()
+            start_time = time.perf_counter()
             logger.info("Initializing browser...")
             
+            self.deadline = deadline or Deadline()
+            self.killed = False
             self.options = Options()
             self.headless = HEADLESS
             self.screenshot_folder = SCREENSHOTS_FOLDER
@@ -40,12 +47,17 @@ class Browser:
             if self.headless:
                 self.options.add_argument("--headless")
                 
-            self.driver = webdriver.Firefox(options=self.options)
+            # Start geckodriver in its own session so Firefox can be killed with it as a group
+            popen_kw = {} if platform.system() == "Windows" else {"start_new_session": True}
+            self.service = Service(popen_kw=popen_kw)
+            self.driver = webdriver.Firefox(options=self.options, service=self.service)
             logger.log_operation_time("browser_initialization", start_time)
             
             # Set page load strategy
             self.driver.set_page_load_timeout(30)
-            self.driver.implicitly_wait(10)
+            # Element waits are handled by the Waiter; an implicit wait would stack on top of them
+            self.driver.implicitly_wait(0)
+            self.waiter = Waiter(self.driver, self.deadline)
             
         except Exception as e:
             logger.log_error_with_context(e, {
@@ -83,10 +95,10 @@ class Browser:
             url (str): The URL to navigate to
         """
         try:
-            logger.info(f"Navigating to URL: {url}")
+            logger.info("Navigating to URL: %s", url)
             self.driver.get(url)
         except Exception as e:
-            logger.error(f"Error navigating to URL {url}: {e}")
+            logger.error("Error navigating to URL %s: %s", url, e)
             raise
     
     def find_element(self, by: By, value: str, timeout: int = 10) -> WebElement:
@@ -104,12 +116,10 @@ class Browser:
         Raises:
             TimeoutException: If the element is not found within the timeout period
         """
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         try:
-            logger.log_request_response("FIND_ELEMENT", f"{by}={value}")
-            element = WebDriverWait(self.driver, timeout).until(
-                EC.presence_of_element_located((by, value))
-            )
+            logger.log_request_response("FIND_ELEMENT", "%s=%s", by, value)
+            element = self.waiter.until_present(by, value, timeout)
             return element
         except Exception as e:
             logger.log_error_with_context(e, {
@@ -131,12 +141,10 @@ class Browser:
             value (str): The value to search for
             timeout (int): Maximum time to wait in seconds
         """
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         try:
-            logger.log_request_response("CLICK_ELEMENT", f"{by}={value}")
-            element = WebDriverWait(self.driver, timeout).until(
-                EC.element_to_be_clickable((by, value))
-            )
+            logger.log_request_response("CLICK_ELEMENT", "%s=%s", by, value)
+            element = self.waiter.until_clickable(by, value, timeout)
             element.click()
         except Exception as e:
             logger.log_error_with_context(e, {
@@ -161,11 +169,11 @@ class Browser:
             str: The text content of the element
         """
         try:
-            logger.info(f"Getting text from element: {by}={value}")
+            logger.debug("Getting text from element: %s=%s", by, value)
             element = self.find_element(by, value, timeout)
             return element.text
         except Exception as e:
-            logger.error(f"Error getting text from element {by}={value}: {e}")
+            logger.error("Error getting text from element %s=%s: %s", by, value, e)
             raise
 
     def enter_text(self, by: By, value: str, text: str, timeout: int = 10) -> None:
@@ -178,9 +186,9 @@ class Browser:
             text (str): The text to enter
             timeout (int): Maximum time to wait in seconds
         """
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         try:
-            logger.log_request_response("ENTER_TEXT", f"Element: {by}={value}")
+            logger.log_request_response("ENTER_TEXT", "Element: %s=%s", by, value)
             element = self.find_element(by, value, timeout)
             element.clear()  # Clear existing text first
             element.send_keys(text)
@@ -208,13 +216,11 @@ class Browser:
             list[WebElement]: List of found elements
         """
         try:
-            logger.info(f"Finding elements: {by}={value}")
-            elements = WebDriverWait(self.driver, timeout).until(
-                EC.presence_of_all_elements_located((by, value))
-            )
+            logger.debug("Finding elements: %s=%s", by, value)
+            elements = self.waiter.until_all_present(by, value, timeout)
             return elements
         except Exception as e:
-            logger.error(f"Error finding elements {by}={value}: {e}")
+            logger.error("Error finding elements %s=%s: %s", by, value, e)
             raise
     
     def take_screenshot_element(self, by: By, value: str, timeout: int = 10, filename: str = "screenshot.png") -> None:
@@ -234,7 +240,7 @@ class Browser:
         filepath = os.path.join(self.screenshot_folder, filename)
 
         try:
-            logger.info(f"Taking screenshot: {filepath}")
+            logger.info("Taking screenshot: %s", filepath)
             element = self.find_element(by, value, timeout)
             
             # Remove height and width constraints using JavaScript
@@ -247,7 +253,7 @@ class Browser:
             element.screenshot(filepath)
             
         except Exception as e:
-            logger.error(f"Error taking screenshot {filename}: {e}")
+            logger.error("Error taking screenshot %s: %s", filename, e)
             raise
 
     def get_current_url(self) -> str:
@@ -261,16 +267,16 @@ class Browser:
             logger.info("Getting current URL")
             return self.driver.current_url
         except Exception as e:
-            logger.error(f"Error getting current URL: {e}")
+            logger.error("Error getting current URL: %s", e)
             raise
 
     def switch_to_frame(self, frame: str):
         """
         Switch to the frame.
         """
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         try:
-            logger.log_request_response("SWITCH_FRAME", f"Frame: {frame}")
+            logger.log_request_response("SWITCH_FRAME", "Frame: %s", frame)
             self.driver.switch_to.frame(frame)
         except Exception as e:
             logger.log_error_with_context(e, {
@@ -285,7 +291,7 @@ class Browser:
         """
         Switch to the default content.
         """
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         try:
             logger.log_request_response("SWITCH_DEFAULT", "Switching to default content")
             self.driver.switch_to.default_content()
@@ -297,12 +303,33 @@ class Browser:
         finally:
             logger.log_operation_time("switch_default_content", start_time)
 
+    def kill_process_tree(self) -> None:
+        """
+        Forcefully kill geckodriver and every Firefox process it started.
+
+        Used when the run deadline expires and the WebDriver session no longer responds.
+        """
+        process = self.service.process
+        if process is None or process.poll() is not None:
+            return
+        logger.warning("Killing browser process tree (geckodriver pid %s)", process.pid)
+        self.killed = True
+        if platform.system() == "Windows":
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)], capture_output=True)
+        else:
+            os.killpg(process.pid, signal.SIGKILL)
+
     def quit(self) -> None:
         """
         Properly close the browser and clean up resources.
         """
-        start_time = datetime.now()
+        if self.killed:
+            logger.info("Browser process tree was killed, skipping quit")
+            return
+        start_time = time.perf_counter()
         try:
+            logger.info("Element waits: %s calls, %.2f seconds total",
+                        self.waiter.wait_count, self.waiter.total_wait_time)
             logger.info("Closing browser...")
             self.driver.quit()
         except Exception as e:
@@ -0,0 +1,150 @@
+from collections import OrderedDict
+from typing import Optional
+import json
+import os
+import cv2
+from utils.logger import logger
+from utils.metrics import metrics
+from utils.constants import CAPTCHA_CACHE_FILE, CAPTCHA_CACHE_SIZE, CAPTCHA_CACHE_MAX_DISTANCE
+
+# Columns and rows of the difference hash. Captchas differing in one digit only
+# differ in a small area, so the grid is finer than the usual 8x8.
+HASH_WIDTH = 32
+HASH_HEIGHT = 16
+
+# Weight of the latest OCR time in the running average used to estimate time saved
+SOLVE_TIME_SMOOTHING = 0.2
+
+def image_hash(image) -> str:
+    """
+    Compute the difference hash (dHash) of a captcha image.
+
+    The image is shrunk to a small grayscale grid and each bit records whether a
+    pixel is brighter than its right neighbour, so re-encoded or slightly shifted
+    screenshots of the same captcha hash to the same or a nearby value.
+
+    Args:
+        image: BGR image as read by cv2
+
+    Returns:
+        str: HASH_WIDTH * HASH_HEIGHT bit hash in hex
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    pixels = cv2.resize(gray, (HASH_WIDTH + 1, HASH_HEIGHT), interpolation=cv2.INTER_AREA)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return f"{sum(1 << index for index, bit in enumerate(bits) if bit):0{HASH_WIDTH * HASH_HEIGHT // 4}x}"
+
+def hash_distance(first: str, second: str) -> int:
+    """Number of differing bits between two hashes"""
+    return bin(int(first, 16) ^ int(second, 16)).count("1")
+
+class CaptchaCache:
+    def __init__(self, state_file: str = CAPTCHA_CACHE_FILE, max_entries: int = CAPTCHA_CACHE_SIZE,
+                 max_distance: int = CAPTCHA_CACHE_MAX_DISTANCE):
+        """
+        Answers of captchas that led to a successful login, keyed by image hash.
+
+        If the portal draws its captchas from a finite pool, a captcha seen before
+        is answered without OCR. Entries are evicted least recently used first and
+        persisted between runs.
+
+        Args:
+            state_file (str): JSON file the cache is persisted to
+            max_entries (int): Entries kept, the least recently used are evicted
+            max_distance (int): Largest hash distance still treated as the same captcha
+        """
+        self.state_file = state_file
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.entries: "OrderedDict[str, int]" = OrderedDict()
+        self.stats = {"hits": 0, "lookups": 0, "mean_solve_seconds": 0.0}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.state_file, encoding="utf-8") as f:
+                state = json.load(f)
+            self.entries = OrderedDict((key, answer) for key, answer in state["entries"])
+            self.stats.update(state["stats"])
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.log_error_with_context(e, {
+                "operation": "load_captcha_cache",
+                "state_file": self.state_file
+            })
+
+    def _save(self) -> None:
+        directory = os.path.dirname(self.state_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        temp_file = f"{self.state_file}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump({"entries": list(self.entries.items()), "stats": self.stats}, f)
+        os.replace(temp_file, self.state_file)
+
+    def _find(self, key: str) -> Optional[str]:
+        """Get the stored hash matching a captcha hash, exactly or within max_distance"""
+        if key in self.entries:
+            return key
+        if self.max_distance <= 0:
+            return None
+        distance, nearest = min(((hash_distance(key, stored), stored) for stored in self.entries),
+                                default=(self.max_distance + 1, None))
+        return nearest if distance <= self.max_distance else None
+
+    def lookup(self, key: str) -> Optional[int]:
+        """
+        Get the answer of a captcha solved before and count the lookup.
+
+        Args:
+            key (str): Hash of the captcha image
+
+        Returns:
+            Optional[int]: The answer, None on a miss
+        """
+        stored = self._find(key)
+        self.stats["lookups"] += 1
+        if stored is not None:
+            self.stats["hits"] += 1
+            self.entries.move_to_end(stored)
+            metrics.increment("captcha_cache_lookups", 1, {"result": "hit"})
+            metrics.increment("captcha_cache_saved_seconds", self.stats["mean_solve_seconds"])
+        else:
+            metrics.increment("captcha_cache_lookups", 1, {"result": "miss"})
+        metrics.set_gauge("captcha_cache_hit_ratio", self.stats["hits"] / self.stats["lookups"])
+        self._persist()
+        return self.entries[stored] if stored is not None else None
+
+    def record_solve_time(self, seconds: float) -> None:
+        """Update the average OCR time a cache hit saves"""
+        mean = self.stats["mean_solve_seconds"]
+        self.stats["mean_solve_seconds"] = seconds if not mean else \
+            mean + SOLVE_TIME_SMOOTHING * (seconds - mean)
+        self._persist()
+
+    def remember(self, key: str, answer: int) -> None:
+        """Store the answer of a captcha the portal accepted"""
+        self.entries[key] = answer
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        metrics.set_gauge("captcha_cache_entries", len(self.entries))
+        self._persist()
+
+    def invalidate(self, key: str) -> None:
+        """Drop the entry a rejected answer came from"""
+        stored = self._find(key)
+        if stored is not None:
+            logger.info("Captcha cache answer for %s was rejected, dropping it", stored)
+            del self.entries[stored]
+            self._persist()
+
+    def _persist(self) -> None:
+        try:
+            self._save()
+        except OSError as e:
+            logger.log_error_with_context(e, {
+                "operation": "save_captcha_cache",
+                "state_file": self.state_file
+            })
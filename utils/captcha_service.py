@@ -0,0 +1,284 @@
+"""
+Host-wide captcha OCR service.
+
+One process loads the TrOCR model and reads captcha crops for every notifier on
+the host over a Unix domain socket, instead of each process loading its own copy.
+Requests that arrive within a short window are run through the model as one batch.
+
+The protocol is one JSON object per line in each direction:
+
+    {"image": "<base64 PNG>"}  ->  {"text": "12"} or {"error": "..."}
+    {"stats": true}            ->  {"pid": 123, "rss_bytes": ..., "requests": ..., "batches": ...}
+
+Start it with "python main.py captcha-service"; clients also start it on demand.
+"""
+
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+import socketserver
+import subprocess
+import threading
+import socket
+import base64
+import queue
+import json
+import time
+import sys
+import io
+import os
+from utils.logger import logger
+from utils.deadline import Deadline
+from utils.run_lock import RunLock
+from utils.constants import (LOGS_FOLDER, CAPTCHA_SOCKET, CAPTCHA_BATCH_WINDOW, CAPTCHA_MAX_BATCH,
+                             CAPTCHA_SERVICE_IDLE_TIMEOUT, CAPTCHA_SERVICE_TIMEOUT, CAPTCHA_SERVICE_START_TIMEOUT)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class CaptchaServiceError(Exception):
+    """Raised when the service cannot read an image"""
+
+class CaptchaRequestHandler(socketserver.StreamRequestHandler):
+    server: "CaptchaService"
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if request.get("stats"):
+                    reply = self.server.stats()
+                else:
+                    future = self.server.submit(base64.b64decode(request["image"]))
+                    reply = {"text": future.result(timeout=CAPTCHA_SERVICE_TIMEOUT)}
+            except Exception as e:
+                reply = {"error": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+class CaptchaService(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str = CAPTCHA_SOCKET, batch_window: float = CAPTCHA_BATCH_WINDOW,
+                 max_batch: int = CAPTCHA_MAX_BATCH, idle_timeout: float = CAPTCHA_SERVICE_IDLE_TIMEOUT):
+        """
+        Bind the service socket; call serve() to load the model and answer requests.
+
+        Args:
+            socket_path (str): Path of the Unix domain socket
+            batch_window (float): Seconds to wait for more requests after the first of a batch
+            max_batch (int): Largest number of images run through the model at once
+            idle_timeout (float): Exit after this many seconds without requests, 0 to never exit
+        """
+        if os.path.exists(socket_path):
+            # The caller holds the service lock, so this is left over from a crash
+            os.remove(socket_path)
+        # Create the socket owner-only; a chmod after bind would leave it open to others in between
+        previous_umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, CaptchaRequestHandler)
+        finally:
+            os.umask(previous_umask)
+        self.socket_path = socket_path
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.idle_timeout = idle_timeout
+        self.requests: "queue.Queue[tuple[bytes, Future]]" = queue.Queue()
+        self.request_count = 0
+        self.batch_count = 0
+        self.largest_batch = 0
+
+    def submit(self, image: bytes) -> Future:
+        """Queue a PNG image for the next batch"""
+        future: Future = Future()
+        self.requests.put((image, future))
+        return future
+
+    def stats(self) -> Dict:
+        """Describe the service for clients and benchmarks"""
+        from utils.memory import rss_bytes
+
+        return {
+            "pid": os.getpid(),
+            "rss_bytes": rss_bytes(os.getpid()),
+            "requests": self.request_count,
+            "batches": self.batch_count,
+            "largest_batch": self.largest_batch
+        }
+
+    def serve(self) -> None:
+        """Answer requests until the service has been idle for idle_timeout"""
+        threading.Thread(target=self.run_batches, name="captcha-batcher", daemon=True).start()
+        try:
+            self.serve_forever()
+        finally:
+            self.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    def run_batches(self) -> None:
+        """Load the model, then collect queued requests into batches and read them with it"""
+        from utils.captcha_solver import get_pipe
+
+        try:
+            pipe = get_pipe()
+        except Exception as e:
+            logger.log_error_with_context(e, {
+                "operation": "captcha_service_load_model"
+            })
+            self.shutdown()
+            return
+
+        while True:
+            try:
+                batch = [self.requests.get(timeout=self.idle_timeout or None)]
+            except queue.Empty:
+                logger.info("Captcha service idle for %s seconds, exiting", self.idle_timeout)
+                self.shutdown()
+                return
+            closes_at = time.perf_counter() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = closes_at - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self.run_batch(pipe, batch)
+
+    def run_batch(self, pipe, batch: List[tuple]) -> None:
+        """Read every image of a batch in one pipeline call"""
+        from PIL import Image
+
+        start_time = time.perf_counter()
+        try:
+            images = [Image.open(io.BytesIO(image)).convert("RGB") for image, _ in batch]
+            outputs = pipe(images, batch_size=len(images))
+            for (_, future), output in zip(batch, outputs):
+                future.set_result(output[0]["generated_text"])
+        except Exception as e:
+            logger.log_error_with_context(e, {
+                "operation": "captcha_service_batch",
+                "batch_size": len(batch)
+            })
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self.request_count += len(batch)
+            self.batch_count += 1
+            self.largest_batch = max(self.largest_batch, len(batch))
+            logger.log_operation_time("captcha_batch", start_time, {"size": str(len(batch))})
+
+class CaptchaClient:
+    def __init__(self, socket_path: str = CAPTCHA_SOCKET, timeout: float = CAPTCHA_SERVICE_TIMEOUT,
+                 start_timeout: float = CAPTCHA_SERVICE_START_TIMEOUT, deadline: Optional[Deadline] = None):
+        """
+        Thin client of the captcha service.
+
+        Args:
+            socket_path (str): Path of the service socket
+            timeout (float): Seconds to wait for an answer; the first one includes the model load
+            start_timeout (float): Seconds to wait for a spawned service to accept connections
+            deadline (Optional[Deadline]): Run deadline, which the timeout never outlives
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.start_timeout = start_timeout
+        self.deadline = deadline or Deadline()
+
+    def read_text(self, image_path: str) -> str:
+        """
+        Read the text of a cropped captcha image through the service.
+
+        Raises:
+            OSError: If the service cannot be reached or started
+            CaptchaServiceError: If the service failed to read the image
+        """
+        with open(image_path, "rb") as f:
+            reply = self.request({"image": base64.b64encode(f.read()).decode("ascii")})
+        if "error" in reply:
+            raise CaptchaServiceError(reply["error"])
+        return reply["text"]
+
+    def stats(self) -> Dict:
+        """Get the service's pid, memory use and batch counts"""
+        return self.request({"stats": True})
+
+    def request(self, payload: Dict) -> Dict:
+        """
+        Send one request and wait for its reply.
+
+        Raises:
+            DeadlineExceeded: If the run deadline has already passed
+        """
+        with self.connect() as connection:
+            connection.settimeout(self.deadline.clamp(self.timeout))
+            connection.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+            with connection.makefile("rb") as reply:
+                line = reply.readline()
+        if not line:
+            raise ConnectionResetError("Captcha service closed the connection")
+        return json.loads(line)
+
+    def connect(self) -> socket.socket:
+        """Connect to the service, starting it if it is not running"""
+        try:
+            return self._connect()
+        except (FileNotFoundError, ConnectionRefusedError):
+            self.spawn()
+
+        give_up_at = time.monotonic() + self.start_timeout
+        while True:
+            try:
+                return self._connect()
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() >= give_up_at:
+                    raise
+                time.sleep(0.1)
+
+    def _connect(self) -> socket.socket:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(self.socket_path)
+        except OSError:
+            connection.close()
+            raise
+        return connection
+
+    def spawn(self) -> None:
+        """
+        Start the service in the background, detached from this run.
+
+        It is started through a short-lived intermediate process so it is not a
+        child of the run: it is not counted in the run's browser memory, does not
+        become a zombie when it exits first and survives the run.
+        """
+        logger.info("Starting captcha service at %s", self.socket_path)
+        launcher = "import subprocess, sys; subprocess.Popen(sys.argv[1:], start_new_session=True)"
+        subprocess.run([sys.executable, "-c", launcher, sys.executable, "-m", "utils.captcha_service"],
+                       cwd=PROJECT_ROOT, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, check=False)
+
+def serve(socket_path: str = CAPTCHA_SOCKET) -> int:
+    """
+    Run the captcha service in this process until it goes idle.
+
+    Returns:
+        int: Process exit status; 0 also when another service already runs
+    """
+    # The service outlives runs, so it gets its own log files
+    logger.log_directory = os.path.join(LOGS_FOLDER, "captcha_service")
+    lock = RunLock(f"{socket_path}.lock")
+    if not lock.acquire():
+        logger.info("Captcha service already running at %s", socket_path)
+        return 0
+    try:
+        service = CaptchaService(socket_path)
+        logger.info("Captcha service listening at %s (batch window %.3f s, max batch %s)",
+                    socket_path, service.batch_window, service.max_batch)
+        service.serve()
+        return 0
+    finally:
+        lock.release()
+
+if __name__ == "__main__":
+    sys.exit(serve())
@@ -12,30 +12,154 @@ Modifications made:
 - Removed hardcoded file paths
 - Optimized image cropping positions and dimensions
 - Added better number cleaning and validation
+- Added reading the whole expression in one OCR call, with a safe evaluator
 """
 
 import cv2
 import numpy as np
-from transformers import pipeline, logging as transformers_logging
+import threading
+import operator
+import socket
+import time
+import re
 import os
+from typing import Optional, Tuple
 from utils.logger import logger
-from utils.constants import SCREENSHOTS_FOLDER
+from utils.metrics import metrics
+from utils.tracing import tracer
+from utils.captcha_cache import CaptchaCache, image_hash
+from utils.deadline import Deadline
+from utils.constants import SCREENSHOTS_FOLDER, CAPTCHA_SERVICE, CAPTCHA_MODE, CAPTCHA_OPERAND_MAX
 
-# Disable the transformers logging for model loading
-transformers_logging.set_verbosity_error()
+# Read crops through the shared captcha service while it works, else in-process
+use_service = CAPTCHA_SERVICE and hasattr(socket, "AF_UNIX")
 
-# Initialize the OCR pipeline for image-to-text conversion
-pipe = pipeline("image-to-text", model="microsoft/trocr-large-printed")
+# Operators the captcha uses, as the OCR may spell them
+OPERATIONS = {"+": operator.add, "-": operator.sub, "×": operator.mul}
+OPERATOR_SPELLINGS = {"+": "+", "-": "-", "−": "-", "–": "-", "—": "-", "×": "×", "x": "×", "X": "×", "*": "×"}
+
+# "a op b", optionally followed by "=" and "?" as printed on the captcha
+EXPRESSION_PATTERN = re.compile(
+    r"^\s*(?P<left>\d+)\s*(?P<operator>[" + re.escape("".join(OPERATOR_SPELLINGS)) + r"])\s*(?P<right>\d+)\s*=?\s*\??\s*$"
+)
+
+# Rows and columns of the captcha holding the expression, the union of the digit crops
+EXPRESSION_REGION = (slice(7, 30), slice(10, 130))
+
+def parse_expression(text: str) -> Optional[Tuple[int, str, int]]:
+    """
+    Parse the OCR text of a whole captcha expression.
+
+    Args:
+        text (str): Text such as "12 + 7 =" or "9x3"
+
+    Returns:
+        Optional[Tuple[int, str, int]]: (left, operator, right) with the operator
+        one of OPERATIONS, None if the text is not an expression or an operand is
+        outside 0..CAPTCHA_OPERAND_MAX
+    """
+    match = EXPRESSION_PATTERN.match(text)
+    if match is None:
+        return None
+    left, right = int(match.group("left")), int(match.group("right"))
+    if not (0 <= left <= CAPTCHA_OPERAND_MAX and 0 <= right <= CAPTCHA_OPERAND_MAX):
+        logger.debug("Captcha operands out of range: %s", text)
+        return None
+    return left, OPERATOR_SPELLINGS[match.group("operator")], right
+
+def evaluate(left: int, operator_symbol: str, right: int) -> int:
+    """Apply one of OPERATIONS, without eval"""
+    return OPERATIONS[operator_symbol](left, right)
+
+# OCR pipeline for image-to-text conversion, loaded on first use
+_pipe = None
+_pipe_lock = threading.Lock()
+
+def get_pipe():
+    """
+    Get the OCR pipeline, loading the model the first time it is needed.
+
+    transformers and torch take seconds to import and the model takes more to
+    load, so this only happens when a captcha has to be solved or warm_up() runs.
+    A caller arriving while another thread loads the model waits for it.
+
+    Returns:
+        The transformers image-to-text pipeline
+    """
+    global _pipe
+    wait_start_time = time.perf_counter()
+    with _pipe_lock:
+        if time.perf_counter() - wait_start_time > 0.01:
+            logger.log_operation_time("ocr_model_wait", wait_start_time)
+        if _pipe is None:
+            start_time = time.perf_counter()
+            with tracer.span("captcha.load_model"):
+                from transformers import pipeline, logging as transformers_logging
+                from PIL import Image
+
+                # Disable the transformers logging for model loading
+                transformers_logging.set_verbosity_error()
+                pipe = pipeline("image-to-text", model="microsoft/trocr-large-printed")
+                # The first inference is slower than the rest, so take it here
+                pipe(Image.new("RGB", (40, 23), "white"))
+                _pipe = pipe
+            logger.log_operation_time("load_ocr_model", start_time)
+        return _pipe
+
+@tracer.traced("captcha.warm_up")
+def warm_up() -> None:
+    """
+    Get the OCR model ready before the first captcha, e.g. while the browser starts.
+
+    With the captcha service this starts the service if needed, which loads the
+    model in its own process; otherwise the model is loaded in this process.
+    """
+    global use_service
+    start_time = time.perf_counter()
+    try:
+        if use_service:
+            from utils.captcha_service import CaptchaClient
+
+            try:
+                CaptchaClient().stats()
+                return
+            except OSError as e:
+                logger.warning("Captcha service unavailable, loading the OCR model in-process: %s", e)
+                use_service = False
+        get_pipe()
+    except Exception as e:
+        # The first captcha loads the model itself and reports the error then
+        logger.log_error_with_context(e, {
+            "operation": "captcha_warm_up"
+        })
+    finally:
+        logger.log_operation_time("captcha_warm_up", start_time)
 
 class CaptchaSolver:
-    def __init__(self, image_path):
+    def __init__(self, image_path, cache: Optional[CaptchaCache] = None, mode: str = CAPTCHA_MODE,
+                 deadline: Optional[Deadline] = None):
         """
         Initialize the CaptchaSolver with the given image path.
         
         Args:
             image_path (str): Path to the captcha image
+            cache (Optional[CaptchaCache]): Answers of captchas solved before, consulted before OCR
+            mode (str): "expression" reads the whole expression in one OCR call and
+                falls back to the crops if it cannot be parsed; "crops" only reads the
+                digit crops
+            deadline (Optional[Deadline]): Run deadline bounding the wait for the captcha service
         """
         self.image = cv2.imread(image_path)
+        self.cache = cache
+        self.mode = mode
+        self.deadline = deadline
+        self.image_hash: Optional[str] = None
+        self.from_cache = False
+        # OCR calls made and the method that produced the answer, for metrics and benchmarks
+        self.ocr_calls = 0
+        self.solved_by: Optional[str] = None
+        # Operator read from the expression, applied by the crop fallback
+        self.operator_symbol = "+"
         self.kernel = np.ones((2, 2), np.uint8)
         # Get data folder path from environment variables
         self.data_folder = SCREENSHOTS_FOLDER
@@ -70,30 +194,71 @@ class CaptchaSolver:
 
     def math_operation(self, left_number, right_number):
         """
-        Perform addition operation on the cleaned numbers.
+        Apply the captcha's operator to the cleaned numbers.
+
+        The crops do not show the operator, so it is the one read from the whole
+        expression if that got far enough, else addition.
         
         Args:
             left_number: First number
             right_number: Second number
             
         Returns:
-            int: Result of the addition operation
+            int: Result of the operation
         """
         try:
             # Clean both numbers before processing
             left_number = self.clean_number(str(left_number))
             right_number = self.clean_number(str(right_number))
             
-            if right_number.isdigit():
-                result = eval(f"{left_number} + {right_number}")
-                logger.debug(f"Operation: {left_number} + {right_number} = {result}")
+            if left_number.isdigit() and right_number.isdigit():
+                result = evaluate(int(left_number), self.operator_symbol, int(right_number))
+                logger.debug("Operation: %s %s %s = %s", left_number, self.operator_symbol, right_number, result)
                 return result
-            logger.warning(f"Right number not a digit after cleaning: {right_number}")
+            logger.warning("Numbers not digits after cleaning: %s, %s", left_number, right_number)
             return None
         except Exception as e:
-            logger.error(f"Error in math_operation: {e}")
+            logger.error("Error in math_operation: %s", e)
+            return None
+
+    def _ocr(self, image_path: str) -> str:
+        """
+        Read the text of one cropped image with the OCR pipeline.
+
+        Args:
+            image_path (str): Path to the cropped image
+
+        Returns:
+            str: The recognized text
+        """
+        self.ocr_calls += 1
+        with tracer.span("captcha.ocr", image=os.path.basename(image_path)) as span:
+            text = self._ocr_with_service(image_path) if use_service else None
+            if text is None:
+                text = get_pipe()(image_path)[0]['generated_text']
+            if span:
+                span.set_attribute("text", text)
+            return text
+
+    def _ocr_with_service(self, image_path: str):
+        """
+        Read the text of one cropped image through the shared captcha service.
+
+        Returns:
+            Optional[str]: The recognized text, None if the service is unavailable,
+            after which this process uses its own model for the rest of its life
+        """
+        global use_service
+        from utils.captcha_service import CaptchaClient, CaptchaServiceError
+
+        try:
+            return CaptchaClient(deadline=self.deadline).read_text(image_path)
+        except (OSError, CaptchaServiceError, ValueError) as e:
+            logger.warning("Captcha service unavailable, loading the OCR model in-process: %s", e)
+            use_service = False
             return None
 
+    @tracer.traced("captcha.resolve")
     def resolve(self, left_image, right_image, left_image_twice, right_image_twice):
         """
         Resolve the captcha by attempting to read numbers from different image versions.
@@ -110,38 +275,39 @@ class CaptchaSolver:
         logger.info("Attempting to resolve captcha...")
         
         # First attempt with twice images
-        left_number = pipe(left_image_twice)[0]['generated_text']
-        logger.debug(f"Left number (twice): {left_number}")
+        left_number = self._ocr(left_image_twice)
+        logger.debug("Left number (twice): %s", left_number)
         
         if left_number.isdigit():
             left_number = int(left_number)
             if left_number < 10 or left_number == None or left_number == "":
                 logger.debug("Left number < 10, trying unit image")
-                left_number = pipe(left_image)[0]['generated_text']
-                right_number = pipe(right_image_twice)[0]['generated_text']
-                logger.debug(f"New left number: {left_number}, Right number: {right_number}")
+                left_number = self._ocr(left_image)
+                right_number = self._ocr(right_image_twice)
+                logger.debug("New left number: %s, Right number: %s", left_number, right_number)
                 
                 if right_number.isdigit() and int(right_number) > 10:
                     return self.math_operation(left_number, right_number)
                 else:
-                    right_number = pipe(right_image)[0]['generated_text']
-                    logger.debug(f"Using unit right number: {right_number}")
+                    right_number = self._ocr(right_image)
+                    logger.debug("Using unit right number: %s", right_number)
                     return self.math_operation(left_number, right_number)
             elif left_number >= 10:
-                right_number = pipe(right_image_twice)[0]['generated_text']
-                logger.debug(f"Using twice right number: {right_number}")
+                right_number = self._ocr(right_image_twice)
+                logger.debug("Using twice right number: %s", right_number)
                 return self.math_operation(left_number, right_number)
         else:
             logger.debug("Left number not a digit, trying unit image")
-            left_number = pipe(left_image)[0]['generated_text']
+            left_number = self._ocr(left_image)
             if left_number.isdigit():
-                right_number = pipe(right_image)[0]['generated_text']
-                logger.debug(f"New left number: {left_number}, Right number: {right_number}")
+                right_number = self._ocr(right_image)
+                logger.debug("New left number: %s, Right number: %s", left_number, right_number)
                 return self.math_operation(left_number, right_number)
         
         logger.error("Failed to resolve captcha")
         return None
 
+    @tracer.traced("captcha.solve")
     def solve_captcha(self):
         """
         Main method to solve the captcha by processing different parts of the image.
@@ -149,6 +315,61 @@ class CaptchaSolver:
         Returns:
             int: Result of the captcha calculation or None if failed
         """
+        self.image_hash = image_hash(self.image)
+        if self.cache is not None:
+            answer = self.cache.lookup(self.image_hash)
+            if answer is not None:
+                logger.info("Captcha %s answered from cache", self.image_hash)
+                self.from_cache = True
+                self.solved_by = "cache"
+                return answer
+        start_time = time.perf_counter()
+
+        result = self.solve_expression() if self.mode == "expression" else None
+        if result is not None:
+            self.solved_by = "expression"
+        else:
+            result = self.solve_crops()
+            self.solved_by = "crops" if result is not None else None
+        metrics.increment("captcha_ocr_calls", self.ocr_calls, {"mode": self.mode})
+        metrics.increment("captcha_solves", 1, {"mode": self.mode, "solved_by": self.solved_by or "failed"})
+        if self.cache is not None:
+            self.cache.record_solve_time(time.perf_counter() - start_time)
+        return result
+
+    @tracer.traced("captcha.solve_expression")
+    def solve_expression(self) -> Optional[int]:
+        """
+        Read the whole expression in one OCR call and evaluate it.
+
+        Returns:
+            Optional[int]: The answer, None if the text could not be parsed
+        """
+        expression_image = self.enhance_legibility(self.image[EXPRESSION_REGION])
+        expression_path = os.path.join(self.data_folder, 'expression.png')
+        cv2.imwrite(expression_path, expression_image)
+
+        text = self._ocr(expression_path)
+        parsed = parse_expression(text)
+        if parsed is None:
+            # Keep the operator for the crop fallback if the text shows exactly one
+            operators = {OPERATOR_SPELLINGS[char] for char in text if char in OPERATOR_SPELLINGS}
+            if len(operators) == 1:
+                self.operator_symbol = operators.pop()
+            logger.info("Could not parse captcha expression %r, reading the digit crops", text)
+            return None
+        left, self.operator_symbol, right = parsed
+        result = evaluate(left, self.operator_symbol, right)
+        logger.debug("Expression: %s %s %s = %s", left, self.operator_symbol, right, result)
+        return result
+
+    def solve_crops(self) -> Optional[int]:
+        """
+        Read the operands from fixed crops, guessing one or two digits, in up to four OCR calls.
+
+        Returns:
+            Optional[int]: The answer, None if the numbers could not be read
+        """
         # Define positions and dimensions for image cropping
         positions = {'left': 10, 'right_unit': 80, 'right_twice': 90}
         dimensions = {'width_twice': 40, 'width_unit': 25, 'height': 25}
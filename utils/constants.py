@@ -1,9 +1,20 @@
-from selenium.webdriver.common.by import By
 from dotenv import load_dotenv
+import tempfile
 import os
 
 load_dotenv()
 
+class By:
+    """
+    Locator strategies, with the same values as selenium's By.
+
+    Importing selenium's By loads the whole webdriver package, which commands
+    that never open a browser should not pay for.
+    """
+    ID = "id"
+    XPATH = "xpath"
+    CSS_SELECTOR = "css selector"
+
 # Username and password for Beykent OBS system
 USERNAME = os.getenv("USERNAME", None)
 PASSWORD = os.getenv("PASSWORD", None)
@@ -12,17 +23,172 @@ PASSWORD = os.getenv("PASSWORD", None)
 HEADLESS = os.getenv("HEADLESS", "true").lower() == "true"
 HEADLESS_RAW_VALUE = os.getenv("HEADLESS", "true")
 
+# Scraping engine: "selenium" drives Firefox, "http" posts the portal forms directly
+ENGINE = os.getenv("ENGINE", "selenium").lower()
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+
+# Results settings
+SCRAPE_ALL_TERMS = os.getenv("SCRAPE_ALL_TERMS", "true").lower() == "true"  # Also check earlier terms
+TERM_SCRAPE_WORKERS = int(os.getenv("TERM_SCRAPE_WORKERS", "4"))  # Terms fetched at the same time
+
+# Score cell label to exam type; labels not listed are kept under their own name
+EXAM_TYPE_LABELS = {
+    "Vize": "midterm",
+    "Ara Sınav": "midterm",
+    "Final": "final",
+    "Büt": "make-up",
+    "Bütünleme": "make-up",
+    "Quiz": "quiz",
+    "Kısa Sınav": "quiz",
+    "Ödev": "homework",
+    "Proje": "project",
+    "Harf Notu": "letter-grade",
+    "Harf": "letter-grade"
+}
+# Extra or overriding labels, e.g. EXAM_TYPE_LABELS_EXTRA="Lab=lab,Sözlü=oral"
+EXAM_TYPE_LABELS.update(
+    item.strip().split("=", 1) for item in os.getenv("EXAM_TYPE_LABELS_EXTRA", "").split(",") if "=" in item
+)
+
+# Logging settings
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()  # DEBUG also records every request and query
+
+# Metrics settings
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))  # Daemon /metrics endpoint on localhost, 0 disables it
+
+# Tracing settings: one trace file per run, "chrome" (chrome://tracing, Perfetto) or "otlp"
+TRACING = os.getenv("TRACING", "true").lower() == "true"
+TRACE_FORMAT = os.getenv("TRACE_FORMAT", "chrome").lower()
+TRACE_RETENTION = int(os.getenv("TRACE_RETENTION", "20"))  # Trace files kept
+
+# Profiling settings: stages are "run", "login", "captcha" and "results"
+PROFILE = os.getenv("PROFILE", "false").lower() == "true"
+PROFILE_STAGES = [stage.strip() for stage in os.getenv("PROFILE_STAGES", "run").split(",") if stage.strip()]
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))  # Seconds between stack samples
+PROFILE_RETENTION = int(os.getenv("PROFILE_RETENTION", "10"))  # Profiled stages kept
+
+# Captcha service: one process on the host loads the OCR model and serves every run
+CAPTCHA_SERVICE = os.getenv("CAPTCHA_SERVICE", "true").lower() == "true"
+CAPTCHA_SOCKET = os.getenv("CAPTCHA_SOCKET", os.path.join(
+    tempfile.gettempdir(), f"beykent-captcha-{os.getuid() if hasattr(os, 'getuid') else 0}.sock"))
+CAPTCHA_BATCH_WINDOW = float(os.getenv("CAPTCHA_BATCH_WINDOW", "0.02"))  # Seconds to gather a batch
+CAPTCHA_MAX_BATCH = int(os.getenv("CAPTCHA_MAX_BATCH", "16"))
+CAPTCHA_SERVICE_IDLE_TIMEOUT = float(os.getenv("CAPTCHA_SERVICE_IDLE_TIMEOUT", "900"))  # 0 keeps it running
+CAPTCHA_SERVICE_TIMEOUT = float(os.getenv("CAPTCHA_SERVICE_TIMEOUT", "120"))  # Includes the first model load
+CAPTCHA_SERVICE_START_TIMEOUT = float(os.getenv("CAPTCHA_SERVICE_START_TIMEOUT", "10"))
+
+# Load the OCR model in the background while the browser starts
+CAPTCHA_WARM_UP = os.getenv("CAPTCHA_WARM_UP", "true").lower() == "true"
+
+# Captcha reading: "expression" OCRs the whole "a op b" in one call, falling back to the
+# digit crops when it cannot be parsed; "crops" only reads the digit crops (up to 4 calls)
+CAPTCHA_MODE = os.getenv("CAPTCHA_MODE", "expression").lower()
+CAPTCHA_OPERAND_MAX = int(os.getenv("CAPTCHA_OPERAND_MAX", "99"))  # Larger operands are misreads
+# Save accepted captchas as data/captcha_corpus/<answer>-<hash>.png for tools.captcha_benchmark
+CAPTCHA_CORPUS = os.getenv("CAPTCHA_CORPUS", "false").lower() == "true"
+
+# Captcha cache: answers of accepted captchas, keyed by a perceptual hash of the image
+CAPTCHA_CACHE = os.getenv("CAPTCHA_CACHE", "true").lower() == "true"
+CAPTCHA_CACHE_SIZE = int(os.getenv("CAPTCHA_CACHE_SIZE", "1000"))
+# Captchas one digit apart can differ in only a few hash bits, so only exact matches count by default
+CAPTCHA_CACHE_MAX_DISTANCE = int(os.getenv("CAPTCHA_CACHE_MAX_DISTANCE", "0"))
+
+# Snapshots: every distinct grades grid is kept gzipped, addressed by its hash, for re-parsing
+SNAPSHOTS = os.getenv("SNAPSHOTS", "true").lower() == "true"
+
+# Memory settings: RSS of this process and the browser tree is recorded at each stage
+MEMORY_TRACKING = os.getenv("MEMORY_TRACKING", "true").lower() == "true"
+MEMORY_TRACEMALLOC = os.getenv("MEMORY_TRACEMALLOC", "false").lower() == "true"  # Python heap, slows runs down
+MEMORY_TOP_ALLOCATIONS = int(os.getenv("MEMORY_TOP_ALLOCATIONS", "10"))
+MEMORY_ALERT_MB = int(os.getenv("MEMORY_ALERT_MB", "2048"))  # 0 disables the alert
+
+# Database settings: reads use a pool of connections, writes go through one writer thread
+DB_BUSY_TIMEOUT = float(os.getenv("DB_BUSY_TIMEOUT", "5"))  # Seconds to wait for another process's write lock
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "4"))  # Read connections kept open
+DB_WRITE_BATCH = int(os.getenv("DB_WRITE_BATCH", "100"))  # Most writes committed in one transaction
+
+# Run control settings
+RUN_TIMEOUT = float(os.getenv("RUN_TIMEOUT", "300"))  # Hard deadline for a single run in seconds
+LOCK_WAIT = float(os.getenv("LOCK_WAIT", "0"))  # Seconds to wait for a run already in flight
+
+# Polling schedule settings (minutes)
+POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", "10"))
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", "360"))
+
+# Portal health settings
+PROBE_TIMEOUT = float(os.getenv("PROBE_TIMEOUT", "3"))
+CIRCUIT_BREAKER_BASE_BACKOFF = float(os.getenv("CIRCUIT_BREAKER_BASE_BACKOFF", "300"))
+CIRCUIT_BREAKER_MAX_BACKOFF = float(os.getenv("CIRCUIT_BREAKER_MAX_BACKOFF", "21600"))
+
 # NTFY.SH settings
 NTFY_TOPIC = os.getenv("NTFY_TOPIC", None)
+NTFY_SERVER = os.getenv("NTFY_SERVER", "https://ntfy.sh").rstrip("/")
+NTFY_TOKEN = os.getenv("NTFY_TOKEN", None)  # Access token of a self-hosted server that requires one
+
+# Notification backends, every notification goes to all of them: any of ntfy, webhook, email
+NOTIFIERS = [name.strip().lower() for name in os.getenv("NOTIFIERS", "ntfy").split(",") if name.strip()]
+# Per-backend send timeout in seconds and sends in flight, e.g. NOTIFIER_TIMEOUTS="email=30,webhook=3"
+NOTIFIER_TIMEOUTS = {
+    name.strip(): float(value) for name, value in (
+        item.split("=", 1) for item in os.getenv("NOTIFIER_TIMEOUTS", "").split(",") if "=" in item)
+}
+NOTIFIER_CONCURRENCY = {
+    name.strip(): int(value) for name, value in (
+        item.split("=", 1) for item in os.getenv("NOTIFIER_CONCURRENCY", "").split(",") if "=" in item)
+}
+# Per-destination sends per second and burst, e.g. NOTIFIER_RATES="ntfy=1" (0 for no limit)
+NOTIFIER_RATES = {
+    name.strip(): float(value) for name, value in (
+        item.split("=", 1) for item in os.getenv("NOTIFIER_RATES", "").split(",") if "=" in item)
+}
+NOTIFIER_BURSTS = {
+    name.strip(): int(value) for name, value in (
+        item.split("=", 1) for item in os.getenv("NOTIFIER_BURSTS", "").split(",") if "=" in item)
+}
+# Sends per second and burst across all destinations of the process, 0 for no limit
+NOTIFY_GLOBAL_RATE = float(os.getenv("NOTIFY_GLOBAL_RATE", "5"))
+NOTIFY_GLOBAL_BURST = int(os.getenv("NOTIFY_GLOBAL_BURST", "20"))
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "5"))  # Sends of a message a destination rate limited
+
+# Webhook settings (Slack, Discord or plain JSON)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", None)
+WEBHOOK_FORMAT = os.getenv("WEBHOOK_FORMAT", "slack").lower()
 
-# Base URLs for Beykent OBS system
-LOGIN_URL = "https://obs.beykent.edu.tr/oibs/std/login.aspx"
-HOME_URL = "https://obs.beykent.edu.tr/oibs/std/index.aspx?curOp=0"
+# Email settings
+SMTP_HOST = os.getenv("SMTP_HOST", None)
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME", None)
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", None)
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+EMAIL_FROM = os.getenv("EMAIL_FROM", None)  # SMTP_USERNAME if empty
+EMAIL_TO = [address.strip() for address in os.getenv("EMAIL_TO", "").split(",") if address.strip()]
+
+# Base URLs for Beykent OBS system (OBS_BASE_URL can point at a local replay server)
+OBS_BASE_URL = os.getenv("OBS_BASE_URL", "https://obs.beykent.edu.tr").rstrip("/")
+LOGIN_URL = f"{OBS_BASE_URL}/oibs/std/login.aspx"
+HOME_URL = f"{OBS_BASE_URL}/oibs/std/index.aspx?curOp=0"
+# The portal serves different markup to unknown clients, so look like the Selenium Firefox
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64; rv:136.0) Gecko/20100101 Firefox/136.0"
+# Used by the HTTP engine when the grades link cannot be found in the menu
+RESULTS_FRAME_URL = f"{OBS_BASE_URL}/oibs/std/not_listesi_op.aspx"
 
 # Folder paths
-DATA_FOLDER = "data"
+DATA_FOLDER = os.getenv("DATA_FOLDER", "data")
 LOGS_FOLDER = "logs"
-SCREENSHOTS_FOLDER = "data/screenshots"
+PROFILES_FOLDER = f"{LOGS_FOLDER}/profiles"
+DATABASE_PATH = f"{DATA_FOLDER}/results.db"
+SCREENSHOTS_FOLDER = f"{DATA_FOLDER}/screenshots"
+RECORDINGS_FOLDER = f"{DATA_FOLDER}/recordings"
+LOCK_FILE = f"{DATA_FOLDER}/notifier.lock"
+CIRCUIT_BREAKER_FILE = f"{DATA_FOLDER}/circuit_breaker.json"
+SCHEDULER_STATE_FILE = f"{DATA_FOLDER}/scheduler.json"
+TRACES_FOLDER = f"{DATA_FOLDER}/traces"
+CAPTCHA_CACHE_FILE = f"{DATA_FOLDER}/captcha_cache.json"
+SNAPSHOTS_FOLDER = f"{DATA_FOLDER}/snapshots"
+CAPTCHA_CORPUS_FOLDER = f"{DATA_FOLDER}/captcha_corpus"
+# Point METRICS_TEXTFILE at the node_exporter textfile collector directory to scrape it
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE", f"{DATA_FOLDER}/metrics/obs_notifier.prom")
+METRICS_JSON_FILE = os.getenv("METRICS_JSON_FILE", f"{DATA_FOLDER}/metrics/summary.json")
 
 # Login page locators
 LOGIN_PAGE_LOCATORS = {
@@ -30,7 +196,14 @@ LOGIN_PAGE_LOCATORS = {
     "password_input": (By.ID, "txtParamT02"),
     "captcha_image": (By.ID, "imgCaptchaImg"),
     "captcha_input": (By.ID, "txtSecCode"),
-    "login_button": (By.ID, "btnLogin")
+    "login_button": (By.ID, "btnLogin"),
+    "error_message": (By.ID, "lblSonuclar")
+}
+
+# Keywords used to classify the login error message shown by the portal
+LOGIN_ERROR_KEYWORDS = {
+    "wrong_captcha": ["güvenlik kodu", "guvenlik kodu", "doğrulama kodu", "dogrulama kodu", "captcha"],
+    "wrong_credentials": ["şifre", "sifre", "parola", "kullanıcı adı", "kullanici adi", "öğrenci no"]
 }
 
 # Results page locators
@@ -38,7 +211,9 @@ RESULTS_PAGE_LOCATORS = {
     "menu_button": (By.XPATH, "/html/body/form/div[6]/aside/div[2]/nav/span/ul/li[3]/a"),
     "results_page_button": (By.XPATH, "/html/body/form/div[6]/aside/div[2]/nav/span/ul/li[3]/ul/li[4]/a"),
     "results_table": (By.XPATH, '//*[@id="grd_not_listesi"]'),
-    "results_frame": "IFRAME1"
+    "results_frame": "IFRAME1",
+    "term_select": (By.ID, "cmbDonemler"),
+    "results_menu_text": "Not Listesi"
 }
 
 
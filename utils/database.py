@@ -1,20 +1,226 @@
 import sqlite3
+import os
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 from models.model import Result
 from utils.logger import logger
-from datetime import datetime
-from utils.constants import DATA_FOLDER
+from utils.metrics import metrics
+import threading
+import queue
+import json
+import time
+from utils.constants import DATABASE_PATH, DB_BUSY_TIMEOUT, DB_READ_POOL_SIZE, DB_WRITE_BATCH
 
 
+def connect(path: str, busy_timeout: float = DB_BUSY_TIMEOUT) -> sqlite3.Connection:
+    """
+    Open a connection in WAL mode, waiting up to busy_timeout seconds for locks.
+
+    WAL lets readers run while a write is in progress, including in other
+    processes, and the busy timeout makes a locked database wait instead of
+    failing with "database is locked".
+    """
+    connection = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    # Durable enough with WAL: a power loss can only drop the last transactions
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+def is_lock_error(error: Exception) -> bool:
+    return isinstance(error, sqlite3.OperationalError) and "locked" in str(error)
+
+# Types of the events in the append-only event log
+EVENT_RESULT_NEW = "result_new"
+EVENT_SCORE_REVISED = "score_revised"
+EVENT_NOTIFICATION_DELIVERED = "notification_delivered"
+EVENT_TYPES = (EVENT_RESULT_NEW, EVENT_SCORE_REVISED, EVENT_NOTIFICATION_DELIVERED)
+
+# A statement and the parameter rows it runs with
+Statement = Tuple[str, Sequence[tuple]]
+
+# Stored in PRAGMA user_version once create_table has brought a database up to date;
+# bump it whenever create_table gains a table, column, index or fill
+SCHEMA_VERSION = 1
+
+INSERT_EVENT = """
+    INSERT INTO events (type, lesson_id, lesson_name, exam_type, term, data)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+# Exam types with their own column in course_summary
+SUMMARY_SCORE_COLUMNS = {"midterm": "midterm", "final": "final", "make-up": "make_up"}
+SUMMARY_GRADE_TYPE = "letter-grade"
+
+# Adds a stored result to its course's summary row
+UPSERT_SUMMARY = """
+    INSERT INTO course_summary (term, lesson_id, lesson_name, midterm, final, make_up, letter_grade,
+                                results, scored, score_sum)
+    VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?, ?)
+    ON CONFLICT (term, lesson_id) DO UPDATE SET
+        lesson_name = excluded.lesson_name,
+        midterm = COALESCE(excluded.midterm, midterm),
+        final = COALESCE(excluded.final, final),
+        make_up = COALESCE(excluded.make_up, make_up),
+        letter_grade = COALESCE(excluded.letter_grade, letter_grade),
+        results = results + 1,
+        scored = scored + excluded.scored,
+        score_sum = score_sum + excluded.score_sum,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+# Applies a revised score to its course's summary row
+REVISE_SUMMARY = """
+    UPDATE course_summary SET
+        midterm = COALESCE(?, midterm),
+        final = COALESCE(?, final),
+        make_up = COALESCE(?, make_up),
+        letter_grade = COALESCE(?, letter_grade),
+        scored = scored + ?,
+        score_sum = score_sum + ?,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE lesson_id = ? AND (term = ? OR term = '')
+"""
+
+def summary_fill_query(where: str = "") -> str:
+    """INSERT of the course_summary rows of the stored results the where clause selects"""
+    columns = ", ".join(f"MAX(CASE WHEN exam_type = '{exam_type}' THEN score END)"
+                        for exam_type in SUMMARY_SCORE_COLUMNS)
+    return f"""
+        INSERT INTO course_summary (term, lesson_id, lesson_name, midterm, final, make_up, letter_grade,
+                                    results, scored, score_sum)
+        SELECT COALESCE(term, ''), lesson_id, MAX(lesson_name), {columns},
+            MAX(CASE WHEN exam_type = '{SUMMARY_GRADE_TYPE}' THEN grade END),
+            COUNT(*), COUNT(score), COALESCE(SUM(score), 0)
+        FROM results {where} GROUP BY COALESCE(term, ''), lesson_id
+    """
+
+def summary_values(result: Result) -> tuple:
+    """The midterm, final, make_up and letter_grade values a result sets in course_summary"""
+    scores = tuple(result.score if result.exam_type == exam_type else None for exam_type in SUMMARY_SCORE_COLUMNS)
+    return (*scores, result.grade if result.exam_type == SUMMARY_GRADE_TYPE else None)
+
+def event_row(event_type: str, result: Result, **data) -> tuple:
+    """Parameters of INSERT_EVENT for an event about a result"""
+    data = {"score": result.score, "grade": result.grade, **data}
+    return (event_type, result.lesson_id, result.lesson_name, result.exam_type, result.term,
+            json.dumps(data, ensure_ascii=False))
+
+class DatabaseWriter:
+    def __init__(self, path: str, max_batch: int = DB_WRITE_BATCH):
+        """
+        Single writer thread for a database.
+
+        Writes submitted from any thread are queued; whatever has queued up while
+        the previous transaction ran is committed together in one transaction.
+
+        Args:
+            path (str): Path of the database file
+            max_batch (int): Most writes grouped into one transaction
+        """
+        self.connection = connect(path)
+        self.max_batch = max_batch
+        self.requests: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, query: str, rows: Sequence[tuple]) -> Future:
+        """
+        Queue a statement to run once per parameter row.
+
+        Returns:
+            Future: Resolves to True once committed, or to the sqlite3 error
+        """
+        return self.submit_statements([(query, rows)])
+
+    def submit_statements(self, statements: List[Statement]) -> Future:
+        """
+        Queue statements that are committed together or not at all.
+
+        Returns:
+            Future: Resolves to True once committed, or to the sqlite3 error
+        """
+        future: Future = Future()
+        self.requests.put((statements, future))
+        return future
+
+    def close(self) -> None:
+        """Commit everything queued so far, then stop the thread and close the connection"""
+        self.requests.put(None)
+        self.thread.join()
+        self.connection.close()
+
+    def _run(self) -> None:
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+            batch = [request]
+            stopping = False
+            while len(batch) < self.max_batch:
+                try:
+                    request = self.requests.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+            self._write(batch)
+            if stopping:
+                return
+
+    def _write(self, batch: List[tuple]) -> None:
+        start_time = time.perf_counter()
+        try:
+            with self.connection:
+                for statements, _ in batch:
+                    for query, rows in statements:
+                        self.connection.executemany(query, rows)
+            for _, future in batch:
+                future.set_result(True)
+            metrics.increment("database_writes", sum(len(statements) for statements, _ in batch))
+            metrics.increment("database_transactions")
+        except sqlite3.Error as e:
+            if is_lock_error(e):
+                metrics.increment("database_lock_errors")
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+            else:
+                # Retry one by one so a failing statement does not fail the others
+                for request in batch:
+                    self._write([request])
+        finally:
+            logger.log_operation_time("db_write_batch", start_time)
+
 class Database:
-    def __init__(self):
-        start_time = datetime.now()
+    def __init__(self, path: str = DATABASE_PATH, read_pool_size: int = DB_READ_POOL_SIZE):
+        """
+        Open the results database.
+
+        Reads use a small pool of connections, writes go through a single writer
+        thread. Call close(), or use the database as a context manager, when done
+        so queued writes are committed and the connections released.
+
+        Args:
+            path (str): Path of the database file
+            read_pool_size (int): Read connections kept open for reuse
+        """
+        start_time = time.perf_counter()
         try:
             logger.info("Initializing database connection")
-            self.db_path = f"{DATA_FOLDER}/results.db"
-            self.conn = sqlite3.connect(self.db_path)
-            self.cursor = self.conn.cursor()
-            logger.info(f"Connected to database: {self.db_path}")
+            self.db_path = path
+            directory = os.path.dirname(self.db_path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            self.read_pool_size = read_pool_size
+            self.readers: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+            self.closed = False
             self.create_table()
+            # Started by the first write, so read-only commands never start the writer thread
+            self._writer: Optional[DatabaseWriter] = None
+            self._writer_lock = threading.Lock()
+            logger.info("Connected to database: %s", self.db_path)
         except sqlite3.Error as e:
             logger.log_error_with_context(e, {
                 "operation": "database_init",
@@ -24,21 +230,85 @@ class Database:
         finally:
             logger.log_operation_time("database_init", start_time)
 
+    def __enter__(self) -> "Database":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Commit queued writes and close every connection"""
+        if self.closed:
+            return
+        self.closed = True
+        if self._writer is not None:
+            self._writer.close()
+        while not self.readers.empty():
+            self.readers.get_nowait().close()
+        logger.info("Database connection closed")
+
+    @property
+    def writer(self) -> DatabaseWriter:
+        """The writer thread, started on first use"""
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = DatabaseWriter(self.db_path)
+            return self._writer
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a read connection from the pool"""
+        try:
+            connection = self.readers.get_nowait()
+        except queue.Empty:
+            connection = connect(self.db_path)
+        try:
+            yield connection
+        finally:
+            if self.closed or self.readers.qsize() >= self.read_pool_size:
+                connection.close()
+            else:
+                self.readers.put(connection)
+
+    def write(self, query: str, rows: Sequence[tuple]) -> None:
+        """
+        Run a statement once per parameter row through the writer and wait for the commit.
+
+        Raises:
+            sqlite3.Error: If the statement failed
+        """
+        self.writer.submit(query, rows).result()
+
+    def write_statements(self, statements: List[Statement]) -> None:
+        """
+        Run statements in one transaction through the writer and wait for the commit.
+
+        Raises:
+            sqlite3.Error: If a statement failed; none of them are stored then
+        """
+        self.writer.submit_statements(statements).result()
+
     def create_table(self):
-        start_time = datetime.now()
-        try:
-            logger.info("Creating results table if not exists")
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS results (
-                    lesson_id TEXT,
-                    lesson_name TEXT,
-                    exam_type TEXT,
-                    score REAL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            self.conn.commit()
-            logger.info("Table creation successful")
+        """
+        Bring the schema up to date, once per database file.
+
+        A database already at SCHEMA_VERSION is only read, so opening it takes no
+        write lock; otherwise the tables, migrations and summary fill run in one
+        transaction holding the write lock.
+        """
+        start_time = time.perf_counter()
+        try:
+            with self.reader() as connection:
+                if connection.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+                    return
+                with connection:
+                    # Another process opening the database at the same time waits instead of racing the migration
+                    connection.execute("BEGIN IMMEDIATE")
+                    if connection.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+                        return
+                    self.migrate(connection)
+                    connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            logger.info("Database schema updated to version %s", SCHEMA_VERSION)
         except sqlite3.Error as e:
             logger.log_error_with_context(e, {
                 "operation": "create_table",
@@ -47,59 +317,208 @@ class Database:
             raise
         finally:
             logger.log_operation_time("create_table", start_time)
-    
-    def insert_result(self, result: Result) -> bool:
-        start_time = datetime.now()
-        try:
-            logger.info(f"Inserting result for {result.lesson_name} ({result.exam_type})")
-            query = """
-                INSERT INTO results (lesson_id, lesson_name, exam_type, score)
-                VALUES (?, ?, ?, ?)
-            """
-            params = (result.lesson_id, result.lesson_name, result.exam_type, result.score)
-            
-            logger.log_request_response(
-                "DB_INSERT",
-                f"Query: {query.strip()}\nParams: {params}"
+
+    def migrate(self, connection: sqlite3.Connection) -> None:
+        """Create the missing tables, columns, indexes and triggers in the caller's transaction"""
+        logger.info("Creating results table if not exists")
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                lesson_id TEXT,
+                lesson_name TEXT,
+                exam_type TEXT,
+                score REAL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS terms (
+                term TEXT PRIMARY KEY,
+                first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        # Results stored before multi-term scraping have no term (NULL)
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(results)")]
+        if "term" not in columns:
+            logger.info("Adding term column to results table")
+            connection.execute("ALTER TABLE results ADD COLUMN term TEXT")
+        if "grade" not in columns:
+            logger.info("Adding grade column to results table")
+            connection.execute("ALTER TABLE results ADD COLUMN grade TEXT")
+        # seq is the rowid, so reading after a cursor is a range scan of the table's
+        # own B-tree; AUTOINCREMENT keeps it increasing even if rows were ever removed
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                type TEXT NOT NULL,
+                lesson_id TEXT,
+                lesson_name TEXT,
+                exam_type TEXT,
+                term TEXT,
+                data TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        connection.execute("CREATE INDEX IF NOT EXISTS events_type_seq ON events (type, seq)")
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS results_lesson ON results (lesson_id, exam_type, term)")
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                hash TEXT NOT NULL,
+                term TEXT NOT NULL,
+                first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                polls INTEGER NOT NULL DEFAULT 1,
+                PRIMARY KEY (hash, term)
+            )
+        """)
+        self.create_summary_table(connection)
+        for operation in ("UPDATE", "DELETE"):
+            connection.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS events_no_{operation.lower()} BEFORE {operation} ON events
+                BEGIN SELECT RAISE(ABORT, 'events are append-only'); END
+            """)
+
+    def create_summary_table(self, connection: sqlite3.Connection) -> None:
+        """
+        Create course_summary, filling it from the stored results the first time.
+
+        It holds one row per term and course, kept up to date in the same
+        transaction as every insert and revision, so queries read a row per
+        course instead of scanning the results history. Runs inside the
+        migration's transaction, so another process never races the fill.
+        """
+        exists = connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'course_summary'").fetchone()
+        if exists:
+            return
+        connection.execute("""
+            CREATE TABLE course_summary (
+                term TEXT NOT NULL,
+                lesson_id TEXT NOT NULL,
+                lesson_name TEXT,
+                midterm REAL,
+                final REAL,
+                make_up REAL,
+                letter_grade TEXT,
+                results INTEGER NOT NULL DEFAULT 0,
+                scored INTEGER NOT NULL DEFAULT 0,
+                score_sum REAL NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (term, lesson_id)
             )
-            
-            self.cursor.execute(query, params)
-            self.conn.commit()
-            
-            logger.info(f"Successfully inserted result: {result.lesson_name} - {result.exam_type}")
-            return True
+        """)
+        logger.info("Filling course summaries from stored results")
+        connection.execute(summary_fill_query())
+
+    def assign_legacy_terms(self, lesson_terms: Dict[str, str]) -> int:
+        """
+        Give results stored before multi-term scraping the term their course is listed under.
+
+        Those rows have no term and match any term when looked up, but their
+        course summary is the '' term's row, which a later result or revision of
+        the course's real term would never update. The rows get the term and the
+        course's summary is rebuilt under it.
+
+        Args:
+            lesson_terms (Dict[str, str]): Term each scraped course is listed under
+
+        Returns:
+            int: Number of courses whose results got a term
+        """
+        start_time = time.perf_counter()
+        try:
+            # Every result without a term has a row in the '' term's summary, so this is a primary key range read
+            with self.reader() as connection:
+                legacy = [row[0] for row in connection.execute("SELECT lesson_id FROM course_summary WHERE term = ''")]
+            rows = [(lesson_terms[lesson_id], lesson_id) for lesson_id in legacy if lesson_terms.get(lesson_id)]
+            if not rows:
+                return 0
+            self.write_statements([
+                ("UPDATE results SET term = ? WHERE lesson_id = ? AND (term IS NULL OR term = '')", rows),
+                ("DELETE FROM course_summary WHERE term IN (?, '') AND lesson_id = ?", rows),
+                (summary_fill_query("WHERE term = ? AND lesson_id = ?"), rows)
+            ])
+            logger.info("Assigned a term to the results of %s courses stored before multi-term scraping", len(rows))
+            return len(rows)
         except sqlite3.Error as e:
             logger.log_error_with_context(e, {
-                "operation": "insert_result",
-                "result": str(result.__dict__),
-                "query": query
+                "operation": "assign_legacy_terms",
+                "courses": len(lesson_terms)
             })
-            return False
+            return 0
+        finally:
+            logger.log_operation_time("assign_legacy_terms", start_time)
+
+    def insert_result(self, result: Result) -> bool:
+        return self.insert_results([result]) == 1
+
+    def insert_results(self, results: List[Result]) -> int:
+        """
+        Store results with their result_new events and course summaries, committed
+        together by the writer.
+
+        Returns:
+            int: Number of results stored
+        """
+        start_time = time.perf_counter()
+        query = """
+            INSERT INTO results (lesson_id, lesson_name, exam_type, score, term, grade)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """
+        try:
+            futures = []
+            for result in results:
+                logger.debug("Inserting result for %s (%s)", result.lesson_name, result.exam_type)
+                params = (result.lesson_id, result.lesson_name, result.exam_type, result.score,
+                          result.term, result.grade)
+                logger.log_request_response("DB_INSERT", "Query: %s\nParams: %s", query, params)
+                summary = (result.term or "", result.lesson_id, result.lesson_name, *summary_values(result),
+                           int(result.score is not None), result.score or 0)
+                futures.append((result, self.writer.submit_statements([
+                    (query, [params]),
+                    (UPSERT_SUMMARY, [summary]),
+                    (INSERT_EVENT, [event_row(EVENT_RESULT_NEW, result)])
+                ])))
+
+            stored = 0
+            for result, future in futures:
+                try:
+                    future.result()
+                    stored += 1
+                    logger.info("Successfully inserted result: %s - %s", result.lesson_name, result.exam_type)
+                except sqlite3.Error as e:
+                    logger.log_error_with_context(e, {
+                        "operation": "insert_result",
+                        "result": str(result.__dict__),
+                        "query": query
+                    })
+            return stored
         finally:
             logger.log_operation_time("insert_result", start_time)
-    
-    def check_if_result_exists(self, lesson_id: str, exam_type: str) -> bool:
-        start_time = datetime.now()
+
+    def check_if_result_exists(self, lesson_id: str, exam_type: str, term: str = "") -> bool:
+        start_time = time.perf_counter()
         try:
-            logger.info(f"Checking existence of result: {lesson_id} ({exam_type})")
+            logger.debug("Checking existence of result: %s (%s) %s", lesson_id, exam_type, term)
+            # Rows without a term predate multi-term scraping and match any term
             query = """
-                SELECT COUNT(*) FROM results 
+                SELECT COUNT(*) FROM results
                 WHERE lesson_id = ? AND exam_type = ?
+                AND (term = ? OR term IS NULL OR term = '' OR ? = '')
             """
-            params = (lesson_id, exam_type)
-            
-            logger.log_request_response(
-                "DB_CHECK",
-                f"Query: {query.strip()}\nParams: {params}"
-            )
-            
-            self.cursor.execute(query, params)
-            count = self.cursor.fetchone()[0]
-            
+            params = (lesson_id, exam_type, term, term)
+
+            logger.log_request_response("DB_CHECK", "Query: %s\nParams: %s", query, params)
+
+            with self.reader() as connection:
+                count = connection.execute(query, params).fetchone()[0]
+
             exists = count > 0
-            logger.info(f"Result exists: {exists}")
+            logger.debug("Result exists: %s", exists)
             return exists
         except sqlite3.Error as e:
+            if is_lock_error(e):
+                metrics.increment("database_lock_errors")
             logger.log_error_with_context(e, {
                 "operation": "check_result",
                 "lesson_id": lesson_id,
@@ -110,15 +529,248 @@ class Database:
         finally:
             logger.log_operation_time("check_result", start_time)
 
-    def __del__(self):
-        """Ensure proper cleanup of database connection"""
+    def get_stored_result(self, lesson_id: str, exam_type: str, term: str = "") -> Optional[Tuple[Optional[float], Optional[str]]]:
+        """
+        Get the stored score and grade of a result.
+
+        Returns:
+            Optional[Tuple[Optional[float], Optional[str]]]: (score, grade) of the latest
+            matching row, None if the result is not stored
+        """
+        start_time = time.perf_counter()
+        try:
+            # Rows without a term predate multi-term scraping and match any term
+            query = """
+                SELECT score, grade FROM results
+                WHERE lesson_id = ? AND exam_type = ?
+                AND (term = ? OR term IS NULL OR term = '' OR ? = '')
+                ORDER BY rowid DESC LIMIT 1
+            """
+            with self.reader() as connection:
+                return connection.execute(query, (lesson_id, exam_type, term, term)).fetchone()
+        except sqlite3.Error as e:
+            if is_lock_error(e):
+                metrics.increment("database_lock_errors")
+            logger.log_error_with_context(e, {
+                "operation": "get_stored_result",
+                "lesson_id": lesson_id,
+                "exam_type": exam_type
+            })
+            return None
+        finally:
+            logger.log_operation_time("check_result", start_time)
+
+    def revise_results(self, revisions: List[Tuple[Result, Optional[float], Optional[str]]]) -> None:
+        """
+        Store changed scores with their score_revised events and course summaries.
+
+        Args:
+            revisions: The result as now published with its previous score and grade
+        """
+        start_time = time.perf_counter()
         try:
-            if hasattr(self, 'conn'):
-                self.conn.close()
-                logger.info("Database connection closed")
+            self.write_statements([
+                ("""
+                    UPDATE results SET score = ?, grade = ?
+                    WHERE lesson_id = ? AND exam_type = ?
+                    AND (term = ? OR term IS NULL OR term = '')
+                """, [(result.score, result.grade, result.lesson_id, result.exam_type, result.term or "")
+                      for result, _, _ in revisions]),
+                # Both match the exact term and legacy rows without one, never other terms of a retaken course
+                (REVISE_SUMMARY, [(*summary_values(result), int(result.score is not None) - int(score is not None),
+                                   (result.score or 0) - (score or 0), result.lesson_id, result.term or "")
+                                  for result, score, _ in revisions]),
+                (INSERT_EVENT, [event_row(EVENT_SCORE_REVISED, result, previous_score=score, previous_grade=grade)
+                                for result, score, grade in revisions])
+            ])
         except sqlite3.Error as e:
             logger.log_error_with_context(e, {
-                "operation": "database_cleanup"
+                "operation": "revise_results",
+                "results": len(revisions)
             })
-    
-    
\ No newline at end of file
+        finally:
+            logger.log_operation_time("revise_results", start_time)
+
+    def record_notifications(self, results: List[Result]) -> None:
+        """Append a notification_delivered event for every result a notification was sent for"""
+        start_time = time.perf_counter()
+        try:
+            self.write(INSERT_EVENT, [event_row(EVENT_NOTIFICATION_DELIVERED, result) for result in results])
+        except sqlite3.Error as e:
+            logger.log_error_with_context(e, {
+                "operation": "record_notifications",
+                "results": len(results)
+            })
+        finally:
+            logger.log_operation_time("record_notifications", start_time)
+
+    def get_events(self, after: int = 0, limit: int = 1000, types: Optional[Sequence[str]] = None) -> List[Dict]:
+        """
+        Get events in sequence order.
+
+        Args:
+            after (int): Cursor, the seq of the last event already read (0 for all)
+            limit (int): Most events returned
+            types (Optional[Sequence[str]]): Only these event types
+
+        Returns:
+            List[Dict]: Events with seq, type, created_at, the result's fields and its data
+        """
+        start_time = time.perf_counter()
+        try:
+            query = """
+                SELECT seq, type, created_at, lesson_id, lesson_name, exam_type, term, data
+                FROM events WHERE seq > ?
+            """
+            params: List[object] = [after]
+            if types:
+                query += f" AND type IN ({', '.join('?' for _ in types)})"
+                params.extend(types)
+            query += " ORDER BY seq LIMIT ?"
+            params.append(limit)
+
+            with self.reader() as connection:
+                rows = connection.execute(query, params).fetchall()
+            return [{
+                "seq": seq, "type": event_type, "created_at": created_at, "lesson_id": lesson_id,
+                "lesson_name": lesson_name, "exam_type": exam_type, "term": term, **json.loads(data or "{}")
+            } for seq, event_type, created_at, lesson_id, lesson_name, exam_type, term, data in rows]
+        finally:
+            logger.log_operation_time("get_events", start_time)
+
+    def iter_events(self, after: int = 0, types: Optional[Sequence[str]] = None,
+                    page_size: int = 1000) -> Iterator[Dict]:
+        """Stream every event after the cursor, reading a page at a time"""
+        while True:
+            events = self.get_events(after, page_size, types)
+            yield from events
+            if len(events) < page_size:
+                return
+            after = events[-1]["seq"]
+
+    def get_course_summaries(self, term: Optional[str] = None, missing_final: bool = False) -> List[Dict]:
+        """
+        Get the per-course breakdown of stored results.
+
+        Args:
+            term (Optional[str]): Only this term
+            missing_final (bool): Only courses with neither a final nor a make-up score
+
+        Returns:
+            List[Dict]: Term, course, midterm, final, make-up and letter grade, and
+            the mean of all scores of the course; newest term first
+        """
+        start_time = time.perf_counter()
+        try:
+            query = """
+                SELECT term, lesson_id, lesson_name, midterm, final, make_up, letter_grade, results,
+                    ROUND(score_sum / NULLIF(scored, 0), 2) AS mean_score
+                FROM course_summary WHERE 1 = 1
+            """
+            params: List[object] = []
+            if term is not None:
+                query += " AND term = ?"
+                params.append(term)
+            if missing_final:
+                query += " AND final IS NULL AND make_up IS NULL"
+            query += " ORDER BY term DESC, lesson_id"
+            with self.reader() as connection:
+                cursor = connection.execute(query, params)
+                columns = [column[0] for column in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor]
+        finally:
+            logger.log_operation_time("get_course_summaries", start_time)
+
+    def get_term_summaries(self) -> List[Dict]:
+        """
+        Get the averages of every term, newest first.
+
+        Returns:
+            List[Dict]: Term, courses, stored results, mean score and courses still
+            without a final or make-up score
+        """
+        start_time = time.perf_counter()
+        try:
+            query = """
+                SELECT term, COUNT(*) AS courses, SUM(results) AS results,
+                    ROUND(SUM(score_sum) / NULLIF(SUM(scored), 0), 2) AS mean_score,
+                    ROUND(AVG(final), 2) AS mean_final,
+                    SUM(final IS NULL AND make_up IS NULL) AS missing_final
+                FROM course_summary GROUP BY term ORDER BY term DESC
+            """
+            with self.reader() as connection:
+                cursor = connection.execute(query)
+                columns = [column[0] for column in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor]
+        finally:
+            logger.log_operation_time("get_term_summaries", start_time)
+
+    def record_snapshot(self, key: str, term: str) -> None:
+        """Index a grades grid snapshot seen for a term, or count another poll that showed it"""
+        self.write("""
+            INSERT INTO snapshots (hash, term) VALUES (?, ?)
+            ON CONFLICT (hash, term) DO UPDATE SET last_seen = CURRENT_TIMESTAMP, polls = polls + 1
+        """, [(key, term)])
+
+    def get_snapshots(self, term: Optional[str] = None) -> List[Dict]:
+        """
+        List the stored grid snapshots, least recently seen first.
+
+        Args:
+            term (Optional[str]): Only snapshots of this term
+
+        Returns:
+            List[Dict]: hash, term, first_seen, last_seen and polls of each snapshot
+        """
+        query = "SELECT hash, term, first_seen, last_seen, polls FROM snapshots"
+        params: List[object] = []
+        if term is not None:
+            query += " WHERE term = ?"
+            params.append(term)
+        query += " ORDER BY last_seen, rowid"
+        with self.reader() as connection:
+            cursor = connection.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor]
+
+    def get_known_terms(self) -> set[str]:
+        """Get the terms whose results have been scraped before"""
+        start_time = time.perf_counter()
+        try:
+            with self.reader() as connection:
+                return {row[0] for row in connection.execute("SELECT term FROM terms")}
+        except sqlite3.Error as e:
+            logger.log_error_with_context(e, {
+                "operation": "get_known_terms"
+            })
+            return set()
+        finally:
+            logger.log_operation_time("get_known_terms", start_time)
+
+    def add_known_terms(self, terms: list[str]) -> None:
+        """Remember that the terms' results have been scraped"""
+        start_time = time.perf_counter()
+        try:
+            self.write("INSERT OR IGNORE INTO terms (term) VALUES (?)", [(term,) for term in terms])
+        except sqlite3.Error as e:
+            logger.log_error_with_context(e, {
+                "operation": "add_known_terms",
+                "terms": terms
+            })
+        finally:
+            logger.log_operation_time("add_known_terms", start_time)
+
+    def get_result_timestamps(self) -> list[str]:
+        """Get the created_at timestamp of every stored result, oldest first"""
+        start_time = time.perf_counter()
+        try:
+            logger.log_request_response("DB_SELECT", "Loading result timestamps")
+            with self.reader() as connection:
+                return [row[0] for row in connection.execute("SELECT created_at FROM results ORDER BY created_at")]
+        except sqlite3.Error as e:
+            logger.log_error_with_context(e, {
+                "operation": "get_result_timestamps"
+            })
+            return []
+        finally:
+            logger.log_operation_time("get_result_timestamps", start_time)
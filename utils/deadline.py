@@ -0,0 +1,121 @@
+from utils.logger import logger
+from typing import Callable, Optional
+import threading
+import time
+import os
+
+class DeadlineExceeded(Exception):
+    """Raised when the run deadline expires before an operation could finish"""
+
+class Deadline:
+    def __init__(self, seconds: Optional[float] = None):
+        """
+        Initialize a deadline that expires the given number of seconds from now.
+
+        Args:
+            seconds (Optional[float]): Run budget in seconds, None for no limit
+        """
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+
+    def remaining(self) -> float:
+        """
+        Get the time left before the deadline.
+
+        Returns:
+            float: Remaining seconds, never negative (infinite if unlimited)
+        """
+        if self.expires_at is None:
+            return float("inf")
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        """Check whether the deadline has passed"""
+        return self.remaining() <= 0
+
+    def check(self, operation: str) -> None:
+        """
+        Cooperative cancellation point.
+
+        Args:
+            operation (str): Name of the operation about to run
+
+        Raises:
+            DeadlineExceeded: If the deadline has already passed
+        """
+        if self.expired():
+            raise DeadlineExceeded(f"Run deadline of {self.seconds} seconds exceeded before {operation}")
+
+    def clamp(self, timeout: float) -> float:
+        """
+        Limit a timeout so it never outlives the deadline.
+
+        Args:
+            timeout (float): The timeout the caller would like to use
+
+        Returns:
+            float: The smaller of the timeout and the remaining time
+
+        Raises:
+            DeadlineExceeded: If the deadline has already passed
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Run deadline of {self.seconds} seconds exceeded")
+        return min(timeout, remaining)
+
+class Watchdog:
+    def __init__(self, deadline: Deadline, on_expiry: Callable[[], None], grace_period: float = 10,
+                 terminate: bool = True):
+        """
+        Initialize a watchdog that enforces the deadline when cooperation fails.
+
+        Args:
+            deadline (Deadline): The run deadline to enforce
+            on_expiry (Callable): Called once when the deadline passes (e.g. to kill the browser)
+            grace_period (float): Seconds to wait after on_expiry before terminating the process
+            terminate (bool): Terminate the process if the run has not unwound after the grace
+                period; a daemon keeps running and only relies on on_expiry
+        """
+        self.deadline = deadline
+        self.on_expiry = on_expiry
+        self.grace_period = grace_period
+        self.terminate = terminate
+        self.fired = False
+        self._expiry_timer: Optional[threading.Timer] = None
+        self._exit_timer: Optional[threading.Timer] = None
+
+    def start(self) -> None:
+        """Arm the watchdog"""
+        if self.deadline.expires_at is None:
+            return
+        self._expiry_timer = threading.Timer(self.deadline.remaining(), self._expire)
+        self._expiry_timer.daemon = True
+        self._expiry_timer.start()
+
+    def cancel(self) -> None:
+        """Disarm the watchdog once the run has finished"""
+        for timer in (self._expiry_timer, self._exit_timer):
+            if timer:
+                timer.cancel()
+
+    def _expire(self) -> None:
+        self.fired = True
+        logger.log_metric("run_killed", 1, {"deadline_seconds": self.deadline.seconds})
+        try:
+            self.on_expiry()
+        except Exception as e:
+            logger.log_error_with_context(e, {
+                "operation": "watchdog_expiry"
+            })
+        if not self.terminate:
+            return
+        self._exit_timer = threading.Timer(self.grace_period, self._terminate)
+        self._exit_timer.daemon = True
+        self._exit_timer.start()
+
+    def _terminate(self) -> None:
+        logger.error("Run did not unwind after deadline expiry, terminating process", exc_info=False)
+        # os._exit skips atexit, so write out the queued log records first
+        logger.shutdown()
+        os._exit(1)
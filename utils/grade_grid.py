@@ -0,0 +1,36 @@
+from typing import List
+from utils.html_document import HtmlDocument
+
+# A grid row as (lesson_id, lesson_name, score_text)
+Row = tuple[str, str, str]
+
+def read_grid_rows(document: HtmlDocument, table_id: str) -> List[Row]:
+    """
+    Get the rows of the grades grid from a parsed page or table snapshot.
+
+    Kept free of Selenium so offline re-parsing can run it in worker processes.
+
+    Args:
+        document (HtmlDocument): The parsed grades page or grid
+        table_id (str): id of the grid table
+
+    Returns:
+        List[Row]: Rows with at least five cells, header row excluded
+
+    Raises:
+        LookupError: If the grid is not in the document
+    """
+    table = document.find_by_id(table_id)
+    if table is None:
+        raise LookupError(f"Results table #{table_id} not found")
+    table_rows = []
+    # Skip rows of tables nested inside grid cells
+    for row in table.iter("tr"):
+        if row.closest("table") is not table:
+            continue
+        cells = row.find_all("td")
+        if len(cells) < 5:
+            continue
+        lesson_id = next(cells[1].iter("span"), cells[1]).text()
+        table_rows.append((lesson_id, cells[2].text(), cells[4].text()))
+    return table_rows
@@ -0,0 +1,181 @@
+from html.parser import HTMLParser
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+import re
+
+# Elements that never have an end tag
+VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+# Input types whose value is only posted when the control is the one that submitted the form
+UNPOSTED_INPUT_TYPES = {"submit", "button", "image", "reset", "file"}
+
+WHITESPACE = re.compile(r"\s+")
+
+class Node:
+    def __init__(self, tag: str, attrs: Dict[str, str], parent: Optional["Node"] = None):
+        """
+        A parsed HTML element.
+
+        Args:
+            tag (str): Lower-case tag name
+            attrs (Dict[str, str]): Element attributes
+            parent (Optional[Node]): Enclosing element
+        """
+        self.tag = tag
+        self.attrs = attrs
+        self.parent = parent
+        self.children: List[Union["Node", str]] = []
+        # (line, column) of the start tag and of the end tag, if it had one
+        self.start_position: Optional[Tuple[int, int]] = None
+        self.end_position: Optional[Tuple[int, int]] = None
+
+    def get(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        """Get an attribute value"""
+        return self.attrs.get(name, default)
+
+    def iter(self, tag: Optional[str] = None) -> Iterator["Node"]:
+        """Iterate over descendant elements in document order, optionally filtered by tag"""
+        for child in self.children:
+            if isinstance(child, Node):
+                if tag is None or child.tag == tag:
+                    yield child
+                yield from child.iter(tag)
+
+    def find_all(self, tag: str) -> List["Node"]:
+        """Get the direct children with the given tag"""
+        return [child for child in self.children if isinstance(child, Node) and child.tag == tag]
+
+    def closest(self, tag: str) -> Optional["Node"]:
+        """Find the nearest enclosing element with the given tag"""
+        node = self.parent
+        while node is not None and node.tag != tag:
+            node = node.parent
+        return node
+
+    def find_by_id(self, element_id: str) -> Optional["Node"]:
+        """Find the first descendant with the given id"""
+        for node in self.iter():
+            if node.attrs.get("id") == element_id:
+                return node
+        return None
+
+    def text(self) -> str:
+        """
+        Get the element text with whitespace collapsed, similar to WebElement.text.
+
+        Returns:
+            str: Text of all descendants, separated by single spaces
+        """
+        parts = []
+        self._collect_text(parts)
+        return WHITESPACE.sub(" ", " ".join(parts)).strip()
+
+    def _collect_text(self, parts: List[str]) -> None:
+        for child in self.children:
+            if isinstance(child, Node):
+                if child.tag not in ("script", "style"):
+                    child._collect_text(parts)
+            else:
+                parts.append(child)
+
+class HtmlDocument(HTMLParser):
+    def __init__(self, html: str):
+        """
+        Parse an HTML page into a light element tree.
+
+        Only what the scrapers need is supported: lookups by id and tag, text
+        extraction and form field collection. Unclosed tags are closed implicitly.
+
+        Args:
+            html (str): The page source
+        """
+        super().__init__(convert_charrefs=True)
+        self.source = html
+        self.root = Node("#document", {})
+        self._stack = [self.root]
+        self.feed(html)
+        self.close()
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        node = Node(tag, {name: value or "" for name, value in attrs}, self._stack[-1])
+        node.start_position = self.getpos()
+        self._stack[-1].children.append(node)
+        if tag not in VOID_ELEMENTS:
+            self._stack.append(node)
+
+    def handle_startendtag(self, tag: str, attrs) -> None:
+        node = Node(tag, {name: value or "" for name, value in attrs}, self._stack[-1])
+        node.start_position = self.getpos()
+        self._stack[-1].children.append(node)
+
+    def handle_endtag(self, tag: str) -> None:
+        # Pop up to the matching element; ignore stray end tags
+        for index in range(len(self._stack) - 1, 0, -1):
+            if self._stack[index].tag == tag:
+                self._stack[index].end_position = self.getpos()
+                del self._stack[index:]
+                return
+
+    def outer_html(self, node: Node) -> str:
+        """
+        Get the source of an element as it appears in the page, tags included.
+
+        An element closed implicitly runs to the end of the page.
+        """
+        # HTMLParser counts lines by "\n" only
+        line_lengths = [len(line) + 1 for line in self.source.split("\n")]
+
+        def offset(position: Tuple[int, int]) -> int:
+            line, column = position
+            return sum(line_lengths[:line - 1]) + column
+
+        start = offset(node.start_position)
+        if node.end_position is None:
+            return self.source[start:]
+        end = self.source.find(">", offset(node.end_position)) + 1
+        return self.source[start:end]
+
+    def handle_data(self, data: str) -> None:
+        self._stack[-1].children.append(data)
+
+    def find_by_id(self, element_id: str) -> Optional[Node]:
+        """Find the element with the given id"""
+        return self.root.find_by_id(element_id)
+
+    def iter(self, tag: Optional[str] = None) -> Iterator[Node]:
+        """Iterate over all elements, optionally filtered by tag"""
+        return self.root.iter(tag)
+
+    def form_fields(self, form: Optional[Node] = None) -> Dict[str, str]:
+        """
+        Collect the fields a browser would post for the form, as in an ASP.NET postback.
+
+        Hidden fields such as __VIEWSTATE and __EVENTVALIDATION are included as-is.
+
+        Args:
+            form (Optional[Node]): The form to read, defaults to the first form on the page
+
+        Returns:
+            Dict[str, str]: Field name to value
+        """
+        form = form or next(self.iter("form"), self.root)
+        fields = {}
+        for node in form.iter():
+            name = node.get("name")
+            if not name:
+                continue
+            if node.tag == "input":
+                input_type = node.get("type", "text").lower()
+                if input_type in UNPOSTED_INPUT_TYPES:
+                    continue
+                if input_type in ("checkbox", "radio") and "checked" not in node.attrs:
+                    continue
+                fields[name] = node.get("value", "on" if input_type in ("checkbox", "radio") else "")
+            elif node.tag == "select":
+                options = list(node.iter("option"))
+                selected = next((option for option in options if "selected" in option.attrs), None)
+                selected = selected or (options[0] if options else None)
+                if selected is not None:
+                    fields[name] = selected.get("value", selected.text())
+            elif node.tag == "textarea":
+                fields[name] = node.text()
+        return fields
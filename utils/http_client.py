@@ -0,0 +1,128 @@
+import requests
+from requests.adapters import HTTPAdapter
+from utils.logger import logger
+from utils.deadline import Deadline
+from typing import Dict, Optional
+import time
+from utils.constants import HTTP_TIMEOUT, USER_AGENT
+
+class HttpClient:
+    def __init__(self, deadline: Optional[Deadline] = None, timeout: float = HTTP_TIMEOUT):
+        """
+        Initialize a pooled HTTP client that keeps the portal session cookies.
+
+        Args:
+            deadline (Optional[Deadline]): Run deadline that caps every request
+            timeout (float): Per-request timeout in seconds
+        """
+        start_time = time.perf_counter()
+        try:
+            logger.info("Initializing HTTP client")
+            self.deadline = deadline or Deadline()
+            self.timeout = timeout
+            # Optional SessionRecorder that stores every response for offline replay
+            self.recorder = None
+            self.session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+            self.session.headers.update({
+                "User-Agent": USER_AGENT,
+                "Accept-Language": "tr-TR,tr;q=0.9,en;q=0.8"
+            })
+        finally:
+            logger.log_operation_time("http_client_init", start_time)
+
+    @classmethod
+    def from_browser(cls, browser, deadline: Optional[Deadline] = None) -> 'HttpClient':
+        """
+        Create a client that continues the browser's logged-in session.
+
+        Args:
+            browser (Browser): Browser whose cookies are copied
+            deadline (Optional[Deadline]): Run deadline
+
+        Returns:
+            HttpClient: Client sending the browser's session cookies
+        """
+        client = cls(deadline)
+        for cookie in browser.driver.get_cookies():
+            client.session.cookies.set(
+                cookie["name"], cookie["value"], domain=cookie.get("domain", ""), path=cookie.get("path", "/")
+            )
+        return client
+
+    def clone(self) -> 'HttpClient':
+        """
+        Create a client with a copy of this client's cookies, for use from another thread.
+
+        Returns:
+            HttpClient: Independent client in the same portal session
+        """
+        client = HttpClient(self.deadline, self.timeout)
+        client.session.cookies.update(self.session.cookies)
+        client.recorder = self.recorder
+        return client
+
+    def __enter__(self) -> 'HttpClient':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def get(self, url: str, referer: Optional[str] = None) -> requests.Response:
+        """
+        Fetch a URL.
+
+        Args:
+            url (str): The URL to fetch
+            referer (Optional[str]): Page the request originates from
+
+        Returns:
+            requests.Response: The response after redirects
+        """
+        return self._request("GET", url, referer=referer)
+
+    def post_form(self, url: str, fields: Dict[str, str], referer: Optional[str] = None) -> requests.Response:
+        """
+        Submit form fields as application/x-www-form-urlencoded.
+
+        Args:
+            url (str): The form action URL
+            fields (Dict[str, str]): Field name to value
+            referer (Optional[str]): Page the form was loaded from
+
+        Returns:
+            requests.Response: The response after redirects
+        """
+        return self._request("POST", url, referer=referer, data=fields)
+
+    def _request(self, method: str, url: str, referer: Optional[str] = None, **kwargs) -> requests.Response:
+        start_time = time.perf_counter()
+        try:
+            logger.log_request_response(f"HTTP_{method}", "URL: %s", url)
+            headers = {"Referer": referer} if referer else {}
+            response = self.session.request(
+                method, url, headers=headers, timeout=self.deadline.clamp(self.timeout), **kwargs
+            )
+            logger.log_request_response(
+                f"HTTP_{method}",
+                "URL: %s\nResponse: Status: %s, Final URL: %s, Bytes: %s",
+                url, response.status_code, response.url, len(response.content)
+            )
+            if self.recorder:
+                self.recorder.record(response)
+            response.raise_for_status()
+            return response
+        except requests.RequestException as e:
+            logger.log_error_with_context(e, {
+                "operation": f"http_{method.lower()}",
+                "url": url
+            })
+            raise
+        finally:
+            logger.log_operation_time(f"http_{method.lower()}", start_time)
+
+    def close(self) -> None:
+        """Close pooled connections"""
+        self.session.close()
@@ -1,26 +1,42 @@
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 import os
-from datetime import datetime
+import queue
 import sys
-from typing import Optional, Dict, Any
-from utils.constants import LOGS_FOLDER
+import threading
+import time
+from typing import Optional, Dict, Any, Callable
+from utils.metrics import metrics
+from utils.constants import LOGS_FOLDER, LOG_LEVEL
 
 class Logger:
-    def __init__(self):
-        # Print startup banner immediately
-        print("*" * 80)
-        print("               BEYKENT EXAM RESULT NOTIFIER STARTING                ")
-        print("*" * 80)
-        
-        # Create logs directory if it doesn't exist
-        self.log_directory = LOGS_FOLDER
-        if not os.path.exists(self.log_directory):
-            os.makedirs(self.log_directory)
+    def __init__(self, name: str = "beykent_exam_notifier", log_directory: str = LOGS_FOLDER,
+                 level: str = LOG_LEVEL, asynchronous: bool = True):
+        """
+        Initialize the application logger.
+
+        Records are put on a queue by the calling thread and written to the log
+        files and stdout by a background listener thread.
+
+        Args:
+            name (str): Name of the underlying logging.Logger
+            log_directory (str): Folder for app.log and error.log
+            level (str): Lowest level recorded, e.g. "INFO" or "DEBUG"
+            asynchronous (bool): Write through a queue listener instead of in the calling thread
+        """
+        self.log_directory = log_directory
+        # Commands writing data to stdout point this at sys.stderr before logging anything
+        self.console_stream = sys.stdout
+        self.asynchronous = asynchronous
+        self.started = False
+        self._start_lock = threading.Lock()
 
         # Initialize logger
-        self.logger = logging.getLogger("beykent_exam_notifier")
-        self.logger.setLevel(logging.DEBUG)
+        self._logger = logging.getLogger(name)
+        level_value = logging.getLevelName(level.upper())
+        self._logger.setLevel(level_value if isinstance(level_value, int) else logging.INFO)
+        self._logger.propagate = False
 
         # Configure logging format
         self.log_format = logging.Formatter(
@@ -28,10 +44,62 @@ class Logger:
             datefmt='%Y-%m-%d %H:%M:%S'
         )
 
-        # Set up handlers
-        self._setup_file_handler()
-        self._setup_console_handler()
-        self._setup_error_handler()
+        # Callbacks receiving (operation_name, seconds) for every timed operation
+        self.timing_listeners = []
+
+        self.handlers = []
+        self.listener: Optional[QueueListener] = None
+
+    @property
+    def logger(self) -> logging.Logger:
+        """The underlying logging.Logger, with its handlers set up on first use"""
+        if not self.started:
+            self.start()
+        return self._logger
+
+    def start(self) -> None:
+        """
+        Create the logs directory, the handlers and the listener thread.
+
+        Runs on the first log call rather than at import, so importing a module
+        that logs has no side effects.
+        """
+        with self._start_lock:
+            if self.started:
+                return
+
+            # Create logs directory if it doesn't exist
+            if not os.path.exists(self.log_directory):
+                os.makedirs(self.log_directory)
+
+            # Set up handlers
+            self._setup_file_handler()
+            self._setup_console_handler()
+            self._setup_error_handler()
+
+            if self.asynchronous:
+                # Formatting stays on the calling thread, file and console I/O move to the listener
+                log_queue = queue.SimpleQueue()
+                self._logger.addHandler(QueueHandler(log_queue))
+                self.listener = QueueListener(log_queue, *self.handlers, respect_handler_level=True)
+                self.listener.start()
+                atexit.register(self.shutdown)
+            else:
+                for handler in self.handlers:
+                    self._logger.addHandler(handler)
+            self.started = True
+
+    def print_banner(self) -> None:
+        """Print the startup banner"""
+        print("*" * 80)
+        print("               BEYKENT EXAM RESULT NOTIFIER STARTING                ")
+        print("*" * 80)
+
+    def shutdown(self) -> None:
+        """Write out every queued record and stop the listener thread"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
 
     def _setup_file_handler(self) -> None:
         """Set up the main rotating file handler"""
@@ -43,14 +111,14 @@ class Logger:
         )
         file_handler.setFormatter(self.log_format)
         file_handler.setLevel(logging.DEBUG)
-        self.logger.addHandler(file_handler)
+        self.handlers.append(file_handler)
 
     def _setup_console_handler(self) -> None:
         """Set up console output handler"""
-        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler = logging.StreamHandler(self.console_stream)
         console_handler.setFormatter(self.log_format)
         console_handler.setLevel(logging.INFO)
-        self.logger.addHandler(console_handler)
+        self.handlers.append(console_handler)
 
     def _setup_error_handler(self) -> None:
         """Set up separate error log handler"""
@@ -62,50 +130,105 @@ class Logger:
         )
         error_handler.setFormatter(self.log_format)
         error_handler.setLevel(logging.ERROR)
-        self.logger.addHandler(error_handler)
+        self.handlers.append(error_handler)
+
+    def is_debug_enabled(self) -> bool:
+        """Check if debug messages are recorded, to skip building expensive ones"""
+        return self._logger.isEnabledFor(logging.DEBUG)
+
+    # Messages take lazy %-style arguments; stacklevel points [filename:lineno] at the caller
 
-    def debug(self, message: str) -> None:
+    def debug(self, message: str, *args) -> None:
         """Log debug message"""
-        self.logger.debug(message)
+        self.logger.debug(message, *args, stacklevel=2)
 
-    def info(self, message: str) -> None:
+    def info(self, message: str, *args) -> None:
         """Log info message"""
-        self.logger.info(message)
+        self.logger.info(message, *args, stacklevel=2)
 
-    def warning(self, message: str) -> None:
+    def warning(self, message: str, *args) -> None:
         """Log warning message"""
-        self.logger.warning(message)
+        self.logger.warning(message, *args, stacklevel=2)
 
-    def error(self, message: str, exc_info: bool = True) -> None:
+    def error(self, message: str, *args, exc_info: bool = True) -> None:
         """Log error message"""
-        self.logger.error(message, exc_info=exc_info)
+        self.logger.error(message, *args, exc_info=exc_info, stacklevel=2)
 
-    def critical(self, message: str) -> None:
+    def critical(self, message: str, *args) -> None:
         """Log critical message"""
-        self.logger.critical(message, exc_info=True)
+        self.logger.critical(message, *args, exc_info=True, stacklevel=2)
 
-    def log_request_response(self, request_type: str, details: str, 
+    def log_request_response(self, request_type: str, details: str, *args,
                            response: Optional[str] = None, 
                            error: Optional[Exception] = None) -> None:
-        """Log API/Selenium requests and responses"""
-        msg = f"Request [{request_type}]: {details}"
+        """
+        Log API/Selenium requests and responses at debug level.
+
+        Args:
+            request_type (str): Kind of request, e.g. "DB_INSERT"
+            details (str): Message, with %-style placeholders for args
+            *args: Values for the placeholders, only formatted if debug is enabled
+            response (Optional[str]): Response summary
+            error (Optional[Exception]): Error raised by the request
+        """
+        if not self._logger.isEnabledFor(logging.DEBUG):
+            return
+        msg = f"Request [{request_type}]: {details % args if args else details}"
         if response:
             msg += f"\nResponse: {response}"
         if error:
             msg += f"\nError: {str(error)}"
-        self.debug(msg)
-
-    def log_operation_time(self, operation_name: str, start_time: datetime) -> None:
-        """Log operation execution time"""
-        execution_time = datetime.now() - start_time
-        self.info(f"Operation [{operation_name}] took {execution_time.total_seconds():.2f} seconds")
+        self.logger.debug(msg, stacklevel=2)
+
+    def add_timing_listener(self, listener: Callable[[str, float], None]) -> None:
+        """Receive the duration of every operation passed to log_operation_time"""
+        self.timing_listeners.append(listener)
+
+    def remove_timing_listener(self, listener: Callable[[str, float], None]) -> None:
+        """Stop receiving operation durations"""
+        self.timing_listeners.remove(listener)
+
+    def log_operation_time(self, operation_name: str, start_time: float,
+                           labels: Optional[Dict[str, str]] = None) -> None:
+        """
+        Log operation execution time and record it in the operation's latency histogram.
+
+        Args:
+            operation_name (str): Name of the operation, e.g. "navigate_to_login"
+            start_time (float): time.perf_counter() value taken when the operation started
+            labels (Optional[Dict[str, str]]): Extra labels, e.g. the term of a scrape
+        """
+        seconds = time.perf_counter() - start_time
+        metrics.observe("operation_duration", seconds, {"operation": operation_name, **(labels or {})})
+        if labels:
+            self.logger.info("Operation [%s] %s took %.2f seconds", operation_name, labels, seconds, stacklevel=2)
+        else:
+            self.logger.info("Operation [%s] took %.2f seconds", operation_name, seconds, stacklevel=2)
+        for listener in self.timing_listeners:
+            listener(operation_name, seconds)
+
+    def log_metric(self, name: str, value: float = 1,
+                   context: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Log a run-level event such as a skipped or killed run and count it.
+
+        String, integer and boolean context values become labels of the counter,
+        so they must come from a fixed set; free text such as error messages
+        belongs in a log message. Floats such as latencies are only logged.
+        """
+        metrics.increment(name, value, {key: item for key, item in (context or {}).items()
+                                        if isinstance(item, (str, int, bool))})
+        if context:
+            self.logger.info("Metric [%s]: %s %s", name, value, context, stacklevel=2)
+        else:
+            self.logger.info("Metric [%s]: %s", name, value, stacklevel=2)
 
     def log_error_with_context(self, error: Exception, context: Optional[Dict[str, Any]] = None) -> None:
         """Log errors with additional context"""
-        error_msg = f"Error: {str(error)}"
         if context:
-            error_msg += f"\nContext: {context}"
-        self.error(error_msg)
+            self.logger.error("Error: %s\nContext: %s", error, context, exc_info=True, stacklevel=2)
+        else:
+            self.logger.error("Error: %s", error, exc_info=True, stacklevel=2)
 
 # Create singleton instance
-logger = Logger()
\ No newline at end of file
+logger = Logger()
@@ -0,0 +1,183 @@
+from typing import Dict, List, Optional
+import tracemalloc
+import os
+from utils.logger import logger
+from utils.metrics import metrics
+from utils.deadline import Deadline
+from utils.constants import (MEMORY_TRACKING, MEMORY_TRACEMALLOC, MEMORY_TOP_ALLOCATIONS,
+                             MEMORY_ALERT_MB, DATABASE_PATH)
+
+MB = 1024 * 1024
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """
+    Read the resident set size of a process from /proc.
+
+    Returns:
+        Optional[int]: RSS in bytes, None if the process is gone or /proc is unavailable
+    """
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        return None
+    return None
+
+def descendant_pids(pid: int) -> List[int]:
+    """
+    Find every process started by a process, directly or not.
+
+    geckodriver is our child and the Firefox parent and content processes are its
+    children, so the descendants of this process are the browser's process tree.
+    The TrOCR model is loaded in this process and counts towards its own RSS.
+    """
+    children: Dict[int, List[int]] = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", encoding="ascii", errors="replace") as f:
+                # The command name may contain spaces, the fields after it do not
+                fields = f.read().rsplit(")", 1)[1].split()
+            children.setdefault(int(fields[1]), []).append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    found = []
+    pending = list(children.get(pid, []))
+    while pending:
+        child = pending.pop()
+        found.append(child)
+        pending += children.get(child, [])
+    return found
+
+def open_handles(path: str) -> Optional[int]:
+    """
+    Count the file descriptors of this process open on a file.
+
+    Each sqlite3 connection holds one, so this shows Database connections that
+    were never closed.
+    """
+    target = os.path.abspath(path)
+    try:
+        descriptors = os.listdir("/proc/self/fd")
+    except OSError:
+        return None
+    count = 0
+    for descriptor in descriptors:
+        try:
+            if os.readlink(f"/proc/self/fd/{descriptor}") == target:
+                count += 1
+        except OSError:
+            continue
+    return count
+
+class MemoryMonitor:
+    def __init__(self, enabled: bool = MEMORY_TRACKING, heap_tracing: bool = MEMORY_TRACEMALLOC,
+                 top_allocations: int = MEMORY_TOP_ALLOCATIONS, alert_mb: int = MEMORY_ALERT_MB):
+        """
+        Record memory use at the stage boundaries of a run.
+
+        Each checkpoint sets gauges labelled by stage for this process's RSS, the
+        RSS of the browser process tree, open database handles and, if heap
+        tracing is on, the Python heap measured by tracemalloc.
+
+        Args:
+            enabled (bool): Record checkpoints
+            heap_tracing (bool): Trace Python allocations with tracemalloc, which
+                slows allocation-heavy code down noticeably
+            top_allocations (int): Allocation sites logged per checkpoint
+            alert_mb (int): Alert once per run when this process and the browser
+                together use more than this many MB, 0 to disable
+        """
+        self.enabled = enabled
+        self.heap_tracing = heap_tracing
+        self.top_allocations = top_allocations
+        self.alert_mb = alert_mb
+        self.alerted = False
+        # Deadline of the run in progress, which bounds sending the alert
+        self.deadline: Optional[Deadline] = None
+
+    def start_run(self) -> None:
+        """Start heap tracing for a new run and re-arm the alert"""
+        self.alerted = False
+        self.deadline = None
+        if self.enabled and self.heap_tracing and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def checkpoint(self, stage: str) -> None:
+        """
+        Record memory use after a stage of the run.
+
+        Args:
+            stage (str): Stage that just finished, e.g. "login"
+        """
+        if not self.enabled:
+            return
+        try:
+            python_rss = rss_bytes(os.getpid())
+            browser_pids = descendant_pids(os.getpid())
+            browser_rss = sum(rss_bytes(pid) or 0 for pid in browser_pids)
+            database_handles = open_handles(DATABASE_PATH)
+
+            labels = {"stage": stage}
+            if python_rss is not None:
+                metrics.set_gauge("memory_rss_bytes", python_rss, {**labels, "process": "python"})
+                metrics.set_gauge("memory_rss_bytes", browser_rss, {**labels, "process": "browser"})
+                metrics.set_gauge("browser_processes", len(browser_pids), labels)
+            if database_handles is not None:
+                metrics.set_gauge("database_open_handles", database_handles, labels)
+
+            heap = None
+            if tracemalloc.is_tracing():
+                heap, heap_peak = tracemalloc.get_traced_memory()
+                metrics.set_gauge("memory_python_heap_bytes", heap, labels)
+                metrics.set_gauge("memory_python_heap_peak_bytes", heap_peak, labels)
+
+            logger.info("Memory after %s: python %.1f MB RSS, browser %.1f MB RSS in %s processes, "
+                        "heap %s, %s open database handles", stage, (python_rss or 0) / MB, browser_rss / MB,
+                        len(browser_pids), f"{heap / MB:.1f} MB" if heap is not None else "not traced",
+                        database_handles)
+            if heap is not None and logger.is_debug_enabled():
+                logger.debug("Top allocations after %s:\n%s", stage, self.format_top_allocations())
+
+            total_mb = ((python_rss or 0) + browser_rss) / MB
+            if self.alert_mb and total_mb > self.alert_mb and not self.alerted:
+                self.alerted = True
+                self.alert(stage, total_mb, (python_rss or 0) / MB, browser_rss / MB)
+        except Exception as e:
+            logger.log_error_with_context(e, {
+                "operation": "memory_checkpoint",
+                "stage": stage
+            })
+
+    def format_top_allocations(self) -> str:
+        """Describe the source lines holding the most traced Python memory"""
+        statistics = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>")
+        )).statistics("lineno")
+        return "\n".join(f"  {statistic.size / 1024:10.1f} KiB in {statistic.count} blocks at {statistic.traceback}"
+                         for statistic in statistics[:self.top_allocations])
+
+    def alert(self, stage: str, total_mb: float, python_mb: float, browser_mb: float) -> None:
+        """Warn through the notifier that memory use crossed the threshold"""
+        from utils.notify import Notification, MEMORY_ALERT_TITLE
+
+        logger.warning("Memory use %.0f MB after %s exceeds MEMORY_ALERT_MB=%s", total_mb, stage, self.alert_mb)
+        if tracemalloc.is_tracing():
+            logger.warning("Top allocations after %s:\n%s", stage, self.format_top_allocations())
+        Notification(self.deadline).send_alert(
+            f"Bellek kullanımı yüksek: {total_mb:.0f} MB ({stage} sonrası)\n"
+            f"Python: {python_mb:.0f} MB, Firefox: {browser_mb:.0f} MB",
+            title=MEMORY_ALERT_TITLE
+        )
+
+# Create singleton instance
+memory = MemoryMonitor()
@@ -0,0 +1,237 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+import threading
+import json
+import time
+import os
+
+# Latency buckets in seconds, from a cached DB check up to a slow page load
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Prefix of every exported metric name
+NAMESPACE = "obs_notifier"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def label_key(labels: Optional[Dict[str, object]]) -> LabelKey:
+    """Turn labels into a hashable, ordered key"""
+    return tuple(sorted((name, str(value)) for name, value in (labels or {}).items()))
+
+def format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    """Format labels the way the Prometheus text format expects them"""
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Cumulative latency histogram.
+
+        Args:
+            buckets (Tuple[float, ...]): Upper bounds in seconds, ascending
+        """
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record one observation"""
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, share: float) -> float:
+        """
+        Estimate a quantile from the buckets, interpolating inside the bucket.
+
+        Args:
+            share (float): The quantile, e.g. 0.95
+
+        Returns:
+            float: Estimated value in seconds; the maximum if it falls past the last bucket
+        """
+        if not self.count:
+            return 0.0
+        rank = share * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and seen + count >= rank:
+                return min(lower + (bound - lower) * (rank - seen) / count, self.max)
+            seen += count
+            lower = bound
+        return self.max
+
+class MetricsRegistry:
+    def __init__(self):
+        """
+        In-memory registry of counters, gauges and latency histograms.
+
+        A single run exports what it recorded when it ends; the daemon keeps
+        accumulating across runs and serves the registry over HTTP.
+        """
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self.histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self.started_at = time.time()
+
+    def increment(self, name: str, value: float = 1, labels: Optional[Dict[str, object]] = None) -> None:
+        """Add to a counter"""
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            key = label_key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, labels: Optional[Dict[str, object]] = None) -> None:
+        """Set a gauge to its current value"""
+        with self._lock:
+            self.gauges.setdefault(name, {})[label_key(labels)] = value
+
+    def observe(self, name: str, seconds: float, labels: Optional[Dict[str, object]] = None) -> None:
+        """Record a duration in a latency histogram"""
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            key = label_key(labels)
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(seconds)
+
+    def reset(self) -> None:
+        """Drop everything recorded so far"""
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+            self.started_at = time.time()
+
+    def to_prometheus(self) -> str:
+        """
+        Render the registry in the Prometheus text exposition format.
+
+        Returns:
+            str: Metrics text, as read by the node_exporter textfile collector
+        """
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                metric = f"{NAMESPACE}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines += [f"{metric}{format_labels(key)} {value:.15g}" for key, value in sorted(series.items())]
+            for name, series in sorted(self.gauges.items()):
+                metric = f"{NAMESPACE}_{name}"
+                lines.append(f"# TYPE {metric} gauge")
+                lines += [f"{metric}{format_labels(key)} {value:.15g}" for key, value in sorted(series.items())]
+            for name, series in sorted(self.histograms.items()):
+                metric = f"{NAMESPACE}_{name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{metric}_bucket{format_labels(key, ('le', f'{bound:g}'))} {cumulative}")
+                    lines.append(f"{metric}_bucket{format_labels(key, ('le', '+Inf'))} {histogram.count}")
+                    lines.append(f"{metric}_sum{format_labels(key)} {histogram.sum:.6f}")
+                    lines.append(f"{metric}_count{format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> Dict:
+        """
+        Summarize the registry for the JSON export.
+
+        Returns:
+            Dict: Counters and gauges by name and labels, and per histogram its
+            count, sum, max and estimated p50/p95 in seconds
+        """
+        def labelled(key: LabelKey) -> str:
+            return ",".join(f"{name}={value}" for name, value in key)
+
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "exported_at": time.time(),
+                "counters": {name: {labelled(key): value for key, value in series.items()}
+                             for name, series in self.counters.items()},
+                "gauges": {name: {labelled(key): value for key, value in series.items()}
+                           for name, series in self.gauges.items()},
+                "histograms": {name: {labelled(key): {
+                    "count": histogram.count,
+                    "sum": round(histogram.sum, 6),
+                    "max": round(histogram.max, 6),
+                    "p50": round(histogram.quantile(0.5), 6),
+                    "p95": round(histogram.quantile(0.95), 6)
+                } for key, histogram in series.items()} for name, series in self.histograms.items()}
+            }
+
+    def export(self, prometheus_file: str, json_file: str) -> None:
+        """
+        Write the Prometheus textfile and the JSON summary.
+
+        Files are replaced atomically so a collector never reads a partial file.
+
+        Args:
+            prometheus_file (str): Path of the .prom file
+            json_file (str): Path of the JSON summary
+        """
+        for path, content in ((prometheus_file, self.to_prometheus()),
+                              (json_file, json.dumps(self.to_dict(), indent=2))):
+            folder = os.path.dirname(path)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder)
+            temp_path = f"{path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(temp_path, path)
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    server: "MetricsServer"
+
+    def do_GET(self) -> None:
+        if self.path == "/metrics":
+            body = self.server.registry.to_prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path == "/metrics.json":
+            body = json.dumps(self.server.registry.to_dict(), indent=2).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+class MetricsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, registry: MetricsRegistry, port: int, host: str = "127.0.0.1"):
+        """
+        Serve the registry at /metrics (Prometheus) and /metrics.json.
+
+        Args:
+            registry (MetricsRegistry): The registry to serve
+            port (int): Port to listen on
+            host (str): Address to bind, local only by default
+        """
+        super().__init__((host, port), MetricsHandler)
+        self.registry = registry
+
+    def start(self) -> None:
+        """Serve from a background thread"""
+        threading.Thread(target=self.serve_forever, name="metrics-server", daemon=True).start()
+
+# Create singleton instance
+metrics = MetricsRegistry()
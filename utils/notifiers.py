@@ -0,0 +1,220 @@
+from email.message import EmailMessage
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import smtplib
+import asyncio
+import aiohttp
+from utils.logger import logger
+from utils.rate_limit import RateLimited, parse_retry_after
+from utils.constants import (NOTIFIERS, NOTIFIER_TIMEOUTS, NOTIFIER_CONCURRENCY, NOTIFIER_RATES, NOTIFIER_BURSTS,
+                             NTFY_SERVER, NTFY_TOPIC,
+                             NTFY_TOKEN, WEBHOOK_URL, WEBHOOK_FORMAT, SMTP_HOST, SMTP_PORT, SMTP_USERNAME,
+                             SMTP_PASSWORD, SMTP_STARTTLS, EMAIL_FROM, EMAIL_TO)
+
+@dataclass
+class Message:
+    title: str
+    body: str
+    # ntfy tag shown as an emoji, e.g. "loudspeaker"
+    tags: str = ""
+    priority: str = "high"
+
+class Notifier(ABC):
+    """
+    A destination notifications are delivered to.
+
+    Subclasses implement send, raising RateLimited when the destination refuses
+    a send for its rate limit and any other exception on failure. The dispatcher
+    in utils.notify applies the timeout, concurrency limit and rate limit.
+    """
+    name = "notifier"
+    # Seconds one send may take and sends in flight at once, unless overridden
+    default_timeout = 5.0
+    default_concurrency = 4
+    # Sends per second and burst one destination accepts, unless overridden
+    default_rate = 1.0
+    default_burst = 5
+
+    def __init__(self, name: Optional[str] = None, timeout: Optional[float] = None,
+                 concurrency: Optional[int] = None, rate: Optional[float] = None, burst: Optional[int] = None):
+        """
+        Args:
+            name (Optional[str]): Name in logs and metrics, the backend's by default
+            timeout (Optional[float]): Seconds one send may take, NOTIFIER_TIMEOUTS by default
+            concurrency (Optional[int]): Sends in flight at once, NOTIFIER_CONCURRENCY by default
+            rate (Optional[float]): Sends per second to the destination, NOTIFIER_RATES by default, 0 for no limit
+            burst (Optional[int]): Sends to the destination allowed at once, NOTIFIER_BURSTS by default
+        """
+        self.name = name or self.name
+        self.timeout = timeout or NOTIFIER_TIMEOUTS.get(self.name, self.default_timeout)
+        self.concurrency = concurrency or NOTIFIER_CONCURRENCY.get(self.name, self.default_concurrency)
+        self.rate = rate if rate is not None else NOTIFIER_RATES.get(self.name, self.default_rate)
+        self.burst = burst or NOTIFIER_BURSTS.get(self.name, self.default_burst)
+
+    @property
+    def destination(self) -> str:
+        """Key of the rate limit the destination enforces, shared by notifiers sending to it"""
+        return self.name
+
+    @abstractmethod
+    async def send(self, session: aiohttp.ClientSession, message: Message) -> None:
+        """Deliver one message, raising on failure"""
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.name!r})"
+
+def raise_for_rate_limit(response: aiohttp.ClientResponse) -> None:
+    """Raise RateLimited with the wait the server asked for if it answered 429"""
+    if response.status == 429:
+        raise RateLimited(parse_retry_after(response.headers.get("Retry-After")))
+
+class NtfyNotifier(Notifier):
+    name = "ntfy"
+    # ntfy.sh allows a burst of 60 requests, then one every 5 seconds
+    default_rate = 0.2
+    default_burst = 60
+
+    def __init__(self, server: str = NTFY_SERVER, topic: Optional[str] = NTFY_TOPIC,
+                 token: Optional[str] = NTFY_TOKEN, **kwargs):
+        """
+        Publish to a topic of ntfy.sh or a self-hosted ntfy server.
+
+        Args:
+            server (str): Server URL
+            topic (Optional[str]): Topic to publish to
+            token (Optional[str]): Access token, for servers that require one
+        """
+        super().__init__(**kwargs)
+        self.url = f"{server.rstrip('/')}/{topic}"
+        self.token = token
+
+    @property
+    def destination(self) -> str:
+        return self.url
+
+    async def send(self, session: aiohttp.ClientSession, message: Message) -> None:
+        headers = {"Title": message.title, "Tags": message.tags, "Priority": message.priority}
+        logger.log_request_response("NTFY_REQUEST", "URL: %s\nHeaders: %s\nMessage: %s",
+                                    self.url, headers, message.body)
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        async with session.post(self.url, data=message.body.encode("utf-8"), headers=headers) as response:
+            await response.text()
+            raise_for_rate_limit(response)
+            response.raise_for_status()
+            logger.log_request_response("NTFY_RESPONSE", "Status: %s", response.status)
+
+class WebhookNotifier(Notifier):
+    name = "webhook"
+
+    def __init__(self, url: Optional[str] = WEBHOOK_URL, payload_format: str = WEBHOOK_FORMAT, **kwargs):
+        """
+        POST a JSON message to a chat webhook.
+
+        Args:
+            url (Optional[str]): Webhook URL
+            payload_format (str): "slack" ({"text": ...}), "discord" ({"content": ...})
+                or "json" (title, message, tags and priority fields)
+        """
+        super().__init__(**kwargs)
+        self.url = url
+        self.payload_format = payload_format
+
+    @property
+    def destination(self) -> str:
+        return self.url
+
+    def payload(self, message: Message) -> Dict[str, str]:
+        if self.payload_format == "slack":
+            return {"text": f"*{message.title}*\n{message.body}"}
+        if self.payload_format == "discord":
+            return {"content": f"**{message.title}**\n{message.body}"}
+        return {"title": message.title, "message": message.body, "tags": message.tags, "priority": message.priority}
+
+    async def send(self, session: aiohttp.ClientSession, message: Message) -> None:
+        payload = self.payload(message)
+        logger.log_request_response("WEBHOOK_REQUEST", "URL: %s\nPayload: %s", self.url, payload)
+        async with session.post(self.url, json=payload) as response:
+            await response.text()
+            raise_for_rate_limit(response)
+            response.raise_for_status()
+            logger.log_request_response("WEBHOOK_RESPONSE", "Status: %s", response.status)
+
+class EmailNotifier(Notifier):
+    name = "email"
+    # Connecting, STARTTLS and logging in take several round trips
+    default_timeout = 15.0
+    default_concurrency = 1
+    default_rate = 0.5
+    default_burst = 10
+
+    def __init__(self, host: Optional[str] = SMTP_HOST, port: int = SMTP_PORT, username: Optional[str] = SMTP_USERNAME,
+                 password: Optional[str] = SMTP_PASSWORD, starttls: bool = SMTP_STARTTLS,
+                 sender: Optional[str] = EMAIL_FROM, recipients: Optional[List[str]] = None, **kwargs):
+        """
+        Send an email through an SMTP server.
+
+        Args:
+            host (Optional[str]): SMTP server
+            port (int): SMTP port
+            username (Optional[str]): Login user, no login if empty
+            password (Optional[str]): Login password
+            starttls (bool): Upgrade the connection with STARTTLS before logging in
+            sender (Optional[str]): From address, the username by default
+            recipients (Optional[List[str]]): To addresses, EMAIL_TO by default
+        """
+        super().__init__(**kwargs)
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.sender = sender or username
+        self.recipients = recipients if recipients is not None else EMAIL_TO
+
+    @property
+    def destination(self) -> str:
+        return f"smtp://{self.host}:{self.port}"
+
+    def build(self, message: Message) -> EmailMessage:
+        email = EmailMessage()
+        email["Subject"] = message.title
+        email["From"] = self.sender
+        email["To"] = ", ".join(self.recipients)
+        email.set_content(message.body)
+        return email
+
+    def deliver(self, email: EmailMessage) -> None:
+        """Blocking SMTP exchange, run in a thread so other sinks keep going"""
+        try:
+            with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+                if self.starttls:
+                    smtp.starttls()
+                if self.username:
+                    smtp.login(self.username, self.password or "")
+                smtp.send_message(email)
+        except smtplib.SMTPResponseException as e:
+            # Servers throttling a sender answer with these temporary errors
+            if e.smtp_code in (421, 450, 451):
+                raise RateLimited() from e
+            raise
+
+    async def send(self, session: aiohttp.ClientSession, message: Message) -> None:
+        logger.log_request_response("SMTP_REQUEST", "Server: %s:%s\nTo: %s\nSubject: %s",
+                                    self.host, self.port, self.recipients, message.title)
+        await asyncio.to_thread(self.deliver, self.build(message))
+
+BACKENDS = {backend.name: backend for backend in (NtfyNotifier, WebhookNotifier, EmailNotifier)}
+
+def configured_notifiers(names: List[str] = NOTIFIERS) -> List[Notifier]:
+    """
+    Build the backends listed in NOTIFIERS from their settings.
+
+    Raises:
+        ValueError: If a name is not a known backend
+    """
+    unknown = [name for name in names if name not in BACKENDS]
+    if unknown:
+        raise ValueError(f"Unknown notifiers {unknown}, expected any of {sorted(BACKENDS)}")
+    return [BACKENDS[name]() for name in names]
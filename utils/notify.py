@@ -1,131 +1,159 @@
 import aiohttp
 import asyncio
 from utils.logger import logger
-from pages.results_page import Result
-from datetime import datetime
-from typing import List
+from utils.metrics import metrics
+from utils.deadline import Deadline, DeadlineExceeded
+from utils.tracing import tracer
+from utils.notifiers import Message, Notifier, configured_notifiers
+from utils.rate_limit import RateLimiter, RateLimited, rate_limiter
+from models.model import Result
+from typing import Dict, List, Optional
 import platform
-from utils.constants import NTFY_TOPIC
+import time
+from utils.constants import NOTIFY_MAX_ATTEMPTS
+
+# Titles travel as ntfy headers, so they are kept ASCII
+CONTACT_ALERT_TITLE = "beykent universitesi iletisim bilgilerinizi guncelleyiniz"
+MEMORY_ALERT_TITLE = "beykent sinav bildirimi bellek kullanimi yuksek"
+TEST_TITLE = "beykent sinav bildirimi test mesaji"
 
 class Notification:
-    def __init__(self):
-        start_time = datetime.now()
+    def __init__(self, deadline: Optional[Deadline] = None, notifiers: Optional[List[Notifier]] = None,
+                 limiter: Optional[RateLimiter] = None):
+        """
+        Dispatcher that fans every notification out to all notifier backends.
+
+        Backends are sent to concurrently, each under its own timeout and limit
+        of sends in flight, so a slow backend does not hold up the others. Sends
+        beyond a destination's rate limit are queued, not dropped.
+
+        Args:
+            deadline (Optional[Deadline]): Run deadline bounding every send
+            notifiers (Optional[List[Notifier]]): Backends, the ones in NOTIFIERS by default
+            limiter (Optional[RateLimiter]): Rate limits, the one shared by the process by default
+        """
+        start_time = time.perf_counter()
         try:
             logger.info("Initializing Notification system")
-            self.topic = NTFY_TOPIC
-            self.base_url = f"https://ntfy.sh/{self.topic}"
-            logger.info(f"Notification configured - URL: {self.base_url}")
+            self.deadline = deadline or Deadline()
+            self.limiter = limiter or rate_limiter
+            self.notifiers = notifiers if notifiers is not None else configured_notifiers()
+            logger.info("Notification configured - backends: %s", self.notifiers)
         except Exception as e:
             logger.log_error_with_context(e, {
                 "operation": "notification_init",
-                "topic": self.topic if hasattr(self, 'topic') else None,
-                "base_url": self.base_url if hasattr(self, 'base_url') else None
+                "notifiers": self.notifiers if hasattr(self, 'notifiers') else None
             })
             raise
         finally:
             logger.log_operation_time("notification_init", start_time)
 
-    async def send_notification_async(self, session: aiohttp.ClientSession, result: Result) -> None:
-        start_time = datetime.now()
+    @staticmethod
+    def result_message(result: Result) -> Message:
+        return Message(
+            title="Beykent Universitesi Sinav Sonucunuz Aciklandi !",
+            body=f"Sınav sonucunuz açıklandı!\n\nDers: {result.lesson_name}\nSınav: {result.exam_type}\nNot: {result.score if result.score is not None else result.grade}",
+            tags="loudspeaker"
+        )
+
+    @staticmethod
+    def alert_message(message: str, title: str = CONTACT_ALERT_TITLE) -> Message:
+        return Message(title=title, body=message, tags="warning")
+
+    async def send_to(self, notifier: Notifier, limit: asyncio.Semaphore,
+                      session: aiohttp.ClientSession, message: Message) -> bool:
+        """
+        Send a message to one backend within its rate limit, concurrency limit and timeout.
+
+        A send the destination refuses for its rate limit is queued again behind the
+        wait it asked for (Retry-After), up to NOTIFY_MAX_ATTEMPTS sends.
+
+        Returns:
+            bool: True if the backend accepted it
+        """
+        start_time = time.perf_counter()
+        outcome = "failed"
         try:
-            message = f"Sınav sonucunuz açıklandı!\n\nDers: {result.lesson_name}\nSınav: {result.exam_type}\nNot: {result.score}"
-            headers = {
-                "Title": "Beykent Universitesi Sinav Sonucunuz Aciklandi !",
-                "Tags": "loudspeaker",
-                "Priority": "high"
-            }
-
-            logger.info(f"Sending exam result notification for {result.lesson_name} ({result.exam_type})")
-            logger.log_request_response(
-                "NTFY_RESULT_REQUEST",
-                f"URL: {self.base_url}\nHeaders: {headers}\nMessage: {message}"
-            )
-
-            async with session.post(
-                self.base_url,
-                data=message.encode("utf-8"),
-                headers=headers,
-                timeout=5
-            ) as response:
-                await response.text()
-                response.raise_for_status()
-                
-                logger.info(f"Notification sent successfully for {result.lesson_name} {result.exam_type} with score {result.score}")
-                logger.log_request_response(
-                    "NTFY_RESULT_RESPONSE",
-                    f"Status: {response.status}\nTime: {datetime.now() - start_time}"
-                )
-                
+            for attempt in range(1, NOTIFY_MAX_ATTEMPTS + 1):
+                waited = await self.limiter.acquire(notifier.destination, notifier.rate, notifier.burst,
+                                                    self.deadline.remaining())
+                metrics.observe("notification_queue", waited, {"notifier": notifier.name})
+                try:
+                    async with limit:
+                        with tracer.span("notify.send", notifier=notifier.name, attempt=attempt):
+                            await asyncio.wait_for(notifier.send(session, message),
+                                                   self.deadline.clamp(notifier.timeout))
+                except RateLimited as e:
+                    outcome = "rate_limited"
+                    # Without Retry-After, wait for the next token the destination refills
+                    retry_after = e.retry_after if e.retry_after is not None else 1 / (notifier.rate or 1)
+                    metrics.increment("notifications_rate_limited", 1, {"notifier": notifier.name})
+                    logger.warning("%s rate limited notification %r (attempt %s/%s), retrying in %.1fs",
+                                   notifier.name, message.title, attempt, NOTIFY_MAX_ATTEMPTS, retry_after)
+                    self.limiter.pause(notifier.destination, retry_after)
+                    continue
+                outcome = "sent"
+                logger.info("Notification %r sent through %s", message.title, notifier.name)
+                return True
+            logger.error("Giving up on notification %r through %s after %s rate limited attempts",
+                         message.title, notifier.name, NOTIFY_MAX_ATTEMPTS)
         except asyncio.TimeoutError:
-            logger.log_error_with_context(Exception("Notification timeout"), {
+            outcome = "timeout"
+            logger.log_error_with_context(Exception(f"{notifier.name} notification timeout"), {
                 "operation": "send_notification",
-                "result": str(result.__dict__),
-                "timeout": "5 seconds"
+                "notifier": notifier.name,
+                "timeout": f"{notifier.timeout} seconds"
             })
+        except DeadlineExceeded as e:
+            outcome = "deadline"
+            logger.warning("Dropping notification %r through %s: %s", message.title, notifier.name, e)
         except Exception as e:
             logger.log_error_with_context(e, {
                 "operation": "send_notification",
-                "result": str(result.__dict__),
-                "url": self.base_url
+                "notifier": notifier.name,
+                "title": message.title
             })
         finally:
-            logger.log_operation_time("send_notification", start_time)
+            metrics.increment("notifications_sent", 1, {"notifier": notifier.name, "outcome": outcome})
+            logger.log_operation_time("send_notification", start_time, {"notifier": notifier.name})
+        return False
 
-    async def send_alert_async(self, session: aiohttp.ClientSession, message: str) -> None:
-        start_time = datetime.now()
-        try:
-            headers = {
-                "Title": "beykent universitesi iletisim bilgilerinizi guncelleyiniz",
-                "Tags": "warning",
-                "Priority": "high"
-            }
-            
-            logger.info(f"Sending alert notification")
-            logger.log_request_response(
-                "NTFY_ALERT_REQUEST",
-                f"URL: {self.base_url}\nHeaders: {headers}\nMessage: {message}"
-            )
-            
-            async with session.post(
-                self.base_url,
-                data=message.encode("utf-8"),
-                headers=headers,
-                timeout=5
-            ) as response:
-                await response.text()
-                response.raise_for_status()
-                
-                logger.info(f"Alert sent successfully")
-                logger.log_request_response(
-                    "NTFY_ALERT_RESPONSE",
-                    f"Status: {response.status}\nTime: {datetime.now() - start_time}"
-                )
-                
-        except asyncio.TimeoutError:
-            logger.log_error_with_context(Exception("Alert notification timeout"), {
-                "operation": "send_alert",
-                "timeout": "5 seconds"
-            })
-        except Exception as e:
-            logger.log_error_with_context(e, {
-                "operation": "send_alert",
-                "url": self.base_url,
-                "message": message
-            })
-        finally:
-            logger.log_operation_time("send_alert", start_time)
+    async def dispatch_async(self, messages: List[Message]) -> List[bool]:
+        """
+        Send every message to every backend concurrently.
 
-    def send_alert(self, message: str) -> None:
-        start_time = datetime.now()
+        Returns:
+            List[bool]: Whether at least one backend accepted each message
+        """
+        # Semaphores belong to the event loop, so every dispatch creates its own
+        limits: Dict[Notifier, asyncio.Semaphore] = {
+            notifier: asyncio.Semaphore(notifier.concurrency) for notifier in self.notifiers}
+        async with aiohttp.ClientSession() as session:
+            async def deliver(message: Message) -> bool:
+                sent = await asyncio.gather(*(self.send_to(notifier, limit, session, message)
+                                              for notifier, limit in limits.items()))
+                return any(sent)
+            return await asyncio.gather(*(deliver(message) for message in messages))
+
+    def dispatch(self, messages: List[Message]) -> List[bool]:
+        if platform.system() == 'Windows':
+            asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+        return asyncio.run(self.dispatch_async(messages))
+
+    @tracer.traced("notify.send_alert")
+    def send_alert(self, message: str, title: str = CONTACT_ALERT_TITLE) -> None:
+        """
+        Send a warning to every backend.
+
+        Args:
+            message (str): Body of the alert
+            title (str): Title of the alert, the contact information warning by default
+        """
+        start_time = time.perf_counter()
         try:
-            async def run_async():
-                async with aiohttp.ClientSession() as session:
-                    await self.send_alert_async(session, message)
-            
-            if platform.system() == 'Windows':
-                asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-            asyncio.run(run_async())
-            
+            logger.info("Sending alert notification: %s", title)
+            if self.dispatch([self.alert_message(message, title)])[0]:
+                logger.info("Alert sent successfully")
         except Exception as e:
             logger.log_error_with_context(e, {
                 "operation": "send_alert",
@@ -134,30 +162,30 @@ class Notification:
         finally:
             logger.log_operation_time("send_alert", start_time)
 
-    def notify_new_results(self, results: List[Result]) -> None:
-        start_time = datetime.now()
+    @tracer.traced("notify.notify_new_results")
+    def notify_new_results(self, results: List[Result]) -> List[Result]:
+        """
+        Send a notification for every result, concurrently.
+
+        Returns:
+            List[Result]: The results whose notification reached at least one backend
+        """
+        start_time = time.perf_counter()
+        delivered: List[Result] = []
         try:
             if not results:
                 logger.info("No new results to notify")
-                return
+                return delivered
 
             total_results = len(results)
-            logger.info(f"Preparing to send notifications for {total_results} new results")
-            
-            async def send_all_notifications():
-                async with aiohttp.ClientSession() as session:
-                    tasks = []
-                    for index, result in enumerate(results, 1):
-                        logger.info(f"Processing notification {index}/{total_results}")
-                        task = asyncio.create_task(self.send_notification_async(session, result))
-                        tasks.append(task)
-                    await asyncio.gather(*tasks)
-
-            if platform.system() == 'Windows':
-                asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-            asyncio.run(send_all_notifications())
-            
-            logger.info(f"Successfully sent notifications for {total_results} results")
+            logger.info("Preparing to send notifications for %s new results to %s backends",
+                        total_results, len(self.notifiers))
+            for result in results:
+                logger.info("Sending exam result notification for %s (%s)", result.lesson_name, result.exam_type)
+            sent = self.dispatch([self.result_message(result) for result in results])
+            delivered = [result for result, ok in zip(results, sent) if ok]
+
+            logger.info("Sent notifications for %s of %s results", len(delivered), total_results)
         except Exception as e:
             logger.log_error_with_context(e, {
                 "operation": "notify_new_results",
@@ -165,7 +193,4 @@ class Notification:
             })
         finally:
             logger.log_operation_time("notify_all_results", start_time)
-        
-        
-        
-        
+        return delivered
@@ -0,0 +1,155 @@
+import requests
+from utils.logger import logger
+from typing import Optional
+import json
+import time
+import os
+from utils.constants import (LOGIN_URL, LOGIN_PAGE_LOCATORS, PROBE_TIMEOUT, CIRCUIT_BREAKER_FILE, USER_AGENT,
+                             CIRCUIT_BREAKER_BASE_BACKOFF, CIRCUIT_BREAKER_MAX_BACKOFF)
+
+# Phrases the portal shows instead of the login form while it is under maintenance
+MAINTENANCE_MARKERS = ("bakım", "bakim", "maintenance", "hizmet dışı", "service unavailable")
+
+class ProbeResult:
+    def __init__(self, healthy: bool, reason: str, status: Optional[int] = None, latency: float = 0.0):
+        self.healthy = healthy
+        self.reason = reason
+        self.status = status
+        self.latency = latency
+
+    def __repr__(self) -> str:
+        return (f"ProbeResult(healthy={self.healthy}, reason={self.reason!r}, "
+                f"status={self.status}, latency={self.latency:.3f})")
+
+class PortalProbe:
+    def __init__(self, url: str = LOGIN_URL, timeout: float = PROBE_TIMEOUT):
+        """
+        Initialize a lightweight HTTP probe of the portal login page.
+
+        Args:
+            url (str): The URL to probe
+            timeout (float): Connect and read timeout in seconds
+        """
+        self.url = url
+        self.timeout = timeout
+        # The login form is only usable if its username field is rendered
+        self.expected_marker = LOGIN_PAGE_LOCATORS["username_input"][1]
+
+    def probe(self) -> ProbeResult:
+        """
+        Fetch the login page once and classify the portal state.
+
+        Returns:
+            ProbeResult: Health, reason, HTTP status and latency of the probe
+        """
+        start_time = time.perf_counter()
+        started = time.monotonic()
+        try:
+            logger.info("Probing portal health: %s", self.url)
+            # Unknown clients get different markup without the login form marker
+            response = requests.get(self.url, timeout=self.timeout, headers={"User-Agent": USER_AGENT})
+            latency = time.monotonic() - started
+            logger.log_request_response(
+                "PORTAL_PROBE",
+                "URL: %s\nResponse: Status: %s, Latency: %.3fs",
+                self.url, response.status_code, latency
+            )
+
+            if response.status_code != 200:
+                return ProbeResult(False, f"http_{response.status_code}", response.status_code, latency)
+
+            body = response.text
+            lowered = body.lower()
+            if self.expected_marker not in body:
+                if any(marker in lowered for marker in MAINTENANCE_MARKERS):
+                    return ProbeResult(False, "maintenance", response.status_code, latency)
+                return ProbeResult(False, "login_form_missing", response.status_code, latency)
+
+            return ProbeResult(True, "ok", response.status_code, latency)
+        except requests.Timeout:
+            return ProbeResult(False, "timeout", latency=time.monotonic() - started)
+        except requests.RequestException as e:
+            logger.log_error_with_context(e, {
+                "operation": "portal_probe",
+                "url": self.url
+            })
+            return ProbeResult(False, "connection_error", latency=time.monotonic() - started)
+        finally:
+            logger.log_operation_time("portal_probe", start_time)
+
+class CircuitBreaker:
+    def __init__(self, state_file: str = CIRCUIT_BREAKER_FILE,
+                 base_backoff: float = CIRCUIT_BREAKER_BASE_BACKOFF,
+                 max_backoff: float = CIRCUIT_BREAKER_MAX_BACKOFF):
+        """
+        Initialize a circuit breaker whose state survives between cron runs.
+
+        Args:
+            state_file (str): JSON file the breaker state is persisted to
+            base_backoff (float): Seconds to stay open after the first failure
+            max_backoff (float): Upper bound for the exponentially growing backoff
+        """
+        self.state_file = state_file
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.state = self._load()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.state_file, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"consecutive_failures": 0, "open_until": 0, "last_reason": None}
+        except (OSError, ValueError) as e:
+            logger.log_error_with_context(e, {
+                "operation": "load_circuit_breaker",
+                "state_file": self.state_file
+            })
+            return {"consecutive_failures": 0, "open_until": 0, "last_reason": None}
+
+    def _save(self) -> None:
+        directory = os.path.dirname(self.state_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        temp_file = f"{self.state_file}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(temp_file, self.state_file)
+
+    def allow_request(self) -> bool:
+        """
+        Check whether the breaker lets this run contact the portal.
+
+        Returns:
+            bool: False while the breaker is open
+        """
+        return time.time() >= self.state["open_until"]
+
+    def seconds_until_retry(self) -> float:
+        """Get the seconds left until the breaker closes again"""
+        return max(self.state["open_until"] - time.time(), 0.0)
+
+    def record_success(self) -> None:
+        """Close the breaker after a healthy probe"""
+        if self.state["consecutive_failures"]:
+            logger.info("Portal recovered after %s failed probes", self.state['consecutive_failures'])
+        self.state = {"consecutive_failures": 0, "open_until": 0, "last_reason": None}
+        self._save()
+
+    def record_failure(self, reason: str) -> None:
+        """
+        Open the breaker for a growing interval after a failed probe.
+
+        Args:
+            reason (str): Why the probe failed
+        """
+        failures = self.state["consecutive_failures"] + 1
+        backoff = min(self.base_backoff * 2 ** (failures - 1), self.max_backoff)
+        self.state = {
+            "consecutive_failures": failures,
+            "open_until": time.time() + backoff,
+            "last_reason": reason
+        }
+        self._save()
+        logger.warning("Portal unhealthy (%s), %s consecutive failures, backing off for %.0f seconds",
+                       reason, failures, backoff)
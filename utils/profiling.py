@@ -0,0 +1,145 @@
+from contextlib import contextmanager
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Set
+import itertools
+import threading
+import cProfile
+import time
+import sys
+import os
+from utils.logger import logger
+from utils.constants import PROFILE, PROFILE_STAGES, PROFILE_INTERVAL, PROFILE_RETENTION, PROFILES_FOLDER
+
+class StackSampler:
+    def __init__(self, interval: float = 0.005):
+        """
+        Sample the Python stacks of every thread from a background thread.
+
+        Unlike cProfile this sees all threads, including the term scrape workers,
+        and time blocked in socket reads shows up under the call that blocks.
+
+        Args:
+            interval (float): Seconds between samples
+        """
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+            self.sample_count += 1
+
+    def write_collapsed(self, path: str) -> None:
+        """
+        Write the samples as collapsed stacks ("thread;file:func;file:func count").
+
+        The format is read by flamegraph.pl, speedscope and inferno.
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+class Profiling:
+    def __init__(self, enabled: bool = PROFILE, stages: Optional[Set[str]] = None,
+                 interval: float = PROFILE_INTERVAL, folder: str = PROFILES_FOLDER, keep: int = PROFILE_RETENTION):
+        """
+        Opt-in per-stage CPU profiling.
+
+        A profiled stage is run under cProfile (deterministic, calling thread) and a
+        stack sampler (all threads). Stages nested inside a profiled stage are
+        part of its profile rather than profiled separately.
+
+        Args:
+            enabled (bool): Profile the selected stages
+            stages (Optional[Set[str]]): Stage names to profile, e.g. {"run"} or {"login", "results"}
+            interval (float): Seconds between stack samples
+            folder (str): Folder for the profile files
+            keep (int): Number of most recent profiled stages to keep files for
+        """
+        self.enabled = enabled
+        self.stages = stages if stages is not None else set(PROFILE_STAGES)
+        self.interval = interval
+        self.folder = folder
+        self.keep = keep
+        self._active = threading.Lock()
+        # Orders the files of stages profiled within the same second
+        self._sequence = itertools.count(1)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Profile the enclosed block if profiling is enabled for the stage.
+
+        Args:
+            name (str): Stage name, matched against the selected stages
+        """
+        if not self.enabled or name not in self.stages or not self._active.acquire(blocking=False):
+            yield
+            return
+
+        profile = cProfile.Profile()
+        sampler = StackSampler(self.interval)
+        started = time.perf_counter()
+        sampler.start()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            sampler.stop()
+            self._active.release()
+            self._write(name, profile, sampler, time.perf_counter() - started)
+
+    def _write(self, name: str, profile: cProfile.Profile, sampler: StackSampler, seconds: float) -> None:
+        try:
+            if not os.path.exists(self.folder):
+                os.makedirs(self.folder)
+            base = os.path.join(self.folder, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._sequence):03d}-{name}")
+            profile.dump_stats(f"{base}.pstats")
+            sampler.write_collapsed(f"{base}.collapsed")
+            logger.info("Profile of stage '%s' (%.2f s, %s samples) written to %s.{pstats,collapsed}",
+                        name, seconds, sampler.sample_count, base)
+            self._prune()
+        except OSError as e:
+            logger.log_error_with_context(e, {
+                "operation": "write_profile",
+                "stage": name,
+                "folder": self.folder
+            })
+
+    def _prune(self) -> None:
+        """Keep the files of the most recent profiled stages only"""
+        bases: Dict[str, List[str]] = {}
+        for filename in os.listdir(self.folder):
+            base, extension = os.path.splitext(filename)
+            if extension in (".pstats", ".collapsed"):
+                bases.setdefault(base, []).append(filename)
+        for base in sorted(bases)[:-self.keep] if self.keep > 0 else []:
+            for filename in bases[base]:
+                os.remove(os.path.join(self.folder, filename))
+
+# Create singleton instance
+profiling = Profiling()
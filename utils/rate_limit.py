@@ -0,0 +1,165 @@
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+import threading
+import asyncio
+import time
+from utils.deadline import DeadlineExceeded
+from utils.constants import NOTIFY_GLOBAL_RATE, NOTIFY_GLOBAL_BURST
+
+class RateLimited(Exception):
+    def __init__(self, retry_after: Optional[float] = None):
+        """
+        Raised by a notifier whose destination refused a send for exceeding its rate limit.
+
+        Args:
+            retry_after (Optional[float]): Seconds the destination asked to wait, if it said
+        """
+        super().__init__(f"Rate limited, retry after {retry_after} seconds" if retry_after is not None
+                         else "Rate limited")
+        self.retry_after = retry_after
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Read a Retry-After header, given either in seconds or as an HTTP date.
+
+    Returns:
+        Optional[float]: Seconds to wait, None if the header is missing or malformed
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        """
+        Token bucket refilled at a steady rate, tracked as the time its next token frees up.
+
+        Taking a token from an empty bucket reserves the next one instead of failing,
+        so callers queue in arrival order and are released at the refill rate.
+
+        Args:
+            rate (float): Tokens added per second, 0 for no limit
+            burst (int): Tokens the bucket holds when full
+        """
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.interval = 1 / rate if rate > 0 else 0.0
+        # Time the next token becomes free; every interval it lies in the past is one
+        # more token in the bucket, up to the burst
+        self.next_free = 0.0
+
+    def _start(self, now: float) -> float:
+        tolerance = (self.burst - 1) * self.interval
+        return max(self.next_free, now - tolerance)
+
+    def delay(self, now: float) -> float:
+        """
+        Look at the next token without taking it.
+
+        Returns:
+            float: Seconds until a token taken now could be used
+        """
+        return max(self._start(now) - now, 0.0)
+
+    def reserve(self, now: float) -> float:
+        """
+        Take a token.
+
+        Returns:
+            float: Seconds until the token may be used, 0 if it is available now
+        """
+        start = self._start(now)
+        self.next_free = start + self.interval
+        return max(start - now, 0.0)
+
+    def pause(self, until: float) -> None:
+        """Hand out no token before the given time, and only at the refill rate after it"""
+        self.next_free = max(self.next_free, until)
+
+class RateLimiter:
+    def __init__(self, global_rate: float = NOTIFY_GLOBAL_RATE, global_burst: int = NOTIFY_GLOBAL_BURST):
+        """
+        Token buckets per destination plus one shared by all, for every worker in the process.
+
+        Reservations are made under a lock and waited for outside it, so threads
+        running their own event loops share the same budget.
+
+        Args:
+            global_rate (float): Sends per second across all destinations, 0 for no limit
+            global_burst (int): Sends allowed at once across all destinations
+        """
+        self._lock = threading.Lock()
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, key: str, rate: float, burst: int) -> TokenBucket:
+        if key not in self.buckets:
+            self.buckets[key] = TokenBucket(rate, burst)
+        return self.buckets[key]
+
+    def reserve(self, key: str, rate: float, burst: int, limit: float = float("inf")) -> float:
+        """
+        Take a token from the destination's bucket and the global one.
+
+        Args:
+            limit (float): Most seconds the caller can wait
+
+        Returns:
+            float: Seconds to wait before sending
+
+        Raises:
+            DeadlineExceeded: If the tokens free up after the limit, in which case none is taken
+        """
+        with self._lock:
+            now = time.monotonic()
+            buckets = (self.bucket(key, rate, burst), self.global_bucket)
+            wait = max(bucket.delay(now) for bucket in buckets)
+            # Checked before taking anything, so a send that cannot happen in time
+            # does not push back the ones queued behind it
+            if wait > limit:
+                raise DeadlineExceeded(f"Rate limit of {key} frees up in {wait:.1f} seconds, "
+                                       f"{limit:.1f} seconds left")
+            return max(bucket.reserve(now) for bucket in buckets)
+
+    def pause(self, key: str, seconds: float) -> None:
+        """Hold back a destination that asked to be retried later"""
+        with self._lock:
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.pause(time.monotonic() + seconds)
+
+    async def acquire(self, key: str, rate: float, burst: int, limit: float = float("inf")) -> float:
+        """
+        Wait for a token of the destination and the global bucket.
+
+        Args:
+            key (str): Destination, e.g. the topic URL
+            rate (float): Destination's sends per second, 0 for no limit
+            burst (int): Destination's sends allowed at once
+            limit (float): Most seconds to wait, e.g. the time left before the run deadline
+
+        Returns:
+            float: Seconds waited
+
+        Raises:
+            DeadlineExceeded: If the token would not free up within the limit
+        """
+        wait = self.reserve(key, rate, burst, limit)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def reset(self) -> None:
+        """Forget every destination's state"""
+        with self._lock:
+            self.buckets = {}
+            self.global_bucket = TokenBucket(self.global_bucket.rate, self.global_bucket.burst)
+
+# Create singleton instance
+rate_limiter = RateLimiter()
@@ -0,0 +1,42 @@
+from typing import Dict, List
+import json
+import csv
+import io
+
+def format_value(value: object) -> str:
+    """Show a table cell, with numbers trimmed and missing values as "-" """
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:g}"
+    return str(value)
+
+def format_rows(rows: List[Dict], output_format: str = "table") -> str:
+    """
+    Format query rows for the terminal or another program.
+
+    Args:
+        rows (List[Dict]): Rows with the same keys, in column order
+        output_format (str): "table" for aligned columns, "json" for an array of
+            objects or "csv" with a header row
+
+    Returns:
+        str: The formatted rows
+    """
+    if output_format == "json":
+        return json.dumps(rows, ensure_ascii=False, indent=2)
+    if not rows:
+        return ""
+    columns = list(rows[0])
+    if output_format == "csv":
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=columns, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+        return output.getvalue().rstrip("\n")
+
+    cells = [columns] + [[format_value(row[column]) for column in columns] for row in rows]
+    widths = [max(len(line[index]) for line in cells) for index in range(len(columns))]
+    lines = ["  ".join(cell.ljust(width) for cell, width in zip(line, widths)).rstrip() for line in cells]
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    return "\n".join(lines)
@@ -0,0 +1,84 @@
+from utils.logger import logger
+import time
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+class RunLock:
+    def __init__(self, path: str):
+        """
+        Initialize a single-instance lock backed by the given file.
+
+        The lock is held by the operating system, so it is released automatically
+        if the process dies and a stale lock file never blocks later runs.
+
+        Args:
+            path (str): Path of the lock file
+        """
+        self.path = path
+        self.handle = None
+
+    def acquire(self, wait: float = 0) -> bool:
+        """
+        Try to take the lock.
+
+        Args:
+            wait (float): Seconds to keep retrying while another run holds the lock
+
+        Returns:
+            bool: True if the lock was acquired
+        """
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self.handle = open(self.path, "a+")
+        give_up_at = time.monotonic() + wait
+        while True:
+            try:
+                self._lock()
+                self.handle.seek(0)
+                self.handle.truncate()
+                self.handle.write(str(os.getpid()))
+                self.handle.flush()
+                logger.info("Acquired run lock: %s", self.path)
+                return True
+            except OSError:
+                if time.monotonic() >= give_up_at:
+                    self.handle.close()
+                    self.handle = None
+                    return False
+                time.sleep(0.5)
+
+    def release(self) -> None:
+        """Release the lock if it is held"""
+        if self.handle is None:
+            return
+        try:
+            self._unlock()
+        except OSError as e:
+            logger.log_error_with_context(e, {
+                "operation": "release_run_lock",
+                "path": self.path
+            })
+        finally:
+            self.handle.close()
+            self.handle = None
+
+    def _lock(self) -> None:
+        if fcntl:
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            self.handle.seek(0)
+            msvcrt.locking(self.handle.fileno(), msvcrt.LK_NBLCK, 1)
+
+    def _unlock(self) -> None:
+        if fcntl:
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+        else:
+            self.handle.seek(0)
+            msvcrt.locking(self.handle.fileno(), msvcrt.LK_UNLCK, 1)
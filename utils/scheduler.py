@@ -0,0 +1,268 @@
+from utils.logger import logger
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+import tempfile
+import json
+import os
+from utils.constants import (POLL_MIN_INTERVAL, POLL_MAX_INTERVAL, SCHEDULER_STATE_FILE)
+
+HOURS_PER_WEEK = 7 * 24
+WEEKS_PER_YEAR = 53
+
+# Smoothing kernels: a grade published at 14:00 makes 13:00 and 15:00 likely too
+HOUR_KERNEL = {-2: 0.25, -1: 0.5, 0: 1.0, 1: 0.5, 2: 0.25}
+WEEK_KERNEL = {-1: 0.5, 0: 1.0, 1: 0.5}
+
+def parse_created_at(value: str) -> datetime:
+    """
+    Convert a SQLite CURRENT_TIMESTAMP value (UTC) to a naive local datetime.
+
+    Args:
+        value (str): Timestamp in "YYYY-MM-DD HH:MM:SS" format
+
+    Returns:
+        datetime: The same instant in local time
+    """
+    utc = datetime.strptime(value, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    return utc.astimezone().replace(tzinfo=None)
+
+class PublicationProfile:
+    def __init__(self, timestamps: List[datetime]):
+        """
+        Build a time-of-week and exam-season profile from past publication times.
+
+        Args:
+            timestamps (List[datetime]): Local times at which new grades were first seen
+        """
+        # Grades detected in the same run share a timestamp; count each run once
+        self.events = sorted({ts.replace(second=0, microsecond=0) for ts in timestamps})
+        self.hour_weights = [0.0] * HOURS_PER_WEEK
+        self.week_weights = [0.0] * WEEKS_PER_YEAR
+
+        for ts in self.events:
+            hour_of_week = ts.weekday() * 24 + ts.hour
+            for offset, weight in HOUR_KERNEL.items():
+                self.hour_weights[(hour_of_week + offset) % HOURS_PER_WEEK] += weight
+            week_of_year = ts.isocalendar()[1] - 1
+            for offset, weight in WEEK_KERNEL.items():
+                self.week_weights[(week_of_year + offset) % WEEKS_PER_YEAR] += weight
+
+        self.hour_max = max(self.hour_weights)
+        self.week_max = max(self.week_weights)
+
+    def density(self, when: datetime) -> float:
+        """
+        Get how likely a publication is around the given time.
+
+        Args:
+            when (datetime): Local time to score
+
+        Returns:
+            float: Likelihood in [0, 1]; 0.5 everywhere when there is no history
+        """
+        if not self.events:
+            return 0.5
+        hour_score = self.hour_weights[when.weekday() * 24 + when.hour] / self.hour_max
+        week_score = self.week_weights[when.isocalendar()[1] - 1] / self.week_max
+        # Geometric mean, so a busy hour outside exam season still counts for something
+        return (hour_score * week_score) ** 0.5
+
+def save_last_run(when: Optional[datetime] = None, state_file: str = SCHEDULER_STATE_FILE) -> None:
+    """
+    Persist the time of a run so later gate checks can space polls out.
+
+    Needs no publication history, so runs that are skipped can record themselves
+    without opening the database.
+
+    Args:
+        when (Optional[datetime]): Time of the run, defaults to now
+        state_file (str): JSON file holding the time of the last run
+    """
+    when = when or datetime.now()
+    directory = os.path.dirname(state_file)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    # Both the run holding the lock and the ones skipped for it record runs, so each
+    # writes its own temporary file and swaps it in; readers never see a partial file
+    descriptor, temp_file = tempfile.mkstemp(dir=directory or ".", suffix=".tmp",
+                                             prefix=f"{os.path.basename(state_file)}.")
+    try:
+        with os.fdopen(descriptor, "w", encoding="utf-8") as f:
+            json.dump({"last_run": when.isoformat()}, f)
+        os.replace(temp_file, state_file)
+    except BaseException:
+        os.remove(temp_file)
+        raise
+
+class PollScheduler:
+    def __init__(self, timestamps: List[datetime],
+                 min_interval: float = POLL_MIN_INTERVAL,
+                 max_interval: float = POLL_MAX_INTERVAL,
+                 state_file: str = SCHEDULER_STATE_FILE):
+        """
+        Initialize the scheduler from the publication history.
+
+        Args:
+            timestamps (List[datetime]): Local times at which new grades were first seen
+            min_interval (float): Shortest gap between polls in minutes
+            max_interval (float): Longest gap between polls in minutes
+            state_file (str): JSON file holding the time of the last run
+        """
+        self.profile = PublicationProfile(timestamps)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.state_file = state_file
+
+    def interval(self, when: datetime) -> timedelta:
+        """
+        Get the polling interval to use at the given time.
+
+        Args:
+            when (datetime): Local time
+
+        Returns:
+            timedelta: Dense near likely publication windows, sparse otherwise
+        """
+        density = self.profile.density(when)
+        # Interpolate on a log scale: halfway between 10 and 360 minutes is 60, not 185
+        minutes = self.max_interval * (self.min_interval / self.max_interval) ** density
+        return timedelta(minutes=minutes)
+
+    def last_run(self) -> Optional[datetime]:
+        """Get the time of the last recorded run, if any"""
+        try:
+            with open(self.state_file, encoding="utf-8") as f:
+                return datetime.fromisoformat(json.load(f)["last_run"])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.log_error_with_context(e, {
+                "operation": "load_scheduler_state",
+                "state_file": self.state_file
+            })
+            return None
+
+    def record_run(self, when: Optional[datetime] = None) -> None:
+        """
+        Persist the time of a run so later gate checks can space polls out.
+
+        Args:
+            when (Optional[datetime]): Time of the run, defaults to now
+        """
+        save_last_run(when, self.state_file)
+
+    def next_run_at(self, now: Optional[datetime] = None) -> datetime:
+        """
+        Get when the next poll is due.
+
+        Args:
+            now (Optional[datetime]): Current time, defaults to now
+
+        Returns:
+            datetime: The due time, never later than the last run plus the interval at that time
+        """
+        now = now or datetime.now()
+        last_run = self.last_run()
+        if last_run is None:
+            return now
+        # Walk forward in small steps so a dense window is not skipped by a long sparse interval
+        candidate = last_run + timedelta(minutes=self.min_interval)
+        while candidate - last_run < self.interval(candidate):
+            candidate += timedelta(minutes=self.min_interval)
+        return candidate
+
+    def should_run(self, now: Optional[datetime] = None) -> bool:
+        """
+        Cron-friendly gate: decide whether a scheduled invocation should poll now.
+
+        Args:
+            now (Optional[datetime]): Current time, defaults to now
+
+        Returns:
+            bool: True if the next poll is due
+        """
+        now = now or datetime.now()
+        return now >= self.next_run_at(now)
+
+def simulate_polls(interval: Callable[[datetime], timedelta], start: datetime, end: datetime,
+                   min_interval: float) -> List[datetime]:
+    """
+    Replay a polling policy over a time range.
+
+    Args:
+        interval (Callable): Maps a time to the interval to use at that time
+        start (datetime): First poll
+        end (datetime): Stop polling after this time
+        min_interval (float): Step size in minutes; polls only happen on these steps
+
+    Returns:
+        List[datetime]: All poll times
+    """
+    polls = [start]
+    step = timedelta(minutes=min_interval)
+    last = start
+    candidate = start + step
+    while candidate <= end:
+        if candidate - last >= interval(candidate):
+            polls.append(candidate)
+            last = candidate
+        candidate += step
+    return polls
+
+def detection_latencies(polls: List[datetime], events: List[datetime]) -> List[float]:
+    """Minutes between each event and the first poll at or after it"""
+    latencies = []
+    index = 0
+    for event in events:
+        while index < len(polls) and polls[index] < event:
+            index += 1
+        if index < len(polls):
+            latencies.append((polls[index] - event).total_seconds() / 60)
+    return latencies
+
+def simulate(timestamps: List[datetime], train_ratio: float = 0.5,
+             min_interval: float = POLL_MIN_INTERVAL,
+             max_interval: float = POLL_MAX_INTERVAL) -> Dict[str, Dict[str, float]]:
+    """
+    Compare the adaptive schedule with a fixed one on historical publication times.
+
+    The profile is learned from the first part of the history and evaluated on
+    the rest. The fixed baseline uses the same number of polls, so any latency
+    difference comes from where the polls are placed.
+
+    Args:
+        timestamps (List[datetime]): Local times at which new grades were first seen
+        train_ratio (float): Share of the history's time span used for training
+        min_interval (float): Shortest gap between polls in minutes
+        max_interval (float): Longest gap between polls in minutes
+
+    Returns:
+        Dict: Poll count and mean/max detection latency for each policy
+    """
+    events = sorted({ts.replace(second=0, microsecond=0) for ts in timestamps})
+    if len(events) < 2:
+        raise ValueError("At least two historical publications are needed for a replay")
+
+    split = events[0] + (events[-1] - events[0]) * train_ratio
+    train = [ts for ts in events if ts <= split]
+    test = [ts for ts in events if ts > split] or events
+    start, end = (split, events[-1]) if test is not events else (events[0], events[-1])
+
+    scheduler = PollScheduler(train, min_interval, max_interval, state_file=os.devnull)
+    adaptive_polls = simulate_polls(scheduler.interval, start, end + timedelta(minutes=max_interval), min_interval)
+
+    fixed_minutes = max((end - start).total_seconds() / 60 / max(len(adaptive_polls) - 1, 1), min_interval)
+    fixed_polls = simulate_polls(lambda _: timedelta(minutes=fixed_minutes), start,
+                                 end + timedelta(minutes=fixed_minutes), fixed_minutes)
+
+    report = {}
+    for name, polls in (("adaptive", adaptive_polls), ("fixed", fixed_polls)):
+        latencies = detection_latencies(polls, test)
+        report[name] = {
+            "polls": len(polls),
+            "events": len(latencies),
+            "mean_latency_minutes": round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+            "max_latency_minutes": round(max(latencies), 1) if latencies else 0.0
+        }
+    report["fixed"]["interval_minutes"] = round(fixed_minutes, 1)
+    return report
@@ -0,0 +1,122 @@
+from typing import Dict, List, Optional, Tuple
+from utils.constants import EXAM_TYPE_LABELS
+import re
+
+# One "label : value" pair. The label starts at a word boundary and may contain
+# spaces, digits and a weight such as "(%40)"; the value is a single token that
+# is not itself the label of the next pair (an empty "Vize :" is skipped).
+SCORE_PAIR_PATTERN = re.compile(
+    r"(?<!\w)(?P<label>[^\W\d_][^:\n]*?)[ \t]*:[ \t]*(?P<value>[^\s:]+)(?=\s|$)(?![ \t]*:)"
+)
+
+# Numeric scores, with a decimal point or a Turkish decimal comma
+NUMBER_PATTERN = re.compile(r"^\d+(?:[.,]\d+)?$")
+
+# Letter grades and status codes such as AA, CB, FF, GR (girmedi), DZ (devamsız)
+GRADE_PATTERN = re.compile(r"^[^\W\d_]{1,4}[+-]?$")
+
+# Parts of a label that do not identify the assessment, e.g. "(%40)"
+LABEL_NOISE_PATTERN = re.compile(r"\([^)]*\)")
+
+# Parenthesized pairs are asides about the class rather than the student's
+# scores, e.g. "(Ortalama : 60)" for the class average
+ASIDE_PATTERN = re.compile(r"\([^()]*:[^()]*\)")
+
+WHITESPACE = re.compile(r"\s+")
+
+# The portal mixes Turkish and ASCII casing ("VİZE", "VIZE", "Fınal"), so dotted
+# and dotless i are treated as the same letter
+DOTLESS_I = str.maketrans({"I": "i", "İ": "i", "ı": "i"})
+
+class ParsedScore:
+    def __init__(self, label: str, exam_type: str, score: Optional[float] = None, grade: Optional[str] = None):
+        self.label = label
+        self.exam_type = exam_type
+        self.score = score
+        self.grade = grade
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ParsedScore) and vars(self) == vars(other)
+
+    def __repr__(self) -> str:
+        return (f"ParsedScore(label={self.label!r}, exam_type={self.exam_type!r}, "
+                f"score={self.score}, grade={self.grade!r})")
+
+def normalize_label(label: str) -> str:
+    """Lower-case a label, folding dotted and dotless i, and drop weights and extra whitespace"""
+    label = LABEL_NOISE_PATTERN.sub(" ", label).translate(DOTLESS_I).lower()
+    return WHITESPACE.sub(" ", label).strip()
+
+class ScoreParser:
+    def __init__(self, labels: Optional[Dict[str, str]] = None):
+        """
+        Initialize a parser for the score cells of the grades grid.
+
+        Args:
+            labels (Optional[Dict[str, str]]): Portal label to exam type, defaults to
+                EXAM_TYPE_LABELS. Labels are matched case-insensitively.
+        """
+        self.labels = {normalize_label(label): exam_type
+                       for label, exam_type in (labels or EXAM_TYPE_LABELS).items()}
+        # Exam types of labels already seen; a grid repeats the same few labels
+        self._exam_types: Dict[str, str] = {}
+
+    def exam_type(self, label: str) -> str:
+        """
+        Map a portal label to an exam type.
+
+        Cell text can run into the label (e.g. "n Vize" when a note precedes it), so
+        leading words are dropped until a known label remains. Labels missing from
+        the mapping are kept as a slug of the label rather than dropped, e.g.
+        "Kısa Sınav 2" becomes "kisa-sinav-2".
+
+        Args:
+            label (str): The label as shown on the portal
+
+        Returns:
+            str: The exam type
+        """
+        exam_type = self._exam_types.get(label)
+        if exam_type is None:
+            normalized = normalize_label(label)
+            words = normalized.split(" ")
+            known = (self.labels.get(" ".join(words[index:])) for index in range(len(words)))
+            exam_type = next((match for match in known if match), None) or normalized.replace(" ", "-")
+            self._exam_types[label] = exam_type
+        return exam_type
+
+    def parse(self, text: str) -> List[ParsedScore]:
+        """
+        Extract every "label : value" pair from a score cell in a single pass.
+
+        Args:
+            text (str): Text of the score cell, e.g. "Vize : 72,5 Final : 90 Harf Notu : BA"
+
+        Returns:
+            List[ParsedScore]: Scores in cell order. Placeholders such as "-", values
+                that are neither a number nor a grade (e.g. "8/10", whose scale is
+                unknown) and asides such as "(Ortalama : 60)" are skipped.
+        """
+        if "(" in text:
+            text = ASIDE_PATTERN.sub(" ", text)
+        scores = []
+        for match in SCORE_PAIR_PATTERN.finditer(text):
+            label = match.group("label").strip()
+            value = match.group("value")
+            if NUMBER_PATTERN.match(value):
+                scores.append(ParsedScore(label, self.exam_type(label), score=float(value.replace(",", "."))))
+            elif GRADE_PATTERN.match(value):
+                scores.append(ParsedScore(label, self.exam_type(label), grade=value.upper()))
+        return scores
+
+def is_revised(stored: Tuple[Optional[float], Optional[str]], score: Optional[float], grade: Optional[str]) -> bool:
+    """
+    Check if a published score differs from the stored one.
+
+    Rows stored before the grade column existed have no grade, so a grade is only
+    compared when one was stored.
+    """
+    stored_score, stored_grade = stored
+    if score is not None:
+        return stored_score is None or abs(stored_score - score) > 1e-9
+    return stored_grade is not None and stored_grade != grade
@@ -0,0 +1,65 @@
+from utils.logger import logger
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+import requests
+import threading
+import json
+import os
+
+class SessionRecorder:
+    def __init__(self, directory: str, secrets: Optional[List[str]] = None):
+        """
+        Store the responses of a real portal session so it can be replayed locally.
+
+        Bodies are written to numbered files next to a manifest.json. Request bodies
+        (which carry the credentials) are never stored, and every secret is replaced
+        with REDACTED in the stored responses.
+
+        Args:
+            directory (str): Folder the recording is written to
+            secrets (Optional[List[str]]): Strings to redact, e.g. username and password
+        """
+        self.directory = directory
+        self.secrets = [secret for secret in (secrets or []) if secret]
+        self.entries: List[Dict] = []
+        # Term pages are fetched from several threads at once
+        self._lock = threading.Lock()
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+    def redact(self, content: bytes) -> bytes:
+        """Replace every secret in the content"""
+        for secret in self.secrets:
+            content = content.replace(secret.encode("utf-8"), b"REDACTED")
+        return content
+
+    def record(self, response: requests.Response) -> None:
+        """
+        Store a response together with the redirects that led to it.
+
+        Args:
+            response (requests.Response): A response returned by the HTTP client
+        """
+        with self._lock:
+            for item in [*response.history, response]:
+                url = urlsplit(item.url)
+                filename = f"{len(self.entries):03d}.bin"
+                with open(os.path.join(self.directory, filename), "wb") as f:
+                    f.write(self.redact(item.content))
+                entry = {
+                    "method": item.request.method,
+                    "path": url.path,
+                    "query": url.query,
+                    "status": item.status_code,
+                    "content_type": item.headers.get("Content-Type", ""),
+                    "location": item.headers.get("Location"),
+                    "file": filename
+                }
+                self.entries.append(entry)
+                logger.debug("Recorded %s %s -> %s", entry['method'], entry['path'], entry['status'])
+            self.save()
+
+    def save(self) -> None:
+        """Write the manifest"""
+        with open(os.path.join(self.directory, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({"entries": self.entries}, f, indent=2)
@@ -0,0 +1,130 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import TYPE_CHECKING, Dict, List, Tuple
+import threading
+import hashlib
+import gzip
+import time
+import os
+from models.model import Result
+from utils.grade_grid import read_grid_rows
+from utils.html_document import HtmlDocument
+from utils.logger import logger
+from utils.metrics import metrics
+from utils.score_parser import ScoreParser
+from utils.constants import SNAPSHOTS_FOLDER, RESULTS_PAGE_LOCATORS
+
+if TYPE_CHECKING:
+    from utils.database import Database
+
+RESULTS_TABLE_ID = RESULTS_PAGE_LOCATORS["results_table"][1].split('"')[1]
+
+# Below this many snapshots per worker, starting processes costs more than it saves
+MIN_SNAPSHOTS_PER_WORKER = 20
+
+# A re-parsed result as (lesson_id, lesson_name, exam_type, score, grade)
+ParsedRow = Tuple[str, str, str, object, object]
+
+def parse_snapshot(path: str, table_id: str = RESULTS_TABLE_ID) -> List[ParsedRow]:
+    """
+    Run the current grid and score parsers over a stored snapshot.
+
+    Runs in worker processes, so it only takes and returns plain values.
+
+    Args:
+        path (str): Path of the gzipped grid
+        table_id (str): id of the grid table
+
+    Returns:
+        List[ParsedRow]: Every result in the grid
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        document = HtmlDocument(f.read())
+    parser = ScoreParser()
+    return [(lesson_id, lesson_name, parsed.exam_type, parsed.score, parsed.grade)
+            for lesson_id, lesson_name, score_text in read_grid_rows(document, table_id)
+            for parsed in parser.parse(score_text)]
+
+class SnapshotStore:
+    def __init__(self, database: "Database", folder: str = SNAPSHOTS_FOLDER):
+        """
+        Gzipped grades grids addressed by the SHA-256 of their HTML.
+
+        A grid identical to one stored before only bumps its poll count in the
+        database's snapshots table, so repeated polls cost no storage.
+
+        Args:
+            database (Database): Database holding the snapshots index
+            folder (str): Folder the snapshot files are stored in
+        """
+        self.database = database
+        self.folder = folder
+
+    def path(self, key: str) -> str:
+        """Path of the snapshot with the given hash, fanned out by its first two characters"""
+        return os.path.join(self.folder, key[:2], f"{key[2:]}.html.gz")
+
+    def save(self, term: str, table_html: str) -> str:
+        """
+        Store a term's grid unless the same grid is stored already.
+
+        Returns:
+            str: Hash of the grid
+        """
+        start_time = time.perf_counter()
+        try:
+            data = table_html.encode("utf-8")
+            key = hashlib.sha256(data).hexdigest()
+            path = self.path(key)
+            if os.path.exists(path):
+                metrics.increment("snapshots_deduplicated")
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Terms are fetched in parallel and may share a grid
+                temp_file = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+                with open(temp_file, "wb") as f:
+                    f.write(gzip.compress(data, mtime=0))
+                os.replace(temp_file, path)
+                metrics.increment("snapshots_stored")
+                logger.info("Stored new snapshot %s of term %s (%s bytes)", key[:12], term, len(data))
+            self.database.record_snapshot(key, term)
+            return key
+        finally:
+            logger.log_operation_time("save_snapshot", start_time)
+
+    def reparse(self, snapshots: List[Dict], workers: int) -> List[List[ParsedRow]]:
+        """
+        Re-parse snapshots, in parallel across worker processes.
+
+        Args:
+            snapshots (List[Dict]): Snapshots as listed by Database.get_snapshots
+            workers (int): Most worker processes; small sets are parsed in this process
+
+        Returns:
+            List[List[ParsedRow]]: Results of each snapshot, in the given order
+        """
+        paths = [self.path(snapshot["hash"]) for snapshot in snapshots]
+        workers = min(workers, len(paths) // MIN_SNAPSHOTS_PER_WORKER)
+        if workers <= 1:
+            return [parse_snapshot(path) for path in paths]
+        chunk_size = max(1, len(paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(parse_snapshot, paths, repeat(RESULTS_TABLE_ID), chunksize=chunk_size))
+
+def latest_results(snapshots: List[Dict], parsed: List[List[ParsedRow]]) -> List[Result]:
+    """
+    Get each result as shown by the most recently seen snapshot of its term.
+
+    Args:
+        snapshots (List[Dict]): Snapshots, oldest last_seen first
+        parsed (List[List[ParsedRow]]): Re-parsed results of each snapshot
+
+    Returns:
+        List[Result]: One result per term, lesson and exam type
+    """
+    latest: Dict[Tuple[str, str, str], Result] = {}
+    for snapshot, rows in zip(snapshots, parsed):
+        for lesson_id, lesson_name, exam_type, score, grade in rows:
+            latest[(snapshot["term"], lesson_id, exam_type)] = Result(
+                lesson_id, lesson_name, exam_type, score, snapshot["term"], grade)
+    return list(latest.values())
@@ -0,0 +1,229 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional
+import functools
+import itertools
+import threading
+import inspect
+import json
+import time
+import sys
+import os
+from utils.constants import TRACING
+
+class Span:
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, object]):
+        """
+        A timed unit of work, nested under the span that was current when it started.
+
+        Args:
+            name (str): Name of the operation
+            parent (Optional[Span]): Enclosing span, None for a root span
+            attributes (Dict[str, object]): Details such as the attempt number
+        """
+        self.name = name
+        self.parent = parent
+        self.attributes = attributes
+        self.span_id = next(Tracer.span_ids)
+        self.trace_id = parent.trace_id if parent else self.span_id
+        self.lane = current_lane()
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds, up to now if the span is still open"""
+        return ((self.end_ns or time.perf_counter_ns()) - self.start_ns) / 1e9
+
+    def set_attribute(self, name: str, value: object) -> None:
+        """Attach a detail learned while the span is open, e.g. the captcha result"""
+        self.attributes[name] = value
+
+def current_lane() -> str:
+    """
+    Get the timeline a span is drawn on: its asyncio task, or else its thread.
+
+    Concurrent notifications run as tasks on one thread; giving each task its own
+    lane keeps their overlapping spans from being drawn as nested.
+    """
+    # No task can be running before asyncio is imported, and importing it just to
+    # check would slow down startup
+    asyncio = sys.modules.get("asyncio")
+    try:
+        task = asyncio.current_task() if asyncio is not None else None
+    except RuntimeError:
+        task = None
+    if task is not None:
+        return f"{threading.current_thread().name}/{task.get_name()}"
+    return threading.current_thread().name
+
+class Tracer:
+    span_ids = itertools.count(1)
+
+    def __init__(self, enabled: bool = True):
+        """
+        Collect nested spans for the current run.
+
+        The current span is kept in a ContextVar, so nesting follows the code
+        through threads started with a copied context and through asyncio tasks.
+
+        Args:
+            enabled (bool): Record spans; when False span() only yields None
+        """
+        self.enabled = enabled
+        self.current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        # Wall clock time matching perf_counter_ns 0, to place spans in time
+        self.epoch_offset_ns = time.time_ns() - time.perf_counter_ns()
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Optional[Span]]:
+        """
+        Time the enclosed block as a child of the current span.
+
+        Args:
+            name (str): Name of the operation
+            **attributes: Details recorded with the span
+
+        Yields:
+            Optional[Span]: The open span, None if tracing is disabled
+        """
+        if not self.enabled:
+            yield None
+            return
+        span = Span(name, self.current.get(), attributes)
+        token = self.current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end_ns = time.perf_counter_ns()
+            self.current.reset(token)
+            with self._lock:
+                self.spans.append(span)
+
+    def traced(self, name: Optional[str] = None) -> Callable:
+        """
+        Decorate a function or coroutine function to run inside a span.
+
+        Args:
+            name (Optional[str]): Span name, defaults to the function's qualified name
+
+        Returns:
+            Callable: The decorator
+        """
+        def decorator(func: Callable) -> Callable:
+            span_name = name or func.__qualname__
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(span_name):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def reset(self) -> None:
+        """Drop the finished spans, e.g. after a daemon run has been exported"""
+        with self._lock:
+            self.spans = []
+
+    def to_chrome_trace(self) -> Dict:
+        """
+        Convert finished spans to the Chrome trace event format.
+
+        Returns:
+            Dict: Trace that opens in chrome://tracing and Perfetto
+        """
+        with self._lock:
+            spans = list(self.spans)
+        lanes: Dict[str, int] = {}
+        events = []
+        for span in sorted(spans, key=lambda item: item.start_ns):
+            lane = lanes.setdefault(span.lane, len(lanes) + 1)
+            args = {key: str(value) for key, value in span.attributes.items()}
+            if span.error:
+                args["error"] = span.error
+            events.append({
+                "name": span.name,
+                "cat": span.name.split(".")[0],
+                "ph": "X",
+                "ts": (span.start_ns + self.epoch_offset_ns) / 1000,
+                "dur": (span.end_ns - span.start_ns) / 1000,
+                "pid": os.getpid(),
+                "tid": lane,
+                "args": args
+            })
+        events += [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": lane, "args": {"name": name}}
+                   for name, lane in lanes.items()]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def to_otlp(self, service_name: str = "beykent-exam-notifier") -> Dict:
+        """
+        Convert finished spans to the OTLP/JSON trace format.
+
+        Returns:
+            Dict: An ExportTraceServiceRequest body, accepted by OTLP/HTTP collectors
+        """
+        with self._lock:
+            spans = list(self.spans)
+
+        def attributes(values: Dict[str, object]) -> List[Dict]:
+            return [{"key": key, "value": {"stringValue": str(value)}} for key, value in values.items()]
+
+        return {"resourceSpans": [{
+            "resource": {"attributes": attributes({"service.name": service_name})},
+            "scopeSpans": [{
+                "scope": {"name": "utils.tracing"},
+                "spans": [{
+                    "traceId": f"{os.getpid():016x}{span.trace_id:016x}",
+                    "spanId": f"{span.span_id:016x}",
+                    "parentSpanId": f"{span.parent.span_id:016x}" if span.parent else "",
+                    "name": span.name,
+                    "kind": 1,
+                    "startTimeUnixNano": str(span.start_ns + self.epoch_offset_ns),
+                    "endTimeUnixNano": str(span.end_ns + self.epoch_offset_ns),
+                    "attributes": attributes({**span.attributes, "thread": span.lane}),
+                    "status": {"code": 2, "message": span.error} if span.error else {"code": 1}
+                } for span in spans]
+            }]
+        }]}
+
+    def export(self, folder: str, trace_format: str = "chrome", keep: int = 20) -> Optional[str]:
+        """
+        Write the finished spans of the run to a new file and prune old ones.
+
+        Args:
+            folder (str): Folder for trace files
+            trace_format (str): "chrome" or "otlp"
+            keep (int): Number of most recent trace files to keep
+
+        Returns:
+            Optional[str]: Path of the written file, None if there was nothing to write
+        """
+        if not self.spans:
+            return None
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        content = self.to_otlp() if trace_format == "otlp" else self.to_chrome_trace()
+        suffix = "otlp.json" if trace_format == "otlp" else "trace.json"
+        path = os.path.join(folder, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.{suffix}")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(content, f)
+
+        traces = sorted(name for name in os.listdir(folder) if name.endswith(".json"))
+        for name in traces[:-keep] if keep > 0 else []:
+            os.remove(os.path.join(folder, name))
+        return path
+
+# Create singleton instance
+tracer = Tracer(TRACING)
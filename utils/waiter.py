@@ -0,0 +1,272 @@
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.remote.webelement import WebElement
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import TimeoutException, UnexpectedAlertPresentException, WebDriverException
+from utils.logger import logger
+from utils.deadline import Deadline
+from utils.tracing import tracer
+from typing import Optional, Union
+import time
+
+# Shared locator used by the injected scripts; mirrors the Selenium By strategies below.
+LOCATE_FUNCTION = """
+function toArray(list) { return Array.prototype.slice.call(list); }
+
+function locate(by, value) {
+    var nodes = [];
+    if (by === 'id') {
+        var el = document.getElementById(value);
+        if (el) { nodes = [el]; }
+    } else if (by === 'css selector') {
+        nodes = toArray(document.querySelectorAll(value));
+    } else if (by === 'tag name') {
+        nodes = toArray(document.getElementsByTagName(value));
+    } else if (by === 'name') {
+        nodes = toArray(document.getElementsByName(value));
+    } else if (by === 'class name') {
+        nodes = toArray(document.getElementsByClassName(value));
+    } else if (by === 'xpath') {
+        var snapshot = document.evaluate(value, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        for (var i = 0; i < snapshot.snapshotLength; i++) { nodes.push(snapshot.snapshotItem(i)); }
+    }
+    return nodes;
+}
+
+function isVisible(el) {
+    var rect = el.getBoundingClientRect();
+    var style = window.getComputedStyle(el);
+    return rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden' && style.display !== 'none';
+}
+
+function observeUntil(check, timeoutMs, done) {
+    var found = check();
+    if (found) { done(found); return; }
+    var timer = null;
+    var observer = new MutationObserver(function () {
+        var match = check();
+        if (match) {
+            observer.disconnect();
+            clearTimeout(timer);
+            done(match);
+        }
+    });
+    observer.observe(document.documentElement || document,
+        {childList: true, subtree: true, attributes: true, characterData: true});
+    timer = setTimeout(function () { observer.disconnect(); done(null); }, timeoutMs);
+}
+"""
+
+# Resolves as soon as the locator matches, using a MutationObserver instead of polling.
+# Arguments: by, value, condition ("present", "clickable" or "all"), timeout in ms, callback.
+WAIT_FOR_ELEMENT_SCRIPT = LOCATE_FUNCTION + """
+var by = arguments[0], value = arguments[1], condition = arguments[2], timeoutMs = arguments[3];
+var done = arguments[arguments.length - 1];
+
+observeUntil(function () {
+    var nodes = locate(by, value);
+    if (condition === 'clickable') {
+        nodes = nodes.filter(function (el) { return !el.disabled && isVisible(el); });
+    }
+    if (!nodes.length) { return null; }
+    return condition === 'all' ? nodes : nodes[0];
+}, timeoutMs, done);
+"""
+
+# Resolves with the text of the first visible matching element once it is non-empty.
+# Documents carrying the stale attribute are about to be replaced, so they are never matched.
+# Arguments: by, value, stale attribute, timeout in ms, callback.
+WAIT_FOR_TEXT_SCRIPT = LOCATE_FUNCTION + """
+var by = arguments[0], value = arguments[1], staleAttribute = arguments[2], timeoutMs = arguments[3];
+var done = arguments[arguments.length - 1];
+
+if (document.documentElement.hasAttribute(staleAttribute)) {
+    setTimeout(function () { done(null); }, timeoutMs);
+    return;
+}
+observeUntil(function () {
+    var nodes = locate(by, value);
+    for (var i = 0; i < nodes.length; i++) {
+        var text = (nodes[i].innerText || nodes[i].textContent || '').trim();
+        if (text && isVisible(nodes[i])) { return text; }
+    }
+    return null;
+}, timeoutMs, done);
+"""
+
+# Attribute set on a document right before an action that replaces it
+STALE_DOCUMENT_ATTRIBUTE = "data-waiter-stale"
+
+# Locator strategies the injected script knows how to evaluate
+SUPPORTED_STRATEGIES = {By.ID, By.CSS_SELECTOR, By.TAG_NAME, By.NAME, By.CLASS_NAME, By.XPATH}
+
+# Extra time given to the WebDriver script timeout on top of the in-page timer
+SCRIPT_TIMEOUT_MARGIN = 1
+
+class Waiter:
+    def __init__(self, driver, deadline: Optional[Deadline] = None):
+        """
+        Initialize the Waiter for the given driver.
+
+        Args:
+            driver: The Selenium WebDriver instance
+            deadline (Optional[Deadline]): Run deadline that caps every wait
+        """
+        self.driver = driver
+        self.deadline = deadline or Deadline()
+        self.script_timeout = None
+        # Accumulated time spent waiting for elements during this run
+        self.total_wait_time = 0.0
+        self.wait_count = 0
+
+    def until_present(self, by: By, value: str, timeout: float) -> WebElement:
+        """
+        Wait until an element matching the locator is attached to the DOM.
+
+        Args:
+            by (By): The method to locate the element
+            value (str): The value to search for
+            timeout (float): Maximum time to wait in seconds
+
+        Returns:
+            WebElement: The found element
+        """
+        return self._wait(by, value, "present", timeout, EC.presence_of_element_located)
+
+    def until_clickable(self, by: By, value: str, timeout: float) -> WebElement:
+        """
+        Wait until an element matching the locator is visible and enabled.
+
+        Args:
+            by (By): The method to locate the element
+            value (str): The value to search for
+            timeout (float): Maximum time to wait in seconds
+
+        Returns:
+            WebElement: The clickable element
+        """
+        return self._wait(by, value, "clickable", timeout, EC.element_to_be_clickable)
+
+    def until_all_present(self, by: By, value: str, timeout: float) -> list[WebElement]:
+        """
+        Wait until at least one element matching the locator is attached to the DOM.
+
+        Args:
+            by (By): The method to locate the elements
+            value (str): The value to search for
+            timeout (float): Maximum time to wait in seconds
+
+        Returns:
+            list[WebElement]: All matching elements
+        """
+        return self._wait(by, value, "all", timeout, EC.presence_of_all_elements_located)
+
+    def mark_document_stale(self) -> None:
+        """
+        Mark the current document as about to be replaced (e.g. before a form post).
+
+        Text waits ignore marked documents so a message left over from the previous
+        page is not mistaken for the response to the new request.
+        """
+        self.driver.execute_script(
+            "document.documentElement.setAttribute(arguments[0], '1');", STALE_DOCUMENT_ATTRIBUTE
+        )
+
+    @tracer.traced("waiter.until_url_or_text")
+    def until_url_or_text(self, url: str, by: By, value: str, timeout: float) -> tuple[str, str]:
+        """
+        Wait until the browser reaches the URL or a matching element shows text, whichever comes first.
+
+        A JavaScript alert raised by the page counts as text as well.
+
+        Args:
+            url (str): The URL that signals success
+            by (By): The method to locate the message element
+            value (str): The value to search for
+            timeout (float): Maximum time to wait in seconds
+
+        Returns:
+            tuple: ("url", current_url) or ("text", element_text)
+
+        Raises:
+            TimeoutException: If neither happens within the timeout
+        """
+        timeout = self.deadline.clamp(timeout)
+        start = time.monotonic()
+        deadline = start + timeout
+        try:
+            while True:
+                # Checked before touching the driver, which may keep failing (closed window, dead session)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutException(f"Neither {url} nor text in {by}={value} after {timeout} seconds")
+                try:
+                    current_url = self.driver.current_url
+                    if current_url == url:
+                        return "url", current_url
+                    text = self._execute_observer_script(
+                        WAIT_FOR_TEXT_SCRIPT, remaining, by, value, STALE_DOCUMENT_ATTRIBUTE
+                    )
+                    if text:
+                        return "text", text
+                except TimeoutException:
+                    raise
+                except UnexpectedAlertPresentException as e:
+                    # Some pages report errors through window.alert instead of an element
+                    if e.alert_text:
+                        return "text", e.alert_text
+                except WebDriverException as e:
+                    if time.monotonic() >= deadline:
+                        raise TimeoutException(
+                            f"Neither {url} nor text in {by}={value} after {timeout} seconds: {e.msg}") from e
+                    # The document was replaced while waiting; look again on the new page
+                    logger.debug("Document changed while waiting for %s: %s", url, e)
+                    time.sleep(0.05)
+        finally:
+            self.total_wait_time += time.monotonic() - start
+            self.wait_count += 1
+
+    @tracer.traced("waiter.wait")
+    def _wait(self, by: By, value: str, condition: str, timeout: float,
+              fallback_condition) -> Union[WebElement, list[WebElement]]:
+        """
+        Run the event-driven wait, falling back to WebDriverWait within the same budget.
+
+        The injected script cannot survive a page unload and does not know every
+        locator strategy; in both cases the remaining budget is spent on a regular
+        WebDriverWait so the caller still sees a single timeout.
+        """
+        timeout = self.deadline.clamp(timeout)
+        start = time.monotonic()
+        deadline = start + timeout
+        try:
+            if by in SUPPORTED_STRATEGIES:
+                try:
+                    result = self._wait_with_observer(by, value, condition, timeout)
+                    if result:
+                        return result
+                    raise TimeoutException(f"Element {by}={value} not {condition} after {timeout} seconds")
+                except TimeoutException:
+                    raise
+                except WebDriverException as e:
+                    logger.debug("Observer wait for %s=%s interrupted, falling back to polling: %s", by, value, e)
+
+            remaining = max(deadline - time.monotonic(), 0)
+            return WebDriverWait(self.driver, remaining, poll_frequency=0.1).until(
+                fallback_condition((by, value))
+            )
+        finally:
+            self.total_wait_time += time.monotonic() - start
+            self.wait_count += 1
+
+    def _wait_with_observer(self, by: By, value: str, condition: str, timeout: float):
+        """Execute the MutationObserver element script and return its result."""
+        return self._execute_observer_script(WAIT_FOR_ELEMENT_SCRIPT, timeout, by, value, condition)
+
+    def _execute_observer_script(self, script: str, timeout: float, *args):
+        """Run an observer script whose last argument before the callback is its timeout in ms."""
+        script_timeout = timeout + SCRIPT_TIMEOUT_MARGIN
+        if self.script_timeout is None or self.script_timeout < script_timeout:
+            self.driver.set_script_timeout(script_timeout)
+            self.script_timeout = script_timeout
+        return self.driver.execute_async_script(script, *args, int(timeout * 1000))